@@ -0,0 +1,306 @@
+"""
+Értékelési mikrobenchmark: normalize_text, parse_number, evaluate_text_answer
+(minden értékelési mód), calculate_score, valamint teljes kitöltések
+értékelése a quizzes/ kérdéssorain és szintetikus 10 000 kérdéses sorokon.
+
+Használat:
+    python bench_grading.py                          # eredmények kiírása
+    python bench_grading.py --save baseline.json     # alapméréskénti mentés
+    python bench_grading.py --compare baseline.json  # összevetés, romlásnál 1-es kilépési kód
+    python bench_grading.py --filter evaluate        # csak a névre illeszkedő esetek
+
+Python 3.12 vagy újabb kell: a common.py (gen_task) f-stringjeiben
+egymásba ágyazott, azonos idézőjelek vannak (PEP 701), ezeket a régebbi
+értelmező be sem tudja olvasni.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+if sys.version_info < (3, 12):
+    sys.exit("A bench_grading.py Python 3.12 vagy újabb értelmezőt igényel (a common.py f-stringjei miatt).")
+
+from common import (
+    QUIZZES_DIR,
+    Question,
+    calculate_score,
+    compile_answer_key,
+    evaluate_text_answer,
+    expression_fingerprint,
+    get_quiz,
+    normalize_text,
+    parse_number,
+    parse_numeric_expression,
+)
+
+# Mérési beállítások
+MIN_RUN_TIME = 0.2          # egy ismétlés legalább ennyi másodpercig fut
+DEFAULT_REPEAT = 5          # ismétlések száma, a legjobbat vesszük
+DEFAULT_THRESHOLD = 0.20    # ekkora relatív lassulás már romlásnak számít
+SYNTHETIC_BANK_SIZE = 10000
+BENCH_SEED = 20251103
+
+# Változatos bemenetek, hogy ne csak a gyorsítótár találatait mérjük
+TEXT_INPUTS = ["  Budapest ", "DUNA", "a Tisza  folyó", "GNOME és KDE", "Kékes-tető", "ls -la",
+               "A fotoszintézis során glükóz keletkezik", "Balaton", "chmod 755 fájl", ""]
+NUMBER_INPUTS = ["29/5", "10^-12", "2,5·10^3", "1e-12", "3.14159", "-7", "2⁻²", "(3²)³", "√2", "abc"]
+
+# Értékelési módonként: (helyes válaszok, beállítások, diákválaszok)
+MATCH_TYPE_CASES = {
+    "exact": (["Budapest", "Bp"], {}, ["budapest", " BUDAPEST ", "Debrecen", "bp"]),
+    "contains": (["duna"], {}, ["a Duna folyó", "Tisza", "DUNA", "dunántúl"]),
+    "keywords": (["GNOME | gnome shell = 2", "KDE", "Xfce"], {},
+                 ["GNOME és KDE", "xfce", "csak a KDE", "semmi"]),
+    "fuzzy": (["Kékes-tető", "Kékestető"], {}, ["kékes-tetö", "Kekes-teto", "Mátra", "kékestető"]),
+    "number": (["5.8", "29/5"], {"tolerance": 0.01}, ["29/5", "5,8", "5.81", "6", "x"]),
+    "unit": (["300"], {"unit": "cm"}, ["300 cm", "3 m", "3000 mm", "30 cm", "300"]),
+    "expression": (["a² + 2ab + b²"], {"form": "expanded"},
+                   ["a^2+2ab+b^2", "b² + 2ba + a²", "(a+b)^2", "a² + b²"]),
+}
+
+def measure(func, repeat=DEFAULT_REPEAT):
+    """
+    Egy eset mérése: műveletek másodpercenként (a legjobb ismétlésből), valamint
+    egy külön, tracemalloc alatti menet foglalásai.
+    """
+    # Kalibrálás: annyi hívás egy menetben, hogy legalább MIN_RUN_TIME-ig tartson
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_RUN_TIME or number >= 1 << 24:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(MIN_RUN_TIME / elapsed) + 1))
+    
+    best = elapsed
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat - 1):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    
+    # Foglalások: egy hívás alatti legnagyobb átmeneti memória, és ami hívásonként megmarad
+    alloc_number = max(1, min(number, 1000))
+    peak_per_op = 0
+    tracemalloc.start()
+    try:
+        start_memory, _ = tracemalloc.get_traced_memory()
+        for _ in range(alloc_number):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+            peak_per_op = max(peak_per_op, peak - current)
+        end_memory, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    return {
+        "ops_per_sec": number / best if best > 0 else float("inf"),
+        "us_per_op": best / number * 1e6,
+        "peak_bytes_per_op": peak_per_op,
+        "retained_bytes_per_op": max(0, end_memory - start_memory) / alloc_number,
+    }
+
+def cycle(values):
+    """Végtelen körforgó hívó: minden híváskor a következő bemenet"""
+    state = {"i": 0}
+    
+    def next_value():
+        value = values[state["i"] % len(values)]
+        state["i"] += 1
+        return value
+    return next_value
+
+# Diákválaszok előállítása egy kérdéshez (helyes, hibás és átírt válaszok keverve)
+def simulated_answer(question, rng):
+    if question["type"] == "single":
+        options = list(question.get("options", ())) or [question["answer"]]
+        return question["answer"] if rng.random() < 0.6 else rng.choice(options)
+    if question["type"] == "multiple":
+        options = list(question.get("options", ()))
+        correct = list(question["answer"])
+        if rng.random() < 0.5 or not options:
+            return correct
+        return rng.sample(options, rng.randint(1, len(options)))
+    answers = list(question["answer"]) or [""]
+    answer = rng.choice(answers)
+    roll = rng.random()
+    if roll < 0.4:
+        return answer
+    if roll < 0.6:
+        return f"  {answer.upper()} "
+    if roll < 0.8:
+        return answer[:-1] + "x" if answer else "x"
+    return f"{answer} ?"
+
+def synthetic_bank(size, rng):
+    """Vegyes típusú, véletlenszerű kérdéssor (Question rekordok) a valós sorok mintájára"""
+    words = ["alma", "körte", "szilva", "barack", "Duna", "Tisza", "Balaton", "Mátra", "Bükk",
+             "gránit", "bazalt", "mészkő", "folyó", "hegy", "tó", "város", "megye", "sziget"]
+    match_types = list(MATCH_TYPE_CASES)
+    questions = []
+    for i in range(size):
+        kind = rng.random()
+        if kind < 0.3:
+            options = rng.sample(words, 4)
+            data = {"question": f"Kérdés {i}", "type": "single", "options": options,
+                    "answer": options[0], "points": 1}
+        elif kind < 0.5:
+            options = rng.sample(words, 5)
+            data = {"question": f"Kérdés {i}", "type": "multiple", "options": options,
+                    "answer": options[:rng.randint(1, 3)], "points": 2}
+        else:
+            match_type = rng.choice(match_types)
+            answers, options, _students = MATCH_TYPE_CASES[match_type]
+            if match_type in ("exact", "contains", "fuzzy"):
+                answers = [" ".join(rng.sample(words, rng.randint(1, 3))) for _ in range(rng.randint(1, 3))]
+            elif match_type == "number":
+                answers = [f"{rng.uniform(-1000, 1000):.3f}"]
+            data = {"question": f"Kérdés {i}", "type": "text", "answer": list(answers),
+                    "points": 1, "match_type": match_type, **options}
+        questions.append(Question(data))
+    return tuple(questions)
+
+def grade_attempt(questions, answers):
+    """Egy teljes kitöltés pontozása úgy, ahogy a diák alkalmazás teszi"""
+    total = 0
+    for q, answer in zip(questions, answers):
+        total += calculate_score(answer, q["answer"], q["type"], q["points"],
+                                 q.get("match_type", "exact"), answer_key=q.answer_key)
+    return total
+
+def load_real_banks():
+    banks = {}
+    for name in sorted(os.listdir(QUIZZES_DIR)):
+        if name.endswith('.json'):
+            questions = get_quiz(name[:-5])
+            if questions:
+                banks[name[:-5]] = questions
+    return banks
+
+def build_cases():
+    """Esetnév -> paraméter nélküli hívható"""
+    rng = random.Random(BENCH_SEED)
+    cases = {}
+    
+    texts = cycle(TEXT_INPUTS)
+    cases["normalize_text"] = lambda: normalize_text(texts())
+    
+    numbers = cycle(NUMBER_INPUTS)
+    cases["parse_number"] = lambda: parse_number(numbers())
+    # Gyorsítótár nélkül: maga az elemzés költsége
+    raw_numbers = cycle([normalize_text(t) for t in NUMBER_INPUTS])
+    cases["parse_number/uncached"] = lambda: parse_numeric_expression.__wrapped__(raw_numbers())
+    raw_expressions = cycle(["a^2+2ab+b^2", "(a - b)(a + b)", "x⁴y⁶", "8a³ + b³", "√a√b"])
+    cases["expression_fingerprint/uncached"] = lambda: expression_fingerprint.__wrapped__(raw_expressions())
+    
+    for match_type, (answers, options, students) in MATCH_TYPE_CASES.items():
+        student = cycle(students)
+        cases[f"evaluate_text_answer/{match_type}"] = (
+            lambda a=tuple(answers), m=match_type, o=options, s=student: evaluate_text_answer(s(), a, m, **o))
+    
+    single_answers = cycle(["Budapest", "Debrecen", "Szeged"])
+    cases["calculate_score/single"] = lambda: calculate_score(single_answers(), "Budapest", "single", 1)
+    multiple_answers = cycle([["a", "b"], ["a", "c", "d"], ["b"], ["a", "b", "c"]])
+    cases["calculate_score/multiple"] = lambda: calculate_score(multiple_answers(), ["a", "b", "c"], "multiple", 3)
+    text_key = compile_answer_key(("Budapest", "Bp"), "fuzzy")
+    text_answers = cycle(["budapest", "Budapset", "Szeged"])
+    cases["calculate_score/text"] = lambda: calculate_score(text_answers(), ("Budapest", "Bp"), "text", 1,
+                                                            "fuzzy", answer_key=text_key)
+    
+    # Teljes kitöltések: valós kérdéssorok és szintetikus sorok
+    for quiz_id, questions in load_real_banks().items():
+        attempts = cycle([[simulated_answer(q, rng) for q in questions] for _ in range(20)])
+        cases[f"attempt/{quiz_id}"] = lambda q=questions, a=attempts: grade_attempt(q, a())
+    
+    bank = synthetic_bank(SYNTHETIC_BANK_SIZE, rng)
+    attempts = cycle([[simulated_answer(q, rng) for q in bank] for _ in range(3)])
+    cases[f"attempt/synthetic_{SYNTHETIC_BANK_SIZE}"] = lambda: grade_attempt(bank, attempts())
+    return cases
+
+def environment_info():
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+def compare(results, baseline, threshold):
+    """Összevetés az alapméréssel; a romlott esetek nevét adja vissza"""
+    regressions = []
+    print(f"\n{'eset':<45} {'alap op/s':>12} {'most op/s':>12} {'arány':>7}  {'csúcs B/op':>11}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<45} {'-':>12} {current['ops_per_sec']:>12.0f} {'új':>7}")
+            continue
+        ratio = current["ops_per_sec"] / base["ops_per_sec"] if base["ops_per_sec"] else float("inf")
+        flag = ""
+        if ratio < 1 - threshold:
+            flag = "  LASSULÁS"
+            regressions.append(name)
+        elif base.get("peak_bytes_per_op") and current["peak_bytes_per_op"] > base["peak_bytes_per_op"] * (1 + threshold) + 64:
+            flag = "  TÖBB FOGLALÁS"
+            regressions.append(name)
+        print(f"{name:<45} {base['ops_per_sec']:>12.0f} {current['ops_per_sec']:>12.0f} "
+              f"{ratio:>7.2f}  {current['peak_bytes_per_op']:>11.0f}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Értékelési mikrobenchmark")
+    parser.add_argument("--save", metavar="FÁJL", help="eredmények mentése alapmérésként (JSON)")
+    parser.add_argument("--compare", metavar="FÁJL", help="összevetés egy korábbi alapméréssel")
+    parser.add_argument("--filter", default="", help="csak az ezt a szöveget tartalmazó nevű esetek")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="ismétlések száma")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="megengedett relatív lassulás (alapból 0.20)")
+    args = parser.parse_args(argv)
+    
+    cases = {name: func for name, func in build_cases().items() if args.filter in name}
+    results = {}
+    print(f"{'eset':<45} {'op/s':>12} {'µs/op':>10} {'csúcs B/op':>11} {'megmaradó B/op':>15}")
+    for name, func in cases.items():
+        func()  # bemelegítés: betöltések, gyorsítótárak
+        result = measure(func, args.repeat)
+        results[name] = result
+        print(f"{name:<45} {result['ops_per_sec']:>12.0f} {result['us_per_op']:>10.2f} "
+              f"{result['peak_bytes_per_op']:>11.0f} {result['retained_bytes_per_op']:>15.1f}")
+    
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({"environment": environment_info(), "results": results}, f, indent=2, ensure_ascii=False)
+        print(f"\nAlapmérés mentve: {args.save}")
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} eset romlott: {', '.join(regressions)}")
+            return 1
+        print("\nNincs romlás az alapméréshez képest.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 import random
 import re
@@ -9,8 +9,36 @@ import numpy as np
 from PIL import Image
 import io
 import math
+import unicodedata
 import hashlib
+import hmac
+import logging
+import base64
 import secrets
+import copy
+import bisect
+import functools
+import sys
+import struct
+import ctypes
+import ctypes.util
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from types import MappingProxyType
+import csv
+import gzip
+import sqlite3
+import threading
+import queue
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_log = logging.getLogger(__name__)
 
 # Alkalmazás konfiguráció
 def setup_page_config():
@@ -20,6 +48,8 @@ def setup_page_config():
 QUIZ_RESULTS_DIR = "quiz_results"
 QUIZ_CONFIG_FILE = "quiz_config.json"
 QUIZZES_DIR = "quizzes"
+QUIZ_INDEX_DIR = "quiz_index"
+QUIZ_VERSIONS_DIR = "quiz_versions"
 IMAGES_DIR = "quiz_images"
 STUDENTS_FILE = "students.json"
 
@@ -47,10 +77,15 @@ def gen_task(api_key, task_name, task_topic, num_of_task, ai_teacher_desc):
         ]
         ,"""+ f"{config["prompt"]["resz1"]}: "+ task_topic+f"{config["prompt"]["resz2"]}"+ num_of_task+ f"{config["prompt"]["resz3"]} "+ai_teacher_desc+f". {config["prompt"]["resz4"]}",
     )
+    dir_signature = _dir_signature(QUIZZES_DIR)
     with open(f"quizzes/{task_name}.json", "w") as f:
         f.write(response.text[7:-3])
+    _invalidate_quiz_cache(task_name)
+    _update_catalog_entry(task_name, get_quiz(task_name), dir_signature)
 
 # Jelszó kezelés
+TEACHER_ACCOUNT = "tanar"
+
 def hash_password(password):
     """Jelszó hash-elése"""
     salt = secrets.token_hex(16)
@@ -67,6 +102,167 @@ def verify_password(password, hashed):
     except:
         return False
 
+# Bejelentkezéskor a jelszó-ellenőrzés (100 000 körös PBKDF2) korlátos számú
+# munkaszálon fut. A pbkdf2_hmac a számolás idejére elengedi a GIL-t, így a
+# szálak valóban párhuzamosan dolgoznak, a Streamlit szálak pedig csak várnak.
+# A sor fiókonként körbejáró (egy fiók elárasztása nem tolja hátra a többit),
+# és a sorozatos hibás próbálkozás után a fiók egyre hosszabb ideig zárolt.
+PASSWORD_WORKERS = max(1, min(4, os.cpu_count() or 1))
+PASSWORD_QUEUE_MAX = 64             # egyszerre várakozó ellenőrzések száma
+PASSWORD_ACCOUNT_PENDING_MAX = 2    # ennyi várakozhat egy fiókhoz
+PASSWORD_VERIFY_TIMEOUT = 30.0
+LOGIN_FAILURE_LIMIT = 5             # ennyi hiba után kezdődik a zárolás
+LOGIN_FAILURE_WINDOW = 900.0        # ennyi idő után a hibák elévülnek
+LOGIN_LOCKOUT_BASE = 2.0            # első zárolás, utána duplázódik
+LOGIN_LOCKOUT_MAX = 300.0
+LOGIN_TRACKED_ACCOUNTS_MAX = 10000
+
+class _LoginBusy:
+    """
+    A verify() "foglalt" eredménye: az ellenőrzés el sem indult, mert a fiókhoz
+    már túl sok várakozik, vagy a munkaszálak nem értek rá. Hamis értékű, így a
+    régi `if verify(...)` hívók elutasításnak veszik, de a felület nem hibás
+    jelszót, hanem "próbáld újra" üzenetet mutat.
+    """
+    __slots__ = ()
+    
+    def __bool__(self):
+        return False
+    
+    def __repr__(self):
+        return "LOGIN_BUSY"
+
+LOGIN_BUSY = _LoginBusy()
+
+class _PendingVerification:
+    __slots__ = ("password", "hashed", "result", "cancelled", "done")
+    
+    def __init__(self, password, hashed):
+        self.password = password
+        self.hashed = hashed
+        self.result = False
+        self.cancelled = False
+        self.done = threading.Event()
+
+class PasswordVerifier:
+    """
+    Jelszó-ellenőrző munkaszálak fiókonként körbejáró sorral és
+    fiókonkénti zárolással a sorozatos hibás próbálkozások ellen.
+    """
+    
+    def __init__(self, workers=PASSWORD_WORKERS, max_pending=PASSWORD_QUEUE_MAX,
+                 account_pending_max=PASSWORD_ACCOUNT_PENDING_MAX):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.account_pending_max = account_pending_max
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._space = threading.Condition(self._lock)
+        self._accounts = OrderedDict()  # fiók -> várakozó ellenőrzések deque-ja
+        self._pending = 0
+        self._failures = {}  # fiók -> [hibák száma, utolsó hiba ideje, zárolás vége]
+        self._threads = []
+    
+    def _ensure_started(self):
+        if len(self._threads) >= self.workers and all(t.is_alive() for t in self._threads):
+            return
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f"password-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+    
+    def retry_after(self, account):
+        """Hány másodperc múlva próbálkozhat újra a fiók (0, ha nincs zárolva)"""
+        with self._lock:
+            return self._retry_after_locked(account, time.monotonic())
+    
+    def _retry_after_locked(self, account, now):
+        entry = self._failures.get(account)
+        if entry is None:
+            return 0.0
+        if now - entry[1] > LOGIN_FAILURE_WINDOW:
+            del self._failures[account]
+            return 0.0
+        return max(0.0, entry[2] - now)
+    
+    def _record_locked(self, account, success, now):
+        if success:
+            self._failures.pop(account, None)
+            return
+        entry = self._failures.get(account)
+        if entry is None or now - entry[1] > LOGIN_FAILURE_WINDOW:
+            if len(self._failures) >= LOGIN_TRACKED_ACCOUNTS_MAX:
+                self._failures = {k: v for k, v in self._failures.items()
+                                  if now - v[1] <= LOGIN_FAILURE_WINDOW}
+            entry = self._failures[account] = [0, now, 0.0]
+        entry[0] += 1
+        entry[1] = now
+        if entry[0] >= LOGIN_FAILURE_LIMIT:
+            lockout = LOGIN_LOCKOUT_BASE * 2 ** min(entry[0] - LOGIN_FAILURE_LIMIT, 16)
+            entry[2] = now + min(LOGIN_LOCKOUT_MAX, lockout)
+    
+    def verify(self, account, password, hashed, timeout=PASSWORD_VERIFY_TIMEOUT):
+        """
+        Jelszó ellenőrzése a munkaszálakon. Zárolt fióknál számolás nélkül
+        False; ha a fiókhoz már túl sok ellenőrzés várakozik, vagy a sor nem
+        ürült ki időben, LOGIN_BUSY (a jelszóról ilyenkor nem tudunk semmit).
+        """
+        self._ensure_started()
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            if self._retry_after_locked(account, time.monotonic()) > 0:
+                return False
+            waiting = self._accounts.get(account)
+            if waiting is not None and len(waiting) >= self.account_pending_max:
+                return LOGIN_BUSY
+            # Teli sornál a hívó vár (visszanyomás), nem a munkaszálak dolgoznak többet
+            while self._pending >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._space.wait(remaining):
+                    return LOGIN_BUSY
+            pending = _PendingVerification(password, hashed)
+            self._accounts.setdefault(account, deque()).append(pending)
+            self._pending += 1
+            self._ready.notify()
+        
+        if not pending.done.wait(max(0.0, deadline - time.monotonic())):
+            pending.cancelled = True
+            return LOGIN_BUSY
+        
+        with self._lock:
+            self._record_locked(account, pending.result, time.monotonic())
+        return pending.result
+    
+    def _take_locked(self):
+        # Körbejárás: a legrégebben sorra került fiók első kérése, a fiók a sor végére kerül
+        account, waiting = next(iter(self._accounts.items()))
+        pending = waiting.popleft()
+        if waiting:
+            self._accounts.move_to_end(account)
+        else:
+            del self._accounts[account]
+        self._pending -= 1
+        self._space.notify()
+        return pending
+    
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._accounts:
+                    self._ready.wait()
+                pending = self._take_locked()
+            if not pending.cancelled:
+                pending.result = verify_password(pending.password, pending.hashed)
+            pending.done.set()
+
+_password_verifier = PasswordVerifier()
+
+def login_retry_after(account):
+    """Zárolt fióknál a hátralévő másodpercek (egész felfelé kerekítve), egyébként 0"""
+    return math.ceil(_password_verifier.retry_after(account))
+
 def verify_teacher_password(password):
     """Tanári jelszó ellenőrzése"""
     config = load_config()
@@ -78,11 +274,14 @@ def verify_teacher_password(password):
             save_config(config)
             return True
         return False
-    return verify_password(password, teacher_hash)
+    return _password_verifier.verify(TEACHER_ACCOUNT, password, teacher_hash)
 
 def change_teacher_password(old_password, new_password):
     """Tanári jelszó megváltoztatása"""
-    if not verify_teacher_password(old_password):
+    verified = verify_teacher_password(old_password)
+    if verified is LOGIN_BUSY:
+        return False, "A szerver most túlterhelt, próbáld újra néhány másodperc múlva"
+    if not verified:
         return False, "Hibás régi jelszó"
     
     config = load_config()
@@ -90,17 +289,278 @@ def change_teacher_password(old_password, new_password):
     save_config(config)
     return True, "Jelszó sikeresen megváltoztatva"
 
+# Fájlfigyelés: a tanári felület (t6.py) külön folyamatként módosítja a
+# quizeket, a konfigurációt és a névsort. A figyelő minden változásnál növeli
+# az adott útvonal "generációját"; a gyorsítótárak ezt hasonlítják össze,
+# így amíg nincs változás, még stat hívás sem kell.
+WATCH_POLL_INTERVAL = 0.5
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_INOTIFY_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM |
+                 _IN_MOVED_TO | _IN_CREATE | _IN_DELETE)
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+def _load_inotify():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+class FileWatcher:
+    """
+    Könyvtárakat figyelő háttérszál. Linuxon inotify-t használ, máshol
+    (vagy ha az nem érhető el) WATCH_POLL_INTERVAL másodpercenként stat-ol.
+    Változáskor növeli az érintett fájl és könyvtár generációját, és
+    meghívja a feliratkozott függvényeket.
+    """
+    
+    def __init__(self, poll_interval=WATCH_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.backend = None
+        self._dirs = {}
+        self._generations = {}
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._inotify = None
+        self._inotify_fd = None
+        self._watch_descriptors = {}
+    
+    @property
+    def active(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def watch(self, path):
+        """Egy fájl vagy könyvtár figyelése (fájlnál a szülőkönyvtárát figyeljük, az atomikus csere miatt)"""
+        path = os.path.abspath(path)
+        directory = path if os.path.isdir(path) else os.path.dirname(path)
+        with self._lock:
+            if directory in self._dirs:
+                return
+            self._dirs[directory] = self._snapshot(directory)
+            if self._inotify_fd is not None:
+                self._add_inotify_watch(directory)
+    
+    def subscribe(self, path, callback):
+        """callback(útvonal) hívása, ha a fájl vagy (könyvtárnál) bármely eleme megváltozik"""
+        self.watch(path)
+        with self._lock:
+            self._subscribers.append((os.path.abspath(path), callback))
+    
+    def generation(self, path):
+        """Az útvonal változásszámlálója, vagy None, ha nincs aktív figyelés rá"""
+        if not self.active:
+            return None
+        path = os.path.abspath(path)
+        if path not in self._dirs and os.path.dirname(path) not in self._dirs:
+            return None
+        return self._generations.get(path, 0)
+    
+    def start(self):
+        if self.active:
+            return
+        libc = _load_inotify()
+        if libc is not None:
+            fd = libc.inotify_init1(os.O_CLOEXEC)
+            if fd >= 0:
+                self._inotify = libc
+                self._inotify_fd = fd
+                with self._lock:
+                    for directory in self._dirs:
+                        self._add_inotify_watch(directory)
+        
+        self.backend = "inotify" if self._inotify_fd is not None else "polling"
+        target = self._run_inotify if self._inotify_fd is not None else self._run_polling
+        self._thread = threading.Thread(target=target, name="file-watcher", daemon=True)
+        self._thread.start()
+    
+    def _add_inotify_watch(self, directory):
+        wd = self._inotify.inotify_add_watch(self._inotify_fd, os.fsencode(directory), _INOTIFY_MASK)
+        if wd >= 0:
+            self._watch_descriptors[wd] = directory
+    
+    def _publish(self, changed_paths):
+        with self._lock:
+            for path in changed_paths:
+                self._generations[path] = self._generations.get(path, 0) + 1
+            subscribers = list(self._subscribers)
+        
+        for watched, callback in subscribers:
+            for path in changed_paths:
+                if path == watched or os.path.dirname(path) == watched:
+                    try:
+                        callback(path)
+                    except Exception:
+                        pass
+    
+    def _run_inotify(self):
+        while True:
+            try:
+                data = os.read(self._inotify_fd, 64 * 1024)
+            except InterruptedError:
+                continue
+            except OSError:
+                # Ha az inotify leáll, lekérdezéses módban folytatjuk
+                self.backend = "polling"
+                self._run_polling()
+                return
+            
+            changed = set()
+            offset = 0
+            while offset + _INOTIFY_EVENT.size <= len(data):
+                wd, mask, _cookie, name_length = _INOTIFY_EVENT.unpack_from(data, offset)
+                name = data[offset + _INOTIFY_EVENT.size:offset + _INOTIFY_EVENT.size + name_length]
+                offset += _INOTIFY_EVENT.size + name_length
+                
+                if mask & _IN_Q_OVERFLOW:
+                    # Elveszett események: mindent érvénytelenítünk
+                    for directory, snapshot in self._dirs.items():
+                        changed.add(directory)
+                        changed.update(os.path.join(directory, n) for n in snapshot)
+                    continue
+                
+                directory = self._watch_descriptors.get(wd)
+                if directory is None:
+                    continue
+                changed.add(directory)
+                name = name.rstrip(b"\0")
+                if name:
+                    changed.add(os.path.join(directory, os.fsdecode(name)))
+            
+            if changed:
+                self._publish(changed)
+    
+    @staticmethod
+    def _snapshot(directory):
+        snapshot = {}
+        try:
+            for entry in os.scandir(directory):
+                try:
+                    stat_result = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                snapshot[entry.name] = (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+        except OSError:
+            pass
+        return snapshot
+    
+    def _run_polling(self):
+        while True:
+            time.sleep(self.poll_interval)
+            changed = set()
+            with self._lock:
+                directories = list(self._dirs.items())
+            for directory, previous in directories:
+                current = self._snapshot(directory)
+                names = {n for n in set(previous) | set(current) if previous.get(n) != current.get(n)}
+                if names:
+                    changed.add(directory)
+                    changed.update(os.path.join(directory, n) for n in names)
+                with self._lock:
+                    self._dirs[directory] = current
+            if changed:
+                self._publish(changed)
+
+_file_watcher = FileWatcher()
+
+def start_file_watcher():
+    """A quizek, a konfiguráció és a névsor figyelésének indítása (egyszer folyamatonként)"""
+    _file_watcher.watch(QUIZ_CONFIG_FILE)
+    _file_watcher.watch(STUDENTS_FILE)
+    if os.path.exists(QUIZZES_DIR):
+        _file_watcher.subscribe(QUIZZES_DIR, _on_quiz_file_changed)
+    _file_watcher.start()
+
 # Konfiguráció betöltése és mentése
-def load_config():
+# A feldolgozott konfiguráció folyamatszinten gyorsítótárazva; a fájl
+# módosítási ideje és mérete alapján érvénytelenítjük
+_config_cache = {"signature": None, "config": None, "generation": None}
+_config_lock = threading.Lock()
+
+def _file_signature(path):
     try:
-        with open(QUIZ_CONFIG_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except:
-        return {"active_quiz": "magyar_foldrajz", "quiz_settings": {}}
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+
+def _unique_tmp_path(path):
+    # Folyamatonként és szálanként egyedi ideiglenes fájl, hogy az írók ne írják felül egymásét
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+def _write_bytes_atomic(path, data):
+    """Teljes fájl cseréje egyedi ideiglenes fájlon keresztül; hibánál az ideiglenes fájl törlődik"""
+    tmp_path = _unique_tmp_path(path)
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _write_json_atomic(path, data, indent=None):
+    _write_bytes_atomic(path, json.dumps(data, indent=indent, ensure_ascii=False).encode('utf-8'))
+
+def _cached_config(check_file=False):
+    """
+    A közös, gyorsítótárazott példány - csak olvasásra! check_file=True esetén
+    a fájlfigyelő generációja helyett mindig a fájl aláírását nézi (ha egy
+    másik folyamat épp most írta át, a figyelő értesítése még késhet).
+    """
+    # Aktív fájlfigyelésnél a generáció egyezése elég, stat sem kell
+    generation = _file_watcher.generation(QUIZ_CONFIG_FILE)
+    cached = _config_cache
+    if (not check_file and generation is not None and cached["generation"] == generation
+            and cached["config"] is not None):
+        return cached["config"]
+    
+    signature = _file_signature(QUIZ_CONFIG_FILE)
+    if signature is not None and cached["signature"] == signature:
+        cached["generation"] = generation
+        return cached["config"]
+    
+    with _config_lock:
+        if signature is not None and _config_cache["signature"] == signature:
+            return _config_cache["config"]
+        try:
+            with open(QUIZ_CONFIG_FILE, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except:
+            return {"active_quiz": "magyar_foldrajz", "quiz_settings": {}}
+        _config_cache["signature"] = signature
+        _config_cache["config"] = config
+        _config_cache["generation"] = generation
+        return config
+
+def load_config():
+    """A konfiguráció másolata, a hívó szabadon módosíthatja és visszamentheti"""
+    return copy.deepcopy(_cached_config())
 
 def save_config(config):
-    with open(QUIZ_CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=2, ensure_ascii=False)
+    with _config_lock:
+        _write_json_atomic(QUIZ_CONFIG_FILE, config, indent=2)
+        # Write-through: a következő olvasás nem parse-olja újra a fájlt
+        _config_cache["signature"] = _file_signature(QUIZ_CONFIG_FILE)
+        _config_cache["config"] = copy.deepcopy(config)
+        _config_cache["generation"] = None
 
 # Inicializálás
 def init_data():
@@ -114,6 +574,9 @@ def init_data():
     if not os.path.exists(IMAGES_DIR):
         os.makedirs(IMAGES_DIR)
     
+    if not os.path.exists(QUIZ_INDEX_DIR):
+        os.makedirs(QUIZ_INDEX_DIR)
+    
     config = load_config()
     
     if "teacher_password_hash" not in config:
@@ -127,6 +590,8 @@ def init_data():
         }
         with open(STUDENTS_FILE, 'w', encoding='utf-8') as f:
             json.dump(default_students, f, indent=2, ensure_ascii=False)
+    
+    start_file_watcher()
 
 def create_sample_quizzes():
     magyar_foldrajz = [
@@ -143,76 +608,373 @@ def create_sample_quizzes():
         json.dump(magyar_foldrajz, f, indent=2, ensure_ascii=False)
 
 # Diák adatok kezelése
+# A névsor folyamatszinten, memóriában indexelve: diák azonosító -> osztály és
+# kisbetűs email -> diák azonosító. A fájlfigyelő generációja (vagy a fájl
+# aláírása) alapján frissül; a saját módosítások write-through módon az
+# indexbe és a fájlba is bekerülnek, így utána nem kell újraolvasni.
+class StudentDirectory:
+    """A students.json memóriabeli indexe állandó idejű keresésekkel"""
+    
+    def __init__(self, path=STUDENTS_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._data = None
+        self._class_of = {}
+        self._by_email = {}
+        self._signature = None
+        self._generation = None
+    
+    def _current(self):
+        """A közös, indexelt példány - csak olvasásra!"""
+        generation = _file_watcher.generation(self.path)
+        if generation is not None and self._generation == generation and self._data is not None:
+            return self._data
+        
+        signature = _file_signature(self.path)
+        if signature is not None and self._signature == signature and self._data is not None:
+            self._generation = generation
+            return self._data
+        
+        with self._lock:
+            if signature is not None and self._signature == signature and self._data is not None:
+                return self._data
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except:
+                data = {"classes": {}, "students": {}}
+            data.setdefault("classes", {})
+            data.setdefault("students", {})
+            self._reindex(data)
+            self._signature = signature
+            self._generation = generation
+            return data
+    
+    def _reindex(self, data):
+        class_of = {}
+        by_email = {}
+        for class_name, members in data["classes"].items():
+            for student_id, record in members.items():
+                class_of[student_id] = class_name
+                by_email[str(record.get("email", student_id)).lower()] = student_id
+        self._class_of = class_of
+        self._by_email = by_email
+        self._data = data
+    
+    def _write(self, data):
+        # Atomikus csere, utána az aláírás már az új fájlé: nincs újraolvasás
+        _write_json_atomic(self.path, data, indent=2)
+        self._signature = _file_signature(self.path)
+        self._generation = None
+    
+    def snapshot(self):
+        """Szerkeszthető másolat (a régi load_students() formában)"""
+        with self._lock:
+            return copy.deepcopy(self._current())
+    
+    def replace(self, data):
+        with self._lock:
+            data = copy.deepcopy(data)
+            data.setdefault("classes", {})
+            data.setdefault("students", {})
+            self._write(data)
+            self._reindex(data)
+    
+    def classes(self):
+        return list(self._current()["classes"].keys())
+    
+    def members(self, class_name):
+        return self._current()["classes"].get(class_name, {})
+    
+    def email_exists(self, email):
+        self._current()
+        return str(email).lower() in self._by_email
+    
+    def login(self, student_id):
+        """(diák adatai, tárolt jelszó hash) vagy None"""
+        data = self._current()
+        student_info = data["students"].get(student_id)
+        if student_info is None:
+            return None
+        class_name = student_info["class"]
+        if student_id not in data["classes"].get(class_name, {}):
+            return None
+        stored_hash = data["classes"][class_name][student_id]["password_hash"]
+        return {
+            "name": student_info["name"],
+            "email": student_info["email"],
+            "class": class_name
+        }, stored_hash
+    
+    def add_class(self, class_name):
+        with self._lock:
+            data = self._current()
+            if class_name in data["classes"]:
+                return False
+            data["classes"][class_name] = {}
+            self._write(data)
+            return True
+    
+    def add(self, class_name, student_name, email, password_hash):
+        with self._lock:
+            data = self._current()
+            student_id = email.lower()
+            # Ha már máshol szerepelt, onnan kikerül (a régi add_student felülírta a bejegyzést)
+            previous_class = self._class_of.get(student_id)
+            if previous_class is not None and previous_class != class_name:
+                data["classes"][previous_class].pop(student_id, None)
+            
+            data["classes"].setdefault(class_name, {})[student_id] = {
+                "name": student_name,
+                "email": email,
+                "password_hash": password_hash
+            }
+            data["students"][student_id] = {
+                "name": student_name,
+                "email": email,
+                "class": class_name
+            }
+            self._write(data)
+            self._class_of[student_id] = class_name
+            self._by_email[email.lower()] = student_id
+    
+    def delete(self, class_name, student_id):
+        with self._lock:
+            data = self._current()
+            members = data["classes"].get(class_name)
+            if members is None or student_id not in members:
+                return False
+            record = members.pop(student_id)
+            data["students"].pop(student_id, None)
+            self._write(data)
+            self._class_of.pop(student_id, None)
+            self._by_email.pop(str(record.get("email", student_id)).lower(), None)
+            return True
+
+_student_directory = StudentDirectory()
+
 def load_students():
-    try:
-        with open(STUDENTS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except:
-        return {"classes": {}, "students": {}}
+    """A névsor másolata, a hívó szabadon módosíthatja és visszamentheti"""
+    return _student_directory.snapshot()
 
 def save_students(students_data):
-    with open(STUDENTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(students_data, f, indent=2, ensure_ascii=False)
+    _student_directory.replace(students_data)
 
 def get_classes():
-    students_data = load_students()
-    return list(students_data.get("classes", {}).keys())
+    return _student_directory.classes()
 
 def get_students_in_class(class_name):
-    students_data = load_students()
-    return students_data.get("classes", {}).get(class_name, {})
+    """Az osztály tagjai - a közös példány, csak olvasásra!"""
+    return _student_directory.members(class_name)
+
+def student_email_exists(email):
+    return _student_directory.email_exists(email)
+
+def add_class(class_name):
+    return _student_directory.add_class(class_name)
 
 def add_student(class_name, student_name, email, password):
-    students_data = load_students()
-    
-    if class_name not in students_data["classes"]:
-        students_data["classes"][class_name] = {}
-    
-    student_id = email.lower()
-    students_data["classes"][class_name][student_id] = {
-        "name": student_name,
-        "email": email,
-        "password_hash": hash_password(password)
-    }
-    
-    students_data["students"][student_id] = {
-        "name": student_name,
-        "email": email,
-        "class": class_name
-    }
-    
-    save_students(students_data)
+    _student_directory.add(class_name, student_name, email, hash_password(password))
 
 def delete_student(class_name, student_id):
-    students_data = load_students()
-    
-    if class_name in students_data["classes"] and student_id in students_data["classes"][class_name]:
-        del students_data["classes"][class_name][student_id]
-        
-        if student_id in students_data["students"]:
-            del students_data["students"][student_id]
-        
-        save_students(students_data)
-        return True
-    return False
+    return _student_directory.delete(class_name, student_id)
+
+def get_student_login(student_id):
+    """(diák adatai, tárolt jelszó hash) vagy None, ha nincs ilyen (osztályba sorolt) diák"""
+    return _student_directory.login(student_id)
 
 def authenticate_student(email, password):
-    students_data = load_students()
-    student_id = email.lower()
-    
-    if student_id in students_data["students"]:
-        student_info = students_data["students"][student_id]
-        class_name = student_info["class"]
-        
-        if class_name in students_data["classes"] and student_id in students_data["classes"][class_name]:
-            stored_hash = students_data["classes"][class_name][student_id]["password_hash"]
-            if verify_password(password, stored_hash):
-                return {
-                    "name": student_info["name"],
-                    "email": student_info["email"],
-                    "class": class_name
-                }
-    return None
+    """A diák adatai, None hibás belépésnél, vagy LOGIN_BUSY, ha az ellenőrzés nem fért sorra"""
+    login = get_student_login(email.lower())
+    if login is None:
+        return None
+    verified = _password_verifier.verify(email.lower(), password, login[1])
+    if verified is LOGIN_BUSY:
+        return LOGIN_BUSY
+    return login[0] if verified else None
+
+# Munkamenet tokenek: frissítés vagy megszakadt kapcsolat után a böngésző az
+# URL-ben (st.query_params) őrzött, HMAC-kel aláírt tokennel lép vissza, így
+# nem kell újra PBKDF2-t számolni. A token rövid életű, és a jelszó hash
+# lenyomatát is tartalmazza, így jelszócserénél érvényét veszti. A munkamenet
+# (pl. félbehagyott kitöltés) állapota a folyamat memóriájában marad meg.
+#
+# Kockázat: az URL-ben lévő token a böngésző előzményeibe, a könyvjelzőkbe, a
+# proxy- és szervernaplókba is bekerülhet, és aki megszerzi, a lejáratig belép
+# vele. Ezért minden visszalépés elhasználja a tokent, és új azonosítóval újat
+# ad ki (a régi ismételt felhasználását elutasítjuk). Az elhasznált azonosítók
+# csak a folyamat memóriájában vannak: újraindítás után a még le nem járt régi
+# token egyszer újra használható. Megosztott gépen mindig ki kell jelentkezni.
+SESSION_TOKEN_PARAM = "session"
+SESSION_TOKEN_TTL = 2 * 3600
+SESSION_SNAPSHOT_MAX = 2048
+# Az aláíró kulcs: környezeti változóból, vagy egy csak a tulajdonos által
+# olvasható (0600), verziókezelésbe nem kerülő fájlból
+SESSION_SECRET_ENV = "QUIZ_SESSION_SECRET"
+SESSION_SECRET_FILE = "session_secret.key"
+_session_secret_lock = threading.Lock()
+_session_secret_value = None
+_session_snapshots = OrderedDict()  # munkamenet azonosító -> (lejárat, állapot)
+_consumed_sessions = OrderedDict()  # elhasznált munkamenet azonosító -> a token lejárata
+_session_snapshots_lock = threading.Lock()
+
+def _read_session_secret_file():
+    with open(SESSION_SECRET_FILE, 'r', encoding='ascii') as f:
+        return bytes.fromhex(f.read().strip())
+
+def _session_secret():
+    global _session_secret_value
+    if _session_secret_value is not None:
+        return _session_secret_value
+    with _session_secret_lock:
+        if _session_secret_value is not None:
+            return _session_secret_value
+        secret = os.environ.get(SESSION_SECRET_ENV)
+        if secret:
+            _session_secret_value = secret.encode("utf-8")
+            return _session_secret_value
+        try:
+            fd = os.open(SESSION_SECRET_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            # Másik folyamat hozta létre: megvárjuk, míg a kulcs beíródik
+            for _ in range(50):
+                try:
+                    _session_secret_value = _read_session_secret_file()
+                except ValueError:
+                    _session_secret_value = None
+                if _session_secret_value:
+                    return _session_secret_value
+                time.sleep(0.01)
+            raise RuntimeError(f"Érvénytelen munkamenet kulcs: {SESSION_SECRET_FILE}")
+        secret = secrets.token_bytes(32)
+        with os.fdopen(fd, 'w', encoding='ascii') as f:
+            f.write(secret.hex())
+        _session_secret_value = secret
+        return secret
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def credential_tag(stored_hash):
+    """A tárolt jelszó hash rövid lenyomata: jelszócsere után a régi tokenek érvénytelenek"""
+    return hashlib.sha256(str(stored_hash).encode()).hexdigest()[:16]
+
+def new_session_id():
+    return secrets.token_urlsafe(12)
+
+def issue_session_token(role, subject, stored_hash, session_id, ttl=SESSION_TOKEN_TTL):
+    payload = json.dumps({"r": role, "s": subject, "c": credential_tag(stored_hash),
+                          "n": session_id, "e": int(time.time()) + ttl},
+                         separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    signature = hmac.new(_session_secret(), payload, hashlib.sha256).digest()
+    return _b64encode(payload) + "." + _b64encode(signature)
+
+def verify_session_token(token, role):
+    """A token tartalma (dict), ha az aláírás helyes, a szerep egyezik és nem járt le; egyébként None"""
+    if not token or not isinstance(token, str) or len(token) > 1024:
+        return None
+    try:
+        payload_text, signature_text = token.split(".")
+        payload = _b64decode(payload_text)
+        signature = _b64decode(signature_text)
+    except (ValueError, TypeError):
+        return None
+    expected = hmac.new(_session_secret(), payload, hashlib.sha256).digest()
+    if not hmac.compare_digest(signature, expected):
+        return None
+    try:
+        claims = json.loads(payload)
+    except ValueError:
+        return None
+    if not isinstance(claims, dict) or claims.get("r") != role or claims.get("e", 0) < time.time():
+        return None
+    return claims
+
+def _consume_session(claims):
+    """
+    A tokenben lévő munkamenet azonosítót elhasználja, és új azonosítót ad,
+    amelyre az elmentett állapot átkerül. Már elhasznált azonosítónál None.
+    """
+    session_id = claims.get("n")
+    now = time.time()
+    with _session_snapshots_lock:
+        while _consumed_sessions and next(iter(_consumed_sessions.values())) < now:
+            _consumed_sessions.popitem(last=False)
+        if not session_id or session_id in _consumed_sessions:
+            return None
+        _consumed_sessions[session_id] = claims.get("e", now)
+        while len(_consumed_sessions) > 8 * SESSION_SNAPSHOT_MAX:
+            _consumed_sessions.popitem(last=False)
+        new_id = new_session_id()
+        entry = _session_snapshots.pop(session_id, None)
+        if entry is not None:
+            _session_snapshots[new_id] = entry
+    return new_id
+
+def student_session_token(student_id, session_id):
+    login = get_student_login(student_id)
+    if login is None:
+        return None
+    return issue_session_token("student", student_id, login[1], session_id)
+
+def restore_student_login(token):
+    """
+    (diák adatai, új munkamenet azonosító) érvényes, még fel nem használt
+    tokenből, különben None. A hívó az új azonosítóval ad ki új tokent.
+    """
+    claims = verify_session_token(token, "student")
+    if claims is None:
+        return None
+    login = get_student_login(claims.get("s"))
+    if login is None or not hmac.compare_digest(str(claims.get("c")), credential_tag(login[1])):
+        return None
+    session_id = _consume_session(claims)
+    if session_id is None:
+        return None
+    return login[0], session_id
+
+def teacher_session_token(session_id):
+    teacher_hash = _cached_config().get("teacher_password_hash")
+    if not teacher_hash:
+        return None
+    return issue_session_token("teacher", TEACHER_ACCOUNT, teacher_hash, session_id)
+
+def restore_teacher_login(token):
+    """Új munkamenet azonosító érvényes, még fel nem használt tanári tokenből, különben None"""
+    claims = verify_session_token(token, "teacher")
+    teacher_hash = _cached_config().get("teacher_password_hash")
+    if claims is None or not teacher_hash:
+        return None
+    if not hmac.compare_digest(str(claims.get("c")), credential_tag(teacher_hash)):
+        return None
+    return _consume_session(claims)
+
+def save_session_snapshot(session_id, state):
+    """A munkamenet visszaállítandó kulcsainak sekély másolata (a listák is másolódnak)"""
+    snapshot = {key: list(value) if isinstance(value, list) else value for key, value in state.items()}
+    with _session_snapshots_lock:
+        _session_snapshots[session_id] = (time.time() + SESSION_TOKEN_TTL, snapshot)
+        _session_snapshots.move_to_end(session_id)
+        while len(_session_snapshots) > SESSION_SNAPSHOT_MAX:
+            _session_snapshots.popitem(last=False)
+
+def load_session_snapshot(session_id):
+    with _session_snapshots_lock:
+        entry = _session_snapshots.get(session_id)
+        if entry is None:
+            return {}
+        if entry[0] < time.time():
+            del _session_snapshots[session_id]
+            return {}
+        snapshot = entry[1]
+    return {key: list(value) if isinstance(value, list) else value for key, value in snapshot.items()}
+
+def drop_session_snapshot(session_id):
+    with _session_snapshots_lock:
+        _session_snapshots.pop(session_id, None)
 
 # Képkezelés funkciók
 def save_image(uploaded_file, quiz_id, question_index):
@@ -252,169 +1014,2952 @@ def delete_image(filename):
             os.remove(image_path)
 
 # Quiz adatok betöltése és mentése
-def load_quiz(quiz_id):
+def _read_quiz_file(quiz_id):
     try:
         with open(os.path.join(QUIZZES_DIR, f"{quiz_id}.json"), 'r', encoding='utf-8') as f:
-            quiz_data = json.load(f)
-            for question in quiz_data:
-                if question["type"] == "single" and isinstance(question["answer"], list):
-                    if question["answer"]:
-                        question["answer"] = question["answer"][0]
-                    else:
-                        question["answer"] = ""
-            return quiz_data
+            # A nem objektum elemeket kihagyjuk, a kérdésenkénti ellenőrzés a _load_question() dolga
+            return [_normalize_question(question) for question in json.load(f) if isinstance(question, dict)]
     except:
         return []
 
-def save_quiz(quiz_id, quiz_data):
-    with open(os.path.join(QUIZZES_DIR, f"{quiz_id}.json"), 'w', encoding='utf-8') as f:
-        json.dump(quiz_data, f, indent=2, ensure_ascii=False)
-
-def get_available_quizzes(for_student=False):
-    quizzes = {}
-    if os.path.exists(QUIZZES_DIR):
-        for file in os.listdir(QUIZZES_DIR):
-            if file.endswith('.json'):
-                quiz_id = file[:-5]
-                try:
-                    quiz_data = load_quiz(quiz_id)
-                    if quiz_data and len(quiz_data) > 0:
-                        # Diákoknak csak a látható quizeket jelenítjük meg
-                        if for_student:
-                            config = load_config()
-                            quiz_settings = config.get("quiz_settings", {}).get(quiz_id, {})
-                            if not quiz_settings.get("visible_to_students", False):
-                                continue
-                        
-                        quizzes[quiz_id] = {
-                            "name": quiz_data[0].get("quiz_name", quiz_id.replace("_", " ").title()),
-                            "question_count": len(quiz_data)
-                        }
-                except:
-                    continue
-    return quizzes
+def _load_question(data, quiz_id=None):
+    """
+    Question a nyers bejegyzésből, vagy None, ha hibás (nem objektum, vagy a
+    válaszkulcs nem állítható elő, pl. "answer": 5, "sig_figs": "abc"). A hibás
+    kérdést kihagyjuk és naplózzuk, a quiz többi része használható marad.
+    """
+    if not isinstance(data, dict):
+        return None
+    try:
+        return Question(_normalize_question(data))
+    except (TypeError, ValueError, AttributeError) as e:
+        _log.warning("Hibás kérdés kihagyva (%s): %s", quiz_id, e)
+        return None
 
-# Eredmények kezelése quiz-enként
-def get_results_file(quiz_id):
-    return os.path.join(QUIZ_RESULTS_DIR, f"{quiz_id}_results.csv")
+def _normalize_question(question):
+    if question.get("type") == "single" and isinstance(question.get("answer"), list):
+        if question["answer"]:
+            question["answer"] = question["answer"][0]
+        else:
+            question["answer"] = ""
+    return question
 
-def load_results(quiz_id):
-    results_file = get_results_file(quiz_id)
-    if os.path.exists(results_file):
-        return pd.read_csv(results_file)
-    else:
-        return pd.DataFrame(columns=[
-            "student_name", "student_email", "score", "total_questions", "percentage", 
-            "timestamp", "answers", "class", "max_points", "grade", "quiz_id"
-        ])
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    return value
 
-def save_results(quiz_id, results_df):
-    results_file = get_results_file(quiz_id)
-    results_df.to_csv(results_file, index=False)
+def to_plain(value):
+    """Befagyasztott érték visszaalakítása JSON-ba írható list/dict formára"""
+    if isinstance(value, tuple):
+        return [to_plain(v) for v in value]
+    if isinstance(value, Mapping):
+        return {k: to_plain(v) for k, v in value.items()}
+    return value
 
-# Osztályzat kalkulátor függvény
-def calculate_grade(percentage):
-    if percentage < 40:
-        return 1
-    elif 40 <= percentage < 55:
-        return 2
-    elif 55 <= percentage < 70:
-        return 3
-    elif 70 <= percentage < 85:
-        return 4
-    else:
-        return 5
+def _intern(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return tuple(_intern(v) for v in value)
+    return _freeze(value)
 
-def normalize_text(text):
-    if text is None:
-        return ""
-    return re.sub(r'\s+', ' ', str(text).strip().lower())
+_QUESTION_FIELDS = ("question", "type", "options", "answer", "points", "match_type", "image", "quiz_name")
+_QUESTION_FIELD_SET = frozenset(_QUESTION_FIELDS)
+_MISSING = object()
 
-def parse_number(text):
+class Question(Mapping):
     """
-    Szöveges bemenetet számmá alakít, támogatja a tört formátumot is.
-    Pl.: "29/5" -> 5.8, "13/10" -> 1.3, "18/5" -> 3.6
+    Tömör, megváltoztathatatlan kérdés. A mezők __slots__-ban vannak, a
+    válaszlehetőségek és a helyes válaszok internált szövegek tuple-jei,
+    így egy kérdéssort minden munkamenet közösen használ. Dict-szerűen
+    olvasható (q["type"], q.get(...), "image" in q); a JSON formára a
+    to_dict() / quiz_to_json() alakít vissza.
     """
-    if text is None:
-        return None
+    __slots__ = _QUESTION_FIELDS + ("extra", "answer_key")
     
-    text = normalize_text(text)
+    def __init__(self, data):
+        for field in _QUESTION_FIELDS:
+            value = data.get(field, _MISSING)
+            if value is not _MISSING and field != "question":
+                value = _intern(value)
+            object.__setattr__(self, field, value)
+        extra = {k: _freeze(v) for k, v in data.items() if k not in _QUESTION_FIELD_SET}
+        object.__setattr__(self, "extra", MappingProxyType(extra) if extra else None)
+        # Szöveges kérdésnél a helyes válaszok egyszer, betöltéskor dolgozódnak fel
+        answer_key = None
+        if self.type == "text" and self.answer is not _MISSING:
+            match_type = self.match_type if self.match_type is not _MISSING else "exact"
+            options = {name: self.extra.get(name) for name in ANSWER_KEY_OPTIONS} if self.extra is not None else {}
+            answer_key = compile_answer_key(self.answer, match_type, **options)
+        object.__setattr__(self, "answer_key", answer_key)
     
-    if '/' in text:
-        parts = text.split('/')
-        if len(parts) == 2:
-            try:
-                numerator = float(parts[0])
-                denominator = float(parts[1])
-                if denominator != 0:
-                    return numerator / denominator
-            except (ValueError, ZeroDivisionError):
-                pass
+    def __setattr__(self, name, value):
+        raise TypeError("'Question' object is immutable")
     
-    try:
-        return float(text.replace(',', '.'))
-    except ValueError:
-        return None
-
-def evaluate_text_answer(student_answer, correct_answers, match_type="exact"):
-    student_normalized = normalize_text(student_answer)
+    def __getitem__(self, key):
+        if key in _QUESTION_FIELD_SET:
+            value = getattr(self, key)
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        if self.extra is not None:
+            return self.extra[key]
+        raise KeyError(key)
     
-    if match_type == "number":
-        student_num = parse_number(student_answer)
-        if student_num is None:
-            return False
-        
-        correct_nums = []
-        for ca in correct_answers:
-            num = parse_number(ca)
-            if num is not None:
-                correct_nums.append(num)
-        
-        if not correct_nums:
-            return False
-        
-        return any(abs(student_num - correct_num) < 0.001 for correct_num in correct_nums)
+    def __contains__(self, key):
+        if key in _QUESTION_FIELD_SET:
+            return getattr(self, key) is not _MISSING
+        return self.extra is not None and key in self.extra
     
-    elif match_type == "contains":
-        correct_normalized = [normalize_text(ca) for ca in correct_answers]
-        return any(correct in student_normalized for correct in correct_normalized)
+    def __iter__(self):
+        for field in _QUESTION_FIELDS:
+            if getattr(self, field) is not _MISSING:
+                yield field
+        if self.extra is not None:
+            yield from self.extra
     
-    else:
-        correct_normalized = [normalize_text(ca) for ca in correct_answers]
-        return student_normalized in correct_normalized
+    def __len__(self):
+        return sum(1 for _ in self)
+    
+    def __repr__(self):
+        return f"Question({self.to_dict()!r})"
+    
+    def with_options(self, options):
+        """Új nézet más válaszlehetőség-sorrenddel; a többi mező közös"""
+        view = object.__new__(Question)
+        for field in self.__slots__:
+            object.__setattr__(view, field, getattr(self, field))
+        object.__setattr__(view, "options", tuple(options))
+        return view
+    
+    def to_dict(self):
+        """Visszaalakítás a quiz JSON formátumára (új, szerkeszthető list/dict értékekkel)"""
+        return {key: to_plain(self[key]) for key in self}
 
-# Kérdéstípusok címkéi
-type_labels = {
-    "single": "Egyszeres választós",
-    "multiple": "Többszörös választós", 
-    "text": "Szöveges válasz"
-}
+def quiz_to_json(quiz_data):
+    """Kérdéssor JSON-ba írható formára (Question és dict elemeket is elfogad)"""
+    return [q.to_dict() if isinstance(q, Question) else q for q in quiz_data]
 
-def get_randomized_quiz(quiz_data):
-    randomized_quiz = quiz_data.copy()
-    random.shuffle(randomized_quiz)
+# Feldolgozott quizek közös, méretkorlátos LRU gyorsítótára. Egy bejegyzés
+# addig érvényes, amíg a fájl inode-ja, módosítási ideje és mérete nem változik.
+QUIZ_CACHE_SIZE = 32
+
+_quiz_cache = OrderedDict()
+_quiz_cache_lock = threading.Lock()
+
+# A lecserélt kérdéssor-változatok egy ideig megmaradnak, hogy a közben
+# elkezdett kitöltések a saját változatukkal folytatódhassanak
+_quiz_old_versions = OrderedDict()
+
+def quiz_version_id(signature):
+    """A quiz fájl aktuális változatának rövid azonosítója (mtime, méret)"""
+    if signature is None:
+        return None
+    _ino, mtime_ns, size = signature
+    return f"{mtime_ns:x}-{size:x}"
+
+def _retire_quiz_entry(quiz_id, cached):
+    """(a hívó tartja a _quiz_cache_lock-ot)"""
+    if cached is None or cached[0] is None:
+        return
+    _quiz_old_versions[(quiz_id, quiz_version_id(cached[0]))] = cached[1]
+    while len(_quiz_old_versions) > QUIZ_CACHE_SIZE:
+        _quiz_old_versions.popitem(last=False)
+
+def _invalidate_quiz_cache(quiz_id):
+    """
+    Saját írás után azonnal (mint a save_config a konfigurációnál): a figyelő
+    generációja csak később, a háttérszálon lép, addig a régi bejegyzés élne.
+    """
+    with _quiz_cache_lock:
+        _retire_quiz_entry(quiz_id, _quiz_cache.pop(quiz_id, None))
+
+def _on_quiz_file_changed(path):
+    """Fájlfigyelő értesítés: a megváltozott quiz kikerül a gyorsítótárból"""
+    name = os.path.basename(path)
+    if name.endswith('.json'):
+        _invalidate_quiz_cache(name[:-5])
+
+def get_quiz_with_version(quiz_id):
+    """(változat azonosító, Question rekordok tuple-je), minden munkamenetnek közösen"""
+    path = os.path.join(QUIZZES_DIR, f"{quiz_id}.json")
+    generation = _file_watcher.generation(path)
     
-    for question in randomized_quiz:
-        if question["type"] in ["single", "multiple"]:
-            options = question["options"].copy()
-            random.shuffle(options)
-            question["options"] = options
+    with _quiz_cache_lock:
+        cached = _quiz_cache.get(quiz_id)
+        if cached is not None and generation is not None and cached[2] == generation:
+            _quiz_cache.move_to_end(quiz_id)
+            return quiz_version_id(cached[0]), cached[1]
     
-    return randomized_quiz
+    signature = _file_signature(path)
+    with _quiz_cache_lock:
+        cached = _quiz_cache.get(quiz_id)
+        if cached is not None and cached[0] == signature:
+            _quiz_cache[quiz_id] = (signature, cached[1], generation)
+            _quiz_cache.move_to_end(quiz_id)
+            return quiz_version_id(signature), cached[1]
+    
+    questions = tuple(question for question in (_load_question(q, quiz_id) for q in _read_quiz_file(quiz_id))
+                      if question is not None)
+    
+    with _quiz_cache_lock:
+        _retire_quiz_entry(quiz_id, _quiz_cache.get(quiz_id))
+        _quiz_cache[quiz_id] = (signature, questions, generation)
+        _quiz_cache.move_to_end(quiz_id)
+        while len(_quiz_cache) > QUIZ_CACHE_SIZE:
+            _quiz_cache.popitem(last=False)
+    return quiz_version_id(signature), questions
 
-def get_random_subset_quiz(quiz_data, num_questions):
-    if num_questions >= len(quiz_data):
-        return get_randomized_quiz(quiz_data)
+def get_quiz(quiz_id):
+    """A quiz kérdései Question rekordok tuple-jeként, minden munkamenetnek közösen"""
+    return get_quiz_with_version(quiz_id)[1]
+
+# Kérdéssor-pillanatképek a lemezen: a kitöltés indításakor a használt
+# változat tartalma quiz_versions/<quiz_id>/<sha256>.json néven (azonos tartalom
+# egyszer), a változat azonosítóból pedig egy <változat>.ref fájl mutat rá.
+# Így egy kitöltés újraindítás után és a tanári felületről is visszanézhető.
+def _quiz_versions_dir(quiz_id):
+    return os.path.join(QUIZ_VERSIONS_DIR, quiz_id)
+
+def _quiz_version_ref(quiz_id, version):
+    return os.path.join(_quiz_versions_dir(quiz_id), f"{version}.ref")
+
+def snapshot_quiz_version(quiz_id, version):
+    """
+    A quiz adott változatának mentése a lemezre, ha még nincs meg. A fájl
+    tartalmát csak akkor vesszük, ha még mindig ez a változat; különben a
+    memóriában megőrzött régi kérdéssort írjuk ki.
+    """
+    if version is None or os.path.exists(_quiz_version_ref(quiz_id, version)):
+        return
+    data = None
+    try:
+        with open(os.path.join(QUIZZES_DIR, f"{quiz_id}.json"), 'rb') as f:
+            stat_result = os.fstat(f.fileno())
+            if quiz_version_id((stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)) == version:
+                data = f.read()
+    except FileNotFoundError:
+        pass
+    if data is None:
+        with _quiz_cache_lock:
+            old = _quiz_old_versions.get((quiz_id, version))
+        if old is None:
+            raise LookupError(f"A(z) '{quiz_id}' quiz {version} változata már nem érhető el, nem menthető el")
+        data = json.dumps(quiz_to_json(old), indent=2, ensure_ascii=False).encode('utf-8')
     
-    selected_questions = random.sample(quiz_data, num_questions)
-    return get_randomized_quiz(selected_questions)
+    digest = hashlib.sha256(data).hexdigest()
+    os.makedirs(_quiz_versions_dir(quiz_id), exist_ok=True)
+    blob_path = os.path.join(_quiz_versions_dir(quiz_id), f"{digest}.json")
+    if not os.path.exists(blob_path):
+        _write_bytes_atomic(blob_path, data)
+    _write_bytes_atomic(_quiz_version_ref(quiz_id, version), digest.encode('ascii'))
 
-def calculate_score(user_answer, correct_answer, question_type, points, match_type="exact"):
-    if question_type == "single":
-        if isinstance(correct_answer, list):
-            if correct_answer:
-                correct_answer = correct_answer[0]
-            else:
+def _load_quiz_snapshot(quiz_id, version):
+    """Egy lemezre mentett változat kérdései, vagy None, ha nincs ilyen pillanatkép"""
+    try:
+        with open(_quiz_version_ref(quiz_id, version), encoding='ascii') as f:
+            digest = f.read().strip()
+        with open(os.path.join(_quiz_versions_dir(quiz_id), f"{digest}.json"), encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    return tuple(question for question in (_load_question(q, quiz_id) for q in data)
+                 if question is not None)
+
+def get_quiz_version(quiz_id, version):
+    """
+    A quiz egy adott változata: az aktuális, a memóriában megőrzött régi vagy a
+    lemezre mentett pillanatkép. Ha egyik sincs meg, LookupError - a rossz
+    kérdéssor csendes visszaadása helyett.
+    """
+    current_version, questions = get_quiz_with_version(quiz_id)
+    if version is None or version == current_version:
+        return questions
+    with _quiz_cache_lock:
+        old = _quiz_old_versions.get((quiz_id, version))
+    if old is not None:
+        return old
+    old = _load_quiz_snapshot(quiz_id, version)
+    if old is None:
+        raise LookupError(f"A(z) '{quiz_id}' quiz {version} változata nem található")
+    with _quiz_cache_lock:
+        _quiz_old_versions[(quiz_id, version)] = old
+        while len(_quiz_old_versions) > QUIZ_CACHE_SIZE:
+            _quiz_old_versions.popitem(last=False)
+    return old
+
+# Kérdésbank index: a quiz JSON tömb elemeinek bájtpozíciói külön fájlban,
+# így nagy bankokból csak a kisorsolt kérdéseket kell beolvasni
+QUIZ_INDEX_MAGIC = b"QIDX3\0\0\0"  # 3: a hibás (nem betölthető) kérdések nincsenek az indexben
+_QUIZ_INDEX_HEADER = struct.Struct("<8sQQQQ")  # magic, inode, mtime_ns, méret, darabszám
+_QUIZ_INDEX_ENTRY = struct.Struct("<QQ")  # eltolás, hossz
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+QUIZ_RECORD_CACHE_SIZE = 4096
+_quiz_record_cache = OrderedDict()
+
+def get_quiz_index_file(quiz_id):
+    return os.path.join(QUIZ_INDEX_DIR, f"{quiz_id}.idx")
+
+def _scan_quiz_records(data):
+    """
+    A JSON tömb betölthető kérdéseinek (eltolás, hossz) párjai a nyers bájtokban.
+    A hibás elemeket a get_quiz() is kihagyja (_load_question), így a sorszámok egyeznek.
+    """
+    # latin-1 dekódolással egy karakter = egy bájt, az UTF-8 többbájtos
+    # sorozatai pedig sosem tartalmaznak JSON szerkezeti karaktert
+    text = data.decode('latin-1')
+    decoder = json.JSONDecoder()
+    pos = _JSON_WHITESPACE.match(text, 0).end()
+    if text[pos:pos + 1] != '[':
+        raise ValueError("A quiz fájl nem JSON tömb")
+    pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+    entries = []
+    if text[pos:pos + 1] == ']':
+        return entries
+    while True:
+        value, end = decoder.raw_decode(text, pos)
+        # Az ellenőrzéshez a bejegyzést UTF-8-ként újra beolvassuk (a latin-1 szöveg torz)
+        if isinstance(value, dict) and _load_question(json.loads(data[pos:end].decode('utf-8'))) is not None:
+            entries.append((pos, end - pos))
+        pos = _JSON_WHITESPACE.match(text, end).end()
+        if text[pos:pos + 1] == ',':
+            pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+        elif text[pos:pos + 1] == ']':
+            return entries
+        else:
+            raise ValueError(f"Hibás quiz fájl a(z) {pos}. bájtnál")
+
+def _build_quiz_index(quiz_id, f, signature):
+    """Index újraépítése a megnyitott quiz fájlból; a bejegyzések listáját adja vissza"""
+    f.seek(0)
+    entries = _scan_quiz_records(f.read())
+    index_file = get_quiz_index_file(quiz_id)
+    tmp_path = _unique_tmp_path(index_file)
+    try:
+        os.makedirs(QUIZ_INDEX_DIR, exist_ok=True)
+        with open(tmp_path, 'wb') as out:
+            out.write(_QUIZ_INDEX_HEADER.pack(QUIZ_INDEX_MAGIC, *signature, len(entries)))
+            out.write(b"".join(_QUIZ_INDEX_ENTRY.pack(*entry) for entry in entries))
+        os.replace(tmp_path, index_file)
+    except OSError:
+        # Index nélkül is működik, csak legközelebb újra végig kell olvasni
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return entries
+
+def _open_quiz_index(quiz_id, signature):
+    """(megnyitott index, darabszám), ha az index a quiz fájl ezen változatához tartozik"""
+    try:
+        index = open(get_quiz_index_file(quiz_id), 'rb')
+    except OSError:
+        return None
+    header = index.read(_QUIZ_INDEX_HEADER.size)
+    if len(header) == _QUIZ_INDEX_HEADER.size:
+        magic, ino, mtime_ns, size, count = _QUIZ_INDEX_HEADER.unpack(header)
+        expected_size = _QUIZ_INDEX_HEADER.size + count * _QUIZ_INDEX_ENTRY.size
+        if (magic == QUIZ_INDEX_MAGIC and (ino, mtime_ns, size) == signature
+                and os.fstat(index.fileno()).st_size == expected_size):
+            return index, count
+    index.close()
+    return None
+
+def _read_quiz_records(quiz_id, positions=()):
+    """
+    (változat, kérdésszám, a megadott sorszámú kérdések) - az index alapján
+    csak a kért rekordokat olvassa be a quiz fájlból
+    """
+    try:
+        f = open(os.path.join(QUIZZES_DIR, f"{quiz_id}.json"), 'rb')
+    except OSError:
+        return None, 0, []
+    with f:
+        stat_result = os.fstat(f.fileno())
+        signature = (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+        version = quiz_version_id(signature)
+        
+        opened = _open_quiz_index(quiz_id, signature)
+        if opened is not None:
+            index, count = opened
+            with index:
+                entries = []
+                for position in positions:
+                    if not 0 <= position < count:
+                        raise IndexError(position)
+                    index.seek(_QUIZ_INDEX_HEADER.size + position * _QUIZ_INDEX_ENTRY.size)
+                    entries.append(_QUIZ_INDEX_ENTRY.unpack(index.read(_QUIZ_INDEX_ENTRY.size)))
+        else:
+            try:
+                all_entries = _build_quiz_index(quiz_id, f, signature)
+            except ValueError:
+                return version, 0, []
+            count = len(all_entries)
+            entries = [all_entries[position] for position in positions]
+        
+        records = []
+        for offset, length in entries:
+            f.seek(offset)
+            question = json.loads(f.read(length).decode('utf-8'))
+            records.append(_load_question(question, quiz_id))
+    return version, count, records
+
+def get_quiz_question_count(quiz_id):
+    """A quiz kérdéseinek száma az indexből, a kérdések beolvasása nélkül"""
+    return _read_quiz_records(quiz_id)[1]
+
+def _remember_quiz_records(quiz_id, version, positions, records):
+    with _quiz_cache_lock:
+        for position, record in zip(positions, records):
+            _quiz_record_cache[(quiz_id, version, position)] = record
+            _quiz_record_cache.move_to_end((quiz_id, version, position))
+        while len(_quiz_record_cache) > QUIZ_RECORD_CACHE_SIZE:
+            _quiz_record_cache.popitem(last=False)
+
+def get_quiz_question(quiz_id, version, position):
+    """Egy kérdés a quiz adott változatából; ha nincs betöltve, csak ezt az egy rekordot olvassa"""
+    with _quiz_cache_lock:
+        cached = _quiz_cache.get(quiz_id)
+        if cached is not None and quiz_version_id(cached[0]) == version:
+            return cached[1][position]
+        old = _quiz_old_versions.get((quiz_id, version))
+        if old is not None:
+            return old[position]
+        record = _quiz_record_cache.get((quiz_id, version, position))
+        if record is not None:
+            _quiz_record_cache.move_to_end((quiz_id, version, position))
+            return record
+    
+    current_version, _count, records = _read_quiz_records(quiz_id, [position])
+    if current_version != version or not records:
+        # A fájl azóta megváltozott: a megőrzött vagy a lemezre mentett változatból
+        return get_quiz_version(quiz_id, version)[position]
+    _remember_quiz_records(quiz_id, version, [position], records)
+    return records[0]
+
+def load_quiz(quiz_id):
+    """
+    Szerkeszthető másolat (dict-ek listája) a tanári szerkesztőhöz, ami helyben
+    módosítja a kérdéseket. Olvasásra a közös get_quiz() való.
+    """
+    return quiz_to_json(get_quiz(quiz_id))
+
+def save_quiz(quiz_id, quiz_data):
+    path = os.path.join(QUIZZES_DIR, f"{quiz_id}.json")
+    # Az újraértékelés a mentés előtti kulcshoz képest keresi a módosult kérdéseket
+    _remember_grading_state(quiz_id)
+    dir_signature = _dir_signature(QUIZZES_DIR)
+    _write_json_atomic(path, quiz_to_json(quiz_data), indent=2)
+    _invalidate_quiz_cache(quiz_id)
+    _update_catalog_entry(quiz_id, quiz_data, dir_signature)
+
+# Quiz katalógus: név, kérdésszám, pontszám quizenként, hogy a listázáshoz
+# ne kelljen minden kérdéssort beolvasni
+QUIZ_CATALOG_FILE = "quiz_catalog.json"
+
+_catalog_cache = {"signature": None, "catalog": None, "generation": None}
+_catalog_lock = threading.Lock()
+
+def _dir_signature(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def _catalog_entry(quiz_id, quiz_data, stat_result):
+    return {
+        "name": quiz_data[0].get("quiz_name", quiz_id.replace("_", " ").title()) if quiz_data else quiz_id,
+        "question_count": len(quiz_data),
+        "total_points": sum(q.get("points", 0) for q in quiz_data if isinstance(q, Mapping)),
+        "mtime_ns": stat_result.st_mtime_ns,
+        "size": stat_result.st_size,
+        "ino": stat_result.st_ino
+    }
+
+def _catalog_entry_current(known, stat_result):
+    """A bejegyzés a fájl jelenlegi állapotáról szól-e (helyben szerkesztésnél a könyvtár nem változik)"""
+    return (known is not None
+            and known["mtime_ns"] == stat_result.st_mtime_ns
+            and known["size"] == stat_result.st_size
+            and known.get("ino", stat_result.st_ino) == stat_result.st_ino)
+
+def _read_catalog():
+    signature = _file_signature(QUIZ_CATALOG_FILE)
+    if signature is not None and _catalog_cache["signature"] == signature:
+        return _catalog_cache["catalog"]
+    try:
+        with open(QUIZ_CATALOG_FILE, 'r', encoding='utf-8') as f:
+            catalog = json.load(f)
+    except (OSError, ValueError):
+        catalog = {"dir_mtime_ns": None, "quizzes": {}}
+    _catalog_cache["signature"] = signature
+    _catalog_cache["catalog"] = catalog
+    return catalog
+
+def _write_catalog(catalog):
+    _write_json_atomic(QUIZ_CATALOG_FILE, catalog, indent=2)
+    _catalog_cache["signature"] = _file_signature(QUIZ_CATALOG_FILE)
+    _catalog_cache["catalog"] = catalog
+    _catalog_cache["generation"] = None
+
+def _refresh_catalog(catalog):
+    """
+    Fájlonként összeveti az aláírást (mtime, méret, inode) a bejegyzéssel, és
+    csak a megváltozott kérdéssorokat olvassa be újra. Csak változásnál ír.
+    """
+    entries = {}
+    changed = False
+    dir_signature = _dir_signature(QUIZZES_DIR)
+    if os.path.exists(QUIZZES_DIR):
+        for entry in os.scandir(QUIZZES_DIR):
+            if not entry.name.endswith('.json'):
+                continue
+            quiz_id = entry.name[:-5]
+            try:
+                stat_result = entry.stat()
+            except OSError:
+                continue
+            known = catalog["quizzes"].get(quiz_id)
+            if _catalog_entry_current(known, stat_result):
+                entries[quiz_id] = known
+            else:
+                try:
+                    entries[quiz_id] = _catalog_entry(quiz_id, get_quiz(quiz_id), stat_result)
+                except Exception:
+                    # Egy hibás fájl miatt a többi quiz még elérhető marad
+                    _log.exception("A quiz katalógusba vétele nem sikerült (%s)", quiz_id)
+                    continue
+                changed = True
+    
+    if not changed and entries.keys() == catalog["quizzes"].keys() and catalog.get("dir_mtime_ns") == dir_signature:
+        return catalog
+    catalog = {"dir_mtime_ns": dir_signature, "quizzes": entries}
+    _write_catalog(catalog)
+    return catalog
+
+def load_quiz_catalog():
+    """
+    A katalógus. Aktív fájlfigyelésnél csak a quizzes könyvtár generációjának
+    változásakor (ez egy fájl helyben szerkesztésére is nő) nézi végig a
+    fájlokat, egyébként minden hívásnál: ez fájlonként egy stat, olvasás nélkül.
+    """
+    generation = _file_watcher.generation(QUIZZES_DIR)
+    cached = _catalog_cache
+    if generation is not None and cached["generation"] == generation and cached["catalog"] is not None:
+        return cached["catalog"]
+    
+    with _catalog_lock:
+        catalog = _refresh_catalog(_read_catalog())
+        _catalog_cache["generation"] = generation
+        return catalog
+
+def _update_catalog_entry(quiz_id, quiz_data, previous_dir_signature):
+    """
+    Mentés utáni frissítés. Ha a katalógus a mentés előtt naprakész volt,
+    a könyvtár új időbélyegét is átvesszük, így nem kell újra végignézni.
+    """
+    path = os.path.join(QUIZZES_DIR, f"{quiz_id}.json")
+    with _catalog_lock:
+        catalog = _read_catalog()
+        was_fresh = catalog.get("dir_mtime_ns") == previous_dir_signature
+        quizzes = dict(catalog["quizzes"])
+        quizzes[quiz_id] = _catalog_entry(quiz_id, quiz_data, os.stat(path))
+        _write_catalog({
+            "dir_mtime_ns": _dir_signature(QUIZZES_DIR) if was_fresh else catalog.get("dir_mtime_ns"),
+            "quizzes": quizzes
+        })
+
+def get_available_quizzes(for_student=False):
+    quizzes = {}
+    config = _cached_config()
+    for quiz_id, entry in load_quiz_catalog()["quizzes"].items():
+        if entry["question_count"] == 0:
+            continue
+        
+        # Diákoknak csak a látható quizeket jelenítjük meg
+        visible = config.get("quiz_settings", {}).get(quiz_id, {}).get("visible_to_students", False)
+        if for_student and not visible:
+            continue
+        
+        quizzes[quiz_id] = {
+            "name": entry["name"],
+            "question_count": entry["question_count"],
+            "total_points": entry["total_points"],
+            "visible_to_students": visible
+        }
+    return quizzes
+
+# Eredmények kezelése quiz-enként
+RESULT_COLUMNS = [
+    "student_name", "student_email", "score", "total_questions", "percentage",
+    "timestamp", "answers", "class", "max_points", "grade", "quiz_id", "attempt_id",
+    "attempt_spec"
+]
+
+# Csak a részletes nézethez (load_attempt) kellő oszlopok
+_DETAIL_COLUMNS = ("answers", "attempt_spec")
+
+# Egy folyamaton belül a szálak sorban írnak, folyamatok között fájlzár véd
+_results_lock = threading.Lock()
+
+def get_results_file(quiz_id):
+    """Régi, partícionálatlan eredményfájl (csak olvasásra, az archiválás bontja szét)"""
+    return os.path.join(QUIZ_RESULTS_DIR, f"{quiz_id}_results.csv")
+
+def get_results_dir(quiz_id):
+    """Havi partíciók könyvtára: quiz_results/<quiz>_results/ÉÉÉÉ-HH.csv (archiválva .csv.gz)"""
+    return os.path.join(QUIZ_RESULTS_DIR, f"{quiz_id}_results")
+
+UNDATED_PARTITION = "datum_nelkul"
+
+def _partition_key(timestamp):
+    text = "" if timestamp is None else str(timestamp)
+    if re.match(r"\d{4}-\d{2}", text):
+        return text[:7]
+    return UNDATED_PARTITION
+
+def _partition_path(quiz_id, key, archived=False):
+    return os.path.join(get_results_dir(quiz_id), f"{key}.csv.gz" if archived else f"{key}.csv")
+
+def _list_result_partitions(quiz_id):
+    """[(partíció kulcs, fájl útvonal)] időrendben; egy hónapnak lehet archivált és friss fájlja is"""
+    results_dir = get_results_dir(quiz_id)
+    if not os.path.isdir(results_dir):
+        return []
+    partitions = []
+    for file in sorted(os.listdir(results_dir)):
+        if file.endswith('.csv') or file.endswith('.csv.gz'):
+            partitions.append((file.split('.', 1)[0], os.path.join(results_dir, file)))
+    return partitions
+
+def _partition_in_range(key, date_from=None, date_to=None):
+    if key == UNDATED_PARTITION:
+        return True
+    if date_from is not None and key < date_from.strftime("%Y-%m"):
+        return False
+    if date_to is not None and key > date_to.strftime("%Y-%m"):
+        return False
+    return True
+
+def _list_results_quiz_ids():
+    """Minden quiz, amelyhez van CSV eredmény (régi fájl vagy partíciókönyvtár)"""
+    quiz_ids = set()
+    if os.path.exists(QUIZ_RESULTS_DIR):
+        for entry in os.listdir(QUIZ_RESULTS_DIR):
+            if entry.endswith('_results.csv'):
+                quiz_ids.add(entry[:-len('_results.csv')])
+            elif entry.endswith('_results') and os.path.isdir(os.path.join(QUIZ_RESULTS_DIR, entry)):
+                quiz_ids.add(entry[:-len('_results')])
+    return sorted(quiz_ids)
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def _fsync_dir(path):
+    """A könyvtárbejegyzés tartóssá tétele új fájl létrehozása után"""
+    try:
+        dir_fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+def _read_csv_header(f):
+    f.seek(0)
+    first_line = f.readline().decode('utf-8-sig').rstrip("\r\n")
+    if not first_line:
+        return []
+    return next(csv.reader([first_line]))
+
+def _repair_torn_tail(f):
+    """
+    Összeomlás után az utolsó sor félbe lehet vágva (nincs sorvége).
+    A csonka rekordot levágjuk, hogy a következő sor tiszta helyről induljon.
+    """
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    if size == 0:
+        return 0
+    f.seek(size - 1)
+    if f.read(1) == b"\n":
+        return size
+    
+    # Visszafelé keressük az utolsó teljes sor végét
+    pos = size
+    block = 4096
+    while pos > 0:
+        start = max(0, pos - block)
+        f.seek(start)
+        chunk = f.read(pos - start)
+        newline = chunk.rfind(b"\n")
+        if newline != -1:
+            new_size = start + newline + 1
+            f.truncate(new_size)
+            return new_size
+        pos = start
+    f.truncate(0)
+    return 0
+
+def _format_csv_row(values):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue().encode('utf-8')
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and math.isnan(value):
+        return ""
+    return value
+
+@contextmanager
+def _locked_append(path):
+    """
+    Fájl megnyitása hozzáfűzésre kizárólagos zárral.
+    Ha a zárra várás közben valaki kicserélte a fájlt (atomikus újraírás),
+    az új fájlt nyitjuk meg, különben a sor egy már törölt fájlba kerülne.
+    """
+    while True:
+        f = open(path, 'a+b')
+        try:
+            _lock_file(f)
+            try:
+                current = os.stat(path)
+            except FileNotFoundError:
+                current = None
+            if current is not None and os.path.samestat(current, os.fstat(f.fileno())):
+                break
+            _unlock_file(f)
+        except BaseException:
+            f.close()
+            raise
+        f.close()
+    try:
+        yield f
+    finally:
+        try:
+            _unlock_file(f)
+        finally:
+            f.close()
+
+def _extend_results_header(path, f, keys):
+    """Új oszlop esetén a fejléc egyszeri bővítése (a teljes fájl atomikus újraírásával)"""
+    f.seek(0)
+    df = pd.read_csv(f, on_bad_lines='skip')
+    for key in keys:
+        if key not in df.columns:
+            df[key] = None
+    _write_csv_atomic(path, df)
+    return list(df.columns)
+
+def _append_csv_rows(path, results):
+    """
+    Rekordok hozzáfűzése egy CSV fájlhoz egyetlen fsync-kel (a hívó tartja a
+    _results_lock-ot). Ha közben SQLite tárra váltottunk, nem ír (None bejegyzések).
+    """
+    keys = []
+    for result in results:
+        keys.extend(k for k in result if k not in keys)
+    
+    created = not os.path.exists(path)
+    header_extended = False
+    while True:
+        with _locked_append(path) as f:
+            # Az SQLite-ra költöztetés a fájl zárja alatt másol: ha közben átváltott
+            # a tár, a sorok oda mennek, különben a már átvitt fájlban rekednének
+            if get_results_backend(check_file=True) == "sqlite":
+                return None, header_extended
+            size = _repair_torn_tail(f)
+            header = _read_csv_header(f) if size else []
+            
+            if not header:
+                f.truncate(0)
+                header = RESULT_COLUMNS + [k for k in keys if k not in RESULT_COLUMNS]
+                f.write(_format_csv_row(header))
+            elif any(k not in header for k in keys):
+                # A fájl kicserélődött, a bővített fejléccel újra próbáljuk
+                _extend_results_header(path, f, keys)
+                header_extended = True
+                continue
+            
+            f.seek(0, os.SEEK_END)
+            offset = f.tell()
+            rows = [_format_csv_row([_csv_value(result.get(col)) for col in header]) for result in results]
+            f.write(b"".join(rows))
+            f.flush()
+            os.fsync(f.fileno())
+            break
+    
+    if created:
+        _fsync_dir(os.path.dirname(path))
+    
+    # (kitöltés azonosító, bájt pozíció, hossz) az indexhez
+    entries = []
+    for result, row in zip(results, rows):
+        if result.get("attempt_id"):
+            entries.append((result["attempt_id"], offset, len(row)))
+        offset += len(row)
+    return entries, header_extended
+
+def _csv_append_results(quiz_id, results):
+    """
+    Kitöltések hozzáfűzése a quiz eredménynaplójához, a kitöltés hónapjának
+    partíciójába. Csak az új rekordokat írja ki, így a mentés ideje nem függ
+    a korábbi kitöltések számától.
+    """
+    results_dir = get_results_dir(quiz_id)
+    if not os.path.exists(results_dir):
+        os.makedirs(results_dir, exist_ok=True)
+        _fsync_dir(QUIZ_RESULTS_DIR)
+    
+    by_partition = {}
+    for result in results:
+        by_partition.setdefault(_partition_key(result.get("timestamp")), []).append(result)
+    
+    with _results_lock:
+        index_entries = []
+        rewritten = False
+        moved = []
+        for key, partition_results in by_partition.items():
+            path = _partition_path(quiz_id, key)
+            entries, header_extended = _append_csv_rows(path, partition_results)
+            rewritten = rewritten or header_extended
+            if entries is None:
+                moved += partition_results
+                continue
+            index_entries += [(attempt_id, os.path.basename(path), offset, length)
+                              for attempt_id, offset, length in entries]
+        
+        if moved:
+            _sqlite_append_results({quiz_id: moved})
+        
+        # A fejléc bővítése eltolja a pozíciókat, ilyenkor újraépítjük az indexet
+        if rewritten:
+            _rebuild_attempt_index(quiz_id)
+        else:
+            _append_attempt_index(quiz_id, index_entries)
+
+def _write_csv_atomic(path, df):
+    """
+    Teljes fájl újraírása egyedi ideiglenes fájlon keresztül, hogy ne maradjon félkész
+    állapot. A kiírt (tömörítetlen) CSV bájtokat adja vissza.
+    """
+    data = df.to_csv(index=False, lineterminator="\n").encode('utf-8')
+    _write_bytes_atomic(path, gzip.compress(data) if path.endswith('.gz') else data)
+    _fsync_dir(os.path.dirname(path) or ".")
+    return data
+
+# Kitöltés azonosító -> (partíció fájl, bájt pozíció, hossz) index a CSV tárhoz
+_attempt_index_cache = {}
+_attempt_index_lock = threading.Lock()
+
+def new_attempt_id():
+    """Globálisan egyedi, időrendben növekvő kitöltés azonosító"""
+    return f"{time.time_ns():x}-{secrets.token_hex(4)}"
+
+def get_attempt_index_file(quiz_id):
+    return os.path.join(get_results_dir(quiz_id), "attempts.idx")
+
+def _append_attempt_index(quiz_id, entries):
+    """Az index csak gyorsítás: elveszett sor esetén a keresés újraépíti"""
+    if not entries:
+        return
+    lines = "".join(f"{attempt_id}\t{file_name}\t{offset}\t{length}\n"
+                    for attempt_id, file_name, offset, length in entries)
+    with open(get_attempt_index_file(quiz_id), 'ab') as f:
+        f.write(lines.encode('utf-8'))
+
+def _iter_csv_records(f):
+    """(bájt pozíció, nyers rekord) párok; az idézőjelen belüli sortörést egyben tartja"""
+    offset = 0
+    start = 0
+    pending = b""
+    for line in f:
+        if not pending:
+            start = offset
+        pending += line
+        offset += len(line)
+        if pending.count(b'"') % 2 == 0:
+            yield start, pending
+            pending = b""
+
+def _parse_csv_record(record):
+    return next(csv.reader(io.StringIO(record.decode('utf-8-sig'))), [])
+
+def _open_results_file(path):
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+def _rebuild_attempt_index(quiz_id):
+    """Index újraépítése a partíciókból (a hívó tartja a _results_lock-ot)"""
+    lines = []
+    for key, path in _list_result_partitions(quiz_id):
+        with _open_results_file(path) as f:
+            records = _iter_csv_records(f)
+            header_record = next(records, None)
+            if header_record is None:
+                continue
+            header = _parse_csv_record(header_record[1])
+            if "attempt_id" not in header:
+                continue
+            column = header.index("attempt_id")
+            for offset, record in records:
+                values = _parse_csv_record(record)
+                if len(values) > column and values[column]:
+                    lines.append(f"{values[column]}\t{os.path.basename(path)}\t{offset}\t{len(record)}\n")
+    
+    index_file = get_attempt_index_file(quiz_id)
+    if lines or os.path.exists(index_file):
+        _write_bytes_atomic(index_file, "".join(lines).encode('utf-8'))
+    with _attempt_index_lock:
+        _attempt_index_cache.pop(quiz_id, None)
+
+def _replace_attempt_index_entries(quiz_id, partitions):
+    """
+    Az újraírt partíciók indexsorainak cseréje a kiírt adatokból (a hívó tartja
+    a _results_lock-ot); a többi partíciót nem kell újra végigolvasni.
+    partitions: {fájlnév: (CSV bájtok, kitöltés azonosítók soronként)}
+    """
+    index_file = get_attempt_index_file(quiz_id)
+    try:
+        with open(index_file, 'r', encoding='utf-8') as f:
+            lines = [line for line in f if line.split("\t", 2)[1:2] and line.split("\t", 2)[1] not in partitions]
+    except FileNotFoundError:
+        lines = []
+    for file_name, (data, attempt_ids) in partitions.items():
+        records = _iter_csv_records(io.BytesIO(data))
+        next(records, None)
+        for (offset, record), attempt_id in zip(records, attempt_ids):
+            attempt_id = _attempt_key_part(attempt_id)
+            if attempt_id:
+                lines.append(f"{attempt_id}\t{file_name}\t{offset}\t{len(record)}\n")
+    _write_bytes_atomic(index_file, "".join(lines).encode('utf-8'))
+    with _attempt_index_lock:
+        _attempt_index_cache.pop(quiz_id, None)
+
+def rebuild_attempt_index(quiz_id):
+    with _results_lock:
+        _rebuild_attempt_index(quiz_id)
+
+def _lookup_attempt_index(quiz_id, attempt_id):
+    """
+    O(1) keresés a memóriában tartott indexben. Az indexfájlnak csak az
+    utolsó olvasás óta hozzáfűzött részét olvassa be.
+    """
+    index_file = get_attempt_index_file(quiz_id)
+    try:
+        stat_result = os.stat(index_file)
+    except FileNotFoundError:
+        return None
+    
+    with _attempt_index_lock:
+        cached = _attempt_index_cache.get(quiz_id)
+        if cached is None or cached["ino"] != stat_result.st_ino or stat_result.st_size < cached["pos"]:
+            cached = {"ino": stat_result.st_ino, "pos": 0, "entries": {}}
+            _attempt_index_cache[quiz_id] = cached
+        
+        if stat_result.st_size > cached["pos"]:
+            with open(index_file, 'rb') as f:
+                f.seek(cached["pos"])
+                data = f.read()
+            complete = data.rfind(b"\n") + 1
+            for line in data[:complete].decode('utf-8').splitlines():
+                parts = line.split("\t")
+                if len(parts) == 4:
+                    cached["entries"][parts[0]] = (parts[1], int(parts[2]), int(parts[3]))
+            cached["pos"] += complete
+        
+        return cached["entries"].get(attempt_id)
+
+def _read_indexed_attempt(quiz_id, entry):
+    file_name, offset, length = entry
+    path = os.path.join(get_results_dir(quiz_id), file_name)
+    try:
+        with _open_results_file(path) as f:
+            header_line = f.readline()
+            f.seek(offset)
+            record = f.read(length)
+    except OSError:
+        return None
+    df = pd.read_csv(io.BytesIO(header_line + record))
+    if df.empty:
+        return None
+    return df.iloc[0].to_dict()
+
+def _filter_results_df(df, class_name=None, grade=None, date_from=None, date_to=None):
+    if class_name is not None:
+        df = df[df['class'] == class_name]
+    if grade is not None:
+        df = df[pd.to_numeric(df['grade'], errors='coerce') == int(grade)]
+    if date_from is not None or date_to is not None:
+        dates = pd.to_datetime(df['timestamp'], errors='coerce').dt.date
+        mask = dates.notna()
+        if date_from is not None:
+            mask &= dates >= date_from
+        if date_to is not None:
+            mask &= dates <= date_to
+        df = df[mask]
+    return df
+
+def _read_results_file(path, with_answers=True, usecols=None):
+    if os.path.getsize(path) == 0:
+        return None
+    if usecols is None and not with_answers:
+        # A nagy "answers" JSON oszlopot (és a kitöltés leírását) nem alakítjuk objektummá
+        usecols = lambda column: column not in _DETAIL_COLUMNS
+    return pd.read_csv(path, on_bad_lines='skip', usecols=usecols)
+
+def _empty_results_df(with_answers=True):
+    return pd.DataFrame(columns=[c for c in RESULT_COLUMNS if with_answers or c not in _DETAIL_COLUMNS])
+
+def _csv_load_results(quiz_id, date_from=None, date_to=None, with_answers=True):
+    """A dátumtartományon kívül eső havi partíciókat meg sem nyitja"""
+    frames = []
+    
+    legacy_file = get_results_file(quiz_id)
+    if os.path.exists(legacy_file):
+        frames.append(_read_results_file(legacy_file, with_answers))
+    
+    for key, path in _list_result_partitions(quiz_id):
+        if _partition_in_range(key, date_from, date_to):
+            frames.append(_read_results_file(path, with_answers))
+    
+    frames = [df for df in frames if df is not None and not df.empty]
+    if not frames:
+        return _empty_results_df(with_answers)
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+def _csv_save_results(quiz_id, results_df):
+    """Teljes újraírás partíciónként; az archivált hónapok tömörítve maradnak"""
+    results_dir = get_results_dir(quiz_id)
+    os.makedirs(results_dir, exist_ok=True)
+    
+    with _results_lock:
+        existing = _list_result_partitions(quiz_id)
+        archived_keys = {key for key, path in existing if path.endswith('.gz')}
+        
+        keys = results_df['timestamp'].map(_partition_key) if not results_df.empty else pd.Series(dtype=str)
+        written = set()
+        for key, partition_df in results_df.groupby(keys, sort=True):
+            path = _partition_path(quiz_id, key, archived=key in archived_keys)
+            _write_csv_atomic(path, partition_df)
+            written.add(path)
+        
+        for key, path in existing:
+            if path not in written:
+                os.remove(path)
+        
+        legacy_file = get_results_file(quiz_id)
+        if os.path.exists(legacy_file):
+            os.remove(legacy_file)
+        _fsync_dir(results_dir)
+        _rebuild_attempt_index(quiz_id)
+
+def _csv_update_results(quiz_id, update):
+    """
+    Soronkénti módosítás partíciónként: az olvasás, a módosítás és a csere
+    végig a partíció fájlzárja alatt fut, ugyanazzal a zárral, amit a
+    hozzáfűzés is használ, így a közben (akár másik folyamatból) beküldött
+    kitöltés nem veszik el. update(df) a módosított sorok maszkját adja, vagy None.
+    """
+    rewritten = {}
+    with _results_lock:
+        paths = [path for _key, path in _list_result_partitions(quiz_id)]
+        legacy_file = get_results_file(quiz_id)
+        if os.path.exists(legacy_file):
+            paths.insert(0, legacy_file)
+        for path in paths:
+            with _locked_append(path):
+                df = _read_results_file(path)
+                if df is None or df.empty:
+                    continue
+                changed = update(df)
+                if changed is not None and changed.any():
+                    data = _write_csv_atomic(path, df)
+                    attempt_ids = df["attempt_id"].tolist() if "attempt_id" in df.columns else []
+                    rewritten[path] = (data, attempt_ids)
+        # A régi, partícionálatlan fájl nincs az indexben
+        indexed = {os.path.basename(path): entry for path, entry in rewritten.items() if path != legacy_file}
+        if indexed:
+            _replace_attempt_index_entries(quiz_id, indexed)
+    return bool(rewritten)
+
+def archive_result_partitions(quiz_id, before):
+    """
+    A `before` dátum hónapja előtti partíciók tömörítése (.csv.gz).
+    A régi, partícionálatlan fájlt is szétbontja havi partíciókra.
+    Az aktuális (forró) partícióhoz nem nyúl. Visszatér az archivált hónapok számával.
+    """
+    cutoff = before.strftime("%Y-%m")
+    
+    legacy_file = get_results_file(quiz_id)
+    if os.path.exists(legacy_file):
+        _csv_save_results(quiz_id, _csv_load_results(quiz_id))
+    
+    archived = 0
+    with _results_lock:
+        partitions = {}
+        for key, path in _list_result_partitions(quiz_id):
+            partitions.setdefault(key, []).append(path)
+        
+        for key, paths in partitions.items():
+            if key == UNDATED_PARTITION or key >= cutoff:
+                continue
+            plain = [p for p in paths if p.endswith('.csv')]
+            if not plain:
+                continue
+            
+            # Ha a hónapnak már van archívuma, a kettőt egyesítjük
+            frames = [_read_results_file(p) for p in paths]
+            frames = [df for df in frames if df is not None]
+            merged = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=RESULT_COLUMNS)
+            _write_csv_atomic(_partition_path(quiz_id, key, archived=True), merged)
+            for p in plain:
+                os.remove(p)
+            archived += 1
+        
+        _fsync_dir(get_results_dir(quiz_id))
+        if archived:
+            _rebuild_attempt_index(quiz_id)
+    return archived
+
+def archive_old_results(before):
+    """Minden quiz régi partícióinak archiválása (pl. az aktuális tanév kezdete előttiek)"""
+    return sum(archive_result_partitions(quiz_id, before) for quiz_id in _list_results_quiz_ids())
+
+def current_school_year_start(today=None):
+    today = today or datetime.now().date()
+    year = today.year if today.month >= 9 else today.year - 1
+    return datetime(year, 9, 1).date()
+
+# SQLite eredménytár (opcionális, a konfigurációban kapcsolható: "results_backend": "sqlite")
+RESULTS_DB_FILE = os.path.join(QUIZ_RESULTS_DIR, "results.db")
+
+_sqlite_local = threading.local()
+_sqlite_schema_lock = threading.Lock()
+_sqlite_columns = None
+
+def get_results_backend(check_file=False):
+    return _cached_config(check_file).get("results_backend", "csv")
+
+def _sqlite_connect():
+    """Szálanként egy kapcsolat; WAL módban az olvasók nem várnak az írókra"""
+    conn = getattr(_sqlite_local, "conn", None)
+    if conn is None:
+        if not os.path.exists(QUIZ_RESULTS_DIR):
+            os.makedirs(QUIZ_RESULTS_DIR)
+        conn = sqlite3.connect(RESULTS_DB_FILE, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        _sqlite_init_schema(conn)
+        _sqlite_local.conn = conn
+    return conn
+
+def _sqlite_init_schema(conn):
+    global _sqlite_columns
+    with _sqlite_schema_lock:
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    quiz TEXT NOT NULL,
+                    student_name TEXT,
+                    student_email TEXT,
+                    score REAL,
+                    total_questions INTEGER,
+                    percentage REAL,
+                    timestamp TEXT,
+                    answers TEXT,
+                    class TEXT,
+                    max_points REAL,
+                    grade INTEGER,
+                    quiz_id TEXT,
+                    attempt_id TEXT
+                )
+            """)
+            if "attempt_id" not in [row[1] for row in conn.execute("PRAGMA table_info(results)")]:
+                conn.execute("ALTER TABLE results ADD COLUMN attempt_id TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_quiz_class ON results (quiz, class)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_quiz_grade ON results (quiz, grade)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_quiz_timestamp ON results (quiz, timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_student_email ON results (student_email)")
+            conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_results_attempt_id ON results (attempt_id) "
+                "WHERE attempt_id IS NOT NULL"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS migrated_files (name TEXT PRIMARY KEY, rows INTEGER)")
+            if "rows" not in [row[1] for row in conn.execute("PRAGMA table_info(migrated_files)")]:
+                conn.execute("ALTER TABLE migrated_files ADD COLUMN rows INTEGER")
+        _sqlite_columns = [row[1] for row in conn.execute("PRAGMA table_info(results)")]
+
+def _sqlite_ensure_columns(conn, keys):
+    """Ismeretlen eredménymezőkhöz új oszlop (a CSV fejléc bővítésének megfelelője)"""
+    global _sqlite_columns
+    missing = [k for k in keys if k not in _sqlite_columns]
+    if not missing:
+        return
+    with _sqlite_schema_lock:
+        existing = [row[1] for row in conn.execute("PRAGMA table_info(results)")]
+        with conn:
+            for key in missing:
+                if key not in existing:
+                    conn.execute(f'ALTER TABLE results ADD COLUMN "{key}"')
+        _sqlite_columns = [row[1] for row in conn.execute("PRAGMA table_info(results)")]
+
+def _sqlite_value(value):
+    value = _csv_value(value)
+    if value == "":
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _sqlite_insert_results(conn, quiz_id, results):
+    keys = []
+    for result in results:
+        keys.extend(k for k in result if k not in keys)
+    _sqlite_ensure_columns(conn, keys)
+    
+    columns = ["quiz"] + keys
+    placeholders = ", ".join("?" for _ in columns)
+    column_list = ", ".join(f'"{c}"' for c in columns)
+    conn.executemany(
+        f"INSERT INTO results ({column_list}) VALUES ({placeholders})",
+        [[quiz_id] + [_sqlite_value(result.get(k)) for k in keys] for result in results]
+    )
+
+def _sqlite_append_results(grouped_results):
+    """Több quiz kitöltései egyetlen tranzakcióban (egy commit = egy fsync)"""
+    conn = _sqlite_connect()
+    with conn:
+        for quiz_id, results in grouped_results.items():
+            _sqlite_insert_results(conn, quiz_id, results)
+
+def _sqlite_where(quiz_id, class_name=None, grade=None, date_from=None, date_to=None):
+    clauses = ["quiz = ?"]
+    params = [quiz_id]
+    if class_name is not None:
+        clauses.append("class = ?")
+        params.append(class_name)
+    if grade is not None:
+        clauses.append("grade = ?")
+        params.append(int(grade))
+    # Az időbélyeg "ÉÉÉÉ-HH-NN óó:pp:mm" szöveg, így a szöveges összehasonlítás az indexet használja
+    if date_from is not None:
+        clauses.append("timestamp >= ?")
+        params.append(date_from.strftime("%Y-%m-%d"))
+    if date_to is not None:
+        clauses.append("timestamp < ?")
+        params.append((date_to + timedelta(days=1)).strftime("%Y-%m-%d"))
+    return " AND ".join(clauses), params
+
+def _sqlite_load_results(quiz_id, with_answers=True, **filters):
+    conn = _sqlite_connect()
+    where, params = _sqlite_where(quiz_id, **filters)
+    skipped = ("id", "quiz") if with_answers else ("id", "quiz") + _DETAIL_COLUMNS
+    columns = [c for c in _sqlite_columns if c not in skipped]
+    column_list = ", ".join(f'"{c}"' for c in columns)
+    df = pd.read_sql_query(
+        f"SELECT {column_list} FROM results WHERE {where} ORDER BY id", conn, params=params
+    )
+    # Más quizek miatt felvett, itt üres oszlopokat nem adjuk vissza
+    extra = [c for c in columns if c not in RESULT_COLUMNS and df[c].isna().all()]
+    return df.drop(columns=extra)
+
+def _sqlite_save_results(quiz_id, results_df):
+    conn = _sqlite_connect()
+    records = results_df.to_dict('records')
+    with conn:
+        conn.execute("DELETE FROM results WHERE quiz = ?", (quiz_id,))
+        if records:
+            _sqlite_insert_results(conn, quiz_id, records)
+
+def _sqlite_update_results(quiz_id, update):
+    """Soronkénti módosítás egy írási tranzakcióban; csak a változott sorokat írja vissza"""
+    conn = _sqlite_connect()
+    columns = ("score", "max_points", "percentage", "grade", "answers")
+    with conn:
+        # Az írózár a beolvasástól a visszaírásig tart, a közben érkező mentések várnak
+        conn.execute("BEGIN IMMEDIATE")
+        df = pd.read_sql_query(
+            "SELECT id, score, max_points, percentage, grade, answers FROM results WHERE quiz = ? ORDER BY id",
+            conn, params=[quiz_id]
+        )
+        if df.empty:
+            return False
+        changed = update(df)
+        if changed is None or not changed.any():
+            return False
+        updated = df[changed]
+        conn.executemany(
+            "UPDATE results SET score = ?, max_points = ?, percentage = ?, grade = ?, answers = ? WHERE id = ?",
+            [[_sqlite_value(value) for value in values]
+             for values in updated[list(columns) + ["id"]].itertuples(index=False, name=None)]
+        )
+    return True
+
+def migrate_results_to_sqlite():
+    """
+    Átköltöztetés: a quiz_results alatti CSV eredmények (régi fájlok és havi
+    partíciók) az SQLite adatbázisba kerülnek. Először a konfiguráció vált
+    az SQLite tárra, majd minden fájlt a hozzáfűzési zárja alatt másolunk:
+    az író a zár megszerzése után újra megnézi a tárat, így a másolás után
+    már nem ír a CSV-be. A fájlonként átvitt sorok számát megjegyzi, ismételt
+    futtatás csak az azóta hozzáfűzött sorokat viszi át (pótló kör).
+    Visszatér az átvitt sorok számával.
+    """
+    conn = _sqlite_connect()
+    
+    config = load_config()
+    config["results_backend"] = "sqlite"
+    save_config(config)
+    
+    migrated_rows = 0
+    for quiz_id in _list_results_quiz_ids():
+        files = [get_results_file(quiz_id)] + [path for _, path in _list_result_partitions(quiz_id)]
+        for path in files:
+            if not os.path.exists(path):
+                continue
+            
+            name = os.path.relpath(path, QUIZ_RESULTS_DIR)
+            with _locked_append(path):
+                already = conn.execute("SELECT rows FROM migrated_files WHERE name = ?", (name,)).fetchone()
+                if already is not None and already[0] is None:
+                    # Régebbi futtatás, a sorok számát nem jegyezte meg
+                    continue
+                copied = already[0] if already is not None else 0
+                
+                df = _read_results_file(path)
+                records = df.to_dict('records')[copied:] if df is not None else []
+                if already is not None and not records:
+                    continue
+                with conn:
+                    if records:
+                        _sqlite_insert_results(conn, quiz_id, records)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO migrated_files (name, rows) VALUES (?, ?)",
+                        (name, copied + len(records))
+                    )
+            migrated_rows += len(records)
+    
+    return migrated_rows
+
+# Közös belépési pontok: a beállított tárhoz irányítanak
+def append_results(grouped_results):
+    """
+    Befejezett kitöltések tartós mentése, quiz azonosító szerint csoportosítva.
+    Csak a tartós hozzáfűzés hibája jut el a hívóhoz: utána a sor már lemezen
+    van, egy újrapróbálkozás duplán írná be. A származtatott adatok (összesítők)
+    hibáját csak naplózzuk, és az összesítőt töröljük, hogy újraépüljön.
+    """
+    if get_results_backend() == "sqlite":
+        _sqlite_append_results(grouped_results)
+    else:
+        for quiz_id, results in grouped_results.items():
+            _csv_append_results(quiz_id, results)
+    
+    for quiz_id, results in grouped_results.items():
+        try:
+            _update_result_aggregates(quiz_id, results)
+        except Exception:
+            _log.exception("Az összesítő frissítése nem sikerült (%s), újraépítésre töröljük", quiz_id)
+            try:
+                os.remove(get_aggregates_file(quiz_id))
+            except OSError:
+                pass
+
+def append_result(quiz_id, result):
+    """Egy befejezett kitöltés tartós mentése"""
+    append_results({quiz_id: [result]})
+
+def load_results(quiz_id, class_name=None, grade=None, date_from=None, date_to=None, with_answers=True):
+    """
+    Egy quiz eredményei. A szűrőket SQLite tár esetén a lekérdezés végzi
+    (indexelt oszlopokon), CSV esetén a dátum a havi partíciókat szűri,
+    a többit pandas. with_answers=False esetén a válaszok és a kitöltés
+    leírásának oszlopa kimarad, helyette az "attempt_key" oszloppal a
+    load_attempt() kéri le.
+    """
+    filters = dict(class_name=class_name, grade=grade, date_from=date_from, date_to=date_to)
+    if get_results_backend() == "sqlite":
+        df = _sqlite_load_results(quiz_id, with_answers=with_answers, **filters)
+    else:
+        df = _csv_load_results(quiz_id, date_from=date_from, date_to=date_to, with_answers=with_answers)
+        df = _filter_results_df(df, **filters)
+    if not with_answers:
+        df = df.assign(attempt_key=_attempt_keys(df))
+    return df
+
+def _attempt_key_part(value):
+    # Hiányzó értékek miatt a sorszám oszlop lehet float, a "9724.0" és "9724" ugyanaz
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def _attempt_keys(df):
+    """
+    Kitöltés azonosító: az egyedi attempt_id, a régi soroknál az időbélyeg,
+    az email és a kitöltés sorszáma együtt ("|" jelekkel elválasztva).
+    """
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+    parts = [df[c].map(_attempt_key_part) if c in df.columns else pd.Series("", index=df.index)
+             for c in ("timestamp", "student_email", "quiz_id")]
+    keys = parts[0] + "|" + parts[1] + "|" + parts[2]
+    if "attempt_id" in df.columns:
+        attempt_ids = df["attempt_id"]
+        has_id = attempt_ids.notna() & (attempt_ids.astype(str) != "")
+        keys = attempt_ids.astype(str).where(has_id, keys)
+    return keys
+
+def _decode_attempt(row):
+    answers = row.get("answers")
+    row["answers"] = json.loads(answers) if isinstance(answers, str) else []
+    return row
+
+def _load_legacy_attempt(quiz_id, attempt_key):
+    """Régi (attempt_id nélküli) sor keresése; csak az időbélyeg szerinti partíciót olvassa"""
+    timestamp = attempt_key.split("|", 1)[0]
+    
+    if get_results_backend() == "sqlite":
+        df = pd.read_sql_query(
+            'SELECT * FROM results WHERE quiz = ? AND timestamp = ?',
+            _sqlite_connect(), params=[quiz_id, timestamp]
+        ).drop(columns=["id", "quiz"])
+    else:
+        paths = []
+        legacy_file = get_results_file(quiz_id)
+        if os.path.exists(legacy_file):
+            paths.append(legacy_file)
+        paths += [path for key, path in _list_result_partitions(quiz_id)
+                  if key in (_partition_key(timestamp), UNDATED_PARTITION)]
+        frames = [_read_results_file(path) for path in paths]
+        frames = [df for df in frames if df is not None]
+        df = pd.concat(frames, ignore_index=True) if frames else _empty_results_df()
+    
+    matches = df[_attempt_keys(df) == attempt_key]
+    if matches.empty:
+        return None
+    return matches.iloc[-1].to_dict()
+
+def attempt_saved(quiz_id, attempt_id):
+    """
+    Szerepel-e már a kitöltés a tárban (újrapróbált mentésnél). Az indexet
+    nem építi újra, így az új kitöltések ellenőrzése is olcsó marad.
+    """
+    if get_results_backend() == "sqlite":
+        row = _sqlite_connect().execute(
+            "SELECT 1 FROM results WHERE attempt_id = ? AND quiz = ?", (attempt_id, quiz_id)
+        ).fetchone()
+        return row is not None
+    return _lookup_attempt_index(quiz_id, attempt_id) is not None
+
+def load_attempt(quiz_id, attempt_key):
+    """
+    Egyetlen kitöltés teljes sora, a válaszokat json.loads-olva.
+    Egyedi azonosítónál közvetlen olvasás: SQLite-ban egyedi index,
+    CSV-ben az attempts.idx által megadott bájt pozíció.
+    """
+    if "|" in attempt_key:
+        row = _load_legacy_attempt(quiz_id, attempt_key)
+        return _decode_attempt(row) if row is not None else None
+    
+    if get_results_backend() == "sqlite":
+        df = pd.read_sql_query(
+            'SELECT * FROM results WHERE attempt_id = ? AND quiz = ?',
+            _sqlite_connect(), params=[attempt_key, quiz_id]
+        )
+        if df.empty:
+            return None
+        return _decode_attempt(df.drop(columns=["id", "quiz"]).iloc[0].to_dict())
+    
+    entry = _lookup_attempt_index(quiz_id, attempt_key)
+    row = _read_indexed_attempt(quiz_id, entry) if entry else None
+    if row is None or str(row.get("attempt_id")) != attempt_key:
+        # Hiányzó vagy elavult indexbejegyzés
+        rebuild_attempt_index(quiz_id)
+        entry = _lookup_attempt_index(quiz_id, attempt_key)
+        row = _read_indexed_attempt(quiz_id, entry) if entry else None
+        if row is None or str(row.get("attempt_id")) != attempt_key:
+            return None
+    return _decode_attempt(row)
+
+def load_attempt_answers(quiz_id, attempt_key):
+    """Egyetlen kitöltés válaszai (json.loads-olva), vagy None ha nincs ilyen kitöltés"""
+    row = load_attempt(quiz_id, attempt_key)
+    return row["answers"] if row is not None else None
+
+def get_result_classes(quiz_id):
+    """Azok az osztályok, amelyekből van eredmény a quizhez"""
+    if get_results_backend() == "sqlite":
+        rows = _sqlite_connect().execute(
+            "SELECT DISTINCT class FROM results WHERE quiz = ? AND class IS NOT NULL ORDER BY class",
+            (quiz_id,)
+        ).fetchall()
+        return [row[0] for row in rows]
+    df = _csv_load_results(quiz_id, with_answers=False)
+    return [c for c in df['class'].dropna().unique()]
+
+def count_results(quiz_id):
+    if get_results_backend() == "sqlite":
+        return _sqlite_connect().execute(
+            "SELECT COUNT(*) FROM results WHERE quiz = ?", (quiz_id,)
+        ).fetchone()[0]
+    return len(_csv_load_results(quiz_id, with_answers=False))
+
+def update_results(quiz_id, update):
+    """
+    Tárolt kitöltések helyben módosítása (pl. újraértékeléskor). update(df)
+    a kapott DataFrame score, max_points, percentage, grade és answers
+    oszlopait módosítja, és a változott sorok logikai maszkját adja vissza.
+    """
+    if get_results_backend() == "sqlite":
+        rewritten = _sqlite_update_results(quiz_id, update)
+    else:
+        rewritten = _csv_update_results(quiz_id, update)
+    if rewritten:
+        rebuild_result_aggregates(quiz_id)
+    return rewritten
+
+def save_results(quiz_id, results_df):
+    """A teljes eredménytábla újraírása (pl. javításkor); új kitöltéshez az append_result való"""
+    if get_results_backend() == "sqlite":
+        _sqlite_save_results(quiz_id, results_df)
+    else:
+        _csv_save_results(quiz_id, results_df)
+    rebuild_result_aggregates(quiz_id)
+
+# Előre számolt összesítők quizenként és osztályonként (a tanári áttekintéshez)
+def get_aggregates_file(quiz_id):
+    return os.path.join(QUIZ_RESULTS_DIR, f"{quiz_id}_aggregates.json")
+
+def _empty_aggregate():
+    return {
+        "count": 0,
+        "sum": 0.0,
+        "sum_sq": 0.0,
+        "max": None,
+        "grades": {str(g): 0 for g in range(1, 6)},
+        "students": []
+    }
+
+def _add_to_aggregates(aggregates, results):
+    """Kitöltések hozzáadása a {osztály: összesítő} szótárhoz; az érvénytelen jegyű sorokat kihagyja"""
+    student_sets = {}
+    for result in results:
+        try:
+            grade = int(float(result.get("grade")))
+            percentage = float(result.get("percentage"))
+        except (TypeError, ValueError):
+            continue
+        if math.isnan(percentage):
+            continue
+        
+        class_name = result.get("class")
+        class_name = "" if class_name is None or (isinstance(class_name, float) and math.isnan(class_name)) else str(class_name)
+        agg = aggregates.setdefault(class_name, _empty_aggregate())
+        if class_name not in student_sets:
+            student_sets[class_name] = set(agg["students"])
+        
+        agg["count"] += 1
+        agg["sum"] += percentage
+        agg["sum_sq"] += percentage * percentage
+        agg["max"] = percentage if agg["max"] is None else max(agg["max"], percentage)
+        agg["grades"][str(grade)] = agg["grades"].get(str(grade), 0) + 1
+        
+        student_name = result.get("student_name")
+        if student_name is not None and student_name not in student_sets[class_name]:
+            student_sets[class_name].add(student_name)
+            agg["students"].append(student_name)
+    return aggregates
+
+def _rebuild_result_aggregates_locked(quiz_id):
+    """Újraszámolás és kiírás; a hívó tartja az összesítő fájl zárját"""
+    df = load_results(quiz_id, with_answers=False)
+    # Csak az összesítéshez kellő oszlopok rekordokká alakítása (nagy táblánál ez a drága rész)
+    columns = [c for c in ("grade", "percentage", "class", "student_name") if c in df.columns]
+    aggregates = _add_to_aggregates({}, df[columns].to_dict('records'))
+    _write_json_atomic(get_aggregates_file(quiz_id), {"classes": aggregates})
+    return aggregates
+
+def rebuild_result_aggregates(quiz_id):
+    """Összesítők újraszámolása a teljes eredménytárból (első használatkor vagy újraírás után)"""
+    with _locked_append(get_aggregates_file(quiz_id)):
+        return _rebuild_result_aggregates_locked(quiz_id)
+
+def _update_result_aggregates(quiz_id, results):
+    """
+    Mentés utáni növekményes frissítés; folyamatok között fájlzár védi. A zár
+    megnyitása létrehozza a hiányzó fájlt, az üres vagy sérült összesítőt a
+    zár alatt építjük újra (az új sorok ekkor már a tárban vannak).
+    """
+    with _locked_append(get_aggregates_file(quiz_id)) as f:
+        f.seek(0)
+        try:
+            aggregates = json.loads(f.read().decode('utf-8'))["classes"]
+        except (ValueError, KeyError, TypeError):
+            aggregates = None
+        if aggregates is None:
+            _rebuild_result_aggregates_locked(quiz_id)
+            return
+        _add_to_aggregates(aggregates, results)
+        _write_json_atomic(f.name, {"classes": aggregates})
+
+def load_result_aggregates(quiz_id):
+    path = get_aggregates_file(quiz_id)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)["classes"]
+    except (OSError, ValueError, KeyError):
+        pass
+    # Hiányzik vagy épp most jön létre: a zár alatt újra megnézzük, mielőtt újraépítenénk
+    with _locked_append(path) as f:
+        f.seek(0)
+        try:
+            return json.loads(f.read().decode('utf-8'))["classes"]
+        except (ValueError, KeyError, TypeError):
+            return _rebuild_result_aggregates_locked(quiz_id)
+
+def summarize_result_aggregates(quiz_id, class_name=None):
+    """
+    Áttekintő mutatók az összesítőkből, az osztályok számával arányos időben.
+    class_name=None esetén az összes osztályt összevonja.
+    """
+    aggregates = load_result_aggregates(quiz_id)
+    selected = list(aggregates.values()) if class_name is None else [aggregates.get(class_name, _empty_aggregate())]
+    
+    count = sum(agg["count"] for agg in selected)
+    if count == 0:
+        return None
+    
+    total = sum(agg["sum"] for agg in selected)
+    total_sq = sum(agg["sum_sq"] for agg in selected)
+    mean = total / count
+    grade_sum = sum(int(g) * n for agg in selected for g, n in agg["grades"].items())
+    students = set()
+    for agg in selected:
+        students.update(agg["students"])
+    
+    return {
+        "count": count,
+        "mean_percentage": mean,
+        "std_percentage": math.sqrt(max(0.0, total_sq / count - mean * mean)),
+        "best_percentage": max(agg["max"] for agg in selected if agg["max"] is not None),
+        "distinct_students": len(students),
+        "mean_grade": grade_sum / count
+    }
+
+def summarize_results_df(df):
+    """Ugyanazok a mutatók egy (szűrt) eredménytáblából"""
+    percentage = pd.to_numeric(df['percentage'], errors='coerce')
+    return {
+        "count": len(df),
+        "mean_percentage": percentage.mean(),
+        "std_percentage": percentage.std(ddof=0),
+        "best_percentage": percentage.max(),
+        "distinct_students": len(df['student_name'].unique()),
+        "mean_grade": pd.to_numeric(df['grade'], errors='coerce').mean()
+    }
+
+# Csoportos mentés: sok egyszerre beküldött kitöltés egyetlen tartós írással
+RESULT_BATCH_WINDOW = 0.005
+RESULT_BATCH_MAX = 500
+RESULT_SUBMIT_TIMEOUT = 60.0        # ennyi ideig vár a beküldő az író szálra
+RESULT_WRITER_CHECK_INTERVAL = 1.0  # ilyen gyakran nézi meg, hogy él-e még az író szál
+
+class _PendingResult:
+    __slots__ = ("quiz_id", "result", "done", "error", "state")
+    
+    def __init__(self, quiz_id, result):
+        self.quiz_id = quiz_id
+        self.result = result
+        self.done = threading.Event()
+        self.error = None
+        # "queued" -> "taken" (az író szál vette át) vagy "cancelled" (a beküldő maga írja ki)
+        self.state = "queued"
+
+class ResultWriter:
+    """
+    Háttérszál, ami a beküldött kitöltéseket sorba gyűjti, a néhány
+    ezredmásodpercen belül érkezőket egy írásba (CSV: egy fsync quizenként,
+    SQLite: egy tranzakció) fogja össze, majd minden hívót értesít.
+    """
+    
+    def __init__(self, batch_window=RESULT_BATCH_WINDOW, max_batch=RESULT_BATCH_MAX):
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._claim_lock = threading.Lock()
+    
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+                self._thread.start()
+    
+    def submit(self, quiz_id, result, timeout=RESULT_SUBMIT_TIMEOUT):
+        """
+        Kitöltés beküldése; akkor tér vissza, amikor a rekord már lemezen van.
+        Ha az író szál leállt vagy lejárt az idő, a még át nem vett rekordot a
+        hívó szálon írja ki; ha a szál már átvette, kivételt dob, hogy a hiba
+        a felhasználóig jusson (nem vár a végtelenségig).
+        """
+        self._ensure_started()
+        pending = _PendingResult(quiz_id, result)
+        self._queue.put(pending)
+        deadline = time.monotonic() + timeout
+        while not pending.done.wait(min(RESULT_WRITER_CHECK_INTERVAL, max(0.0, deadline - time.monotonic()))):
+            thread = self._thread
+            if thread is not None and thread.is_alive() and time.monotonic() < deadline:
+                continue
+            with self._claim_lock:
+                claimed = pending.state == "queued"
+                if claimed:
+                    pending.state = "cancelled"
+            if claimed:
+                # Az író szál nem jutott el hozzá: szinkron mentés (a szál újraindul a következő beküldésnél)
+                append_results({quiz_id: [result]})
+                return
+            if pending.done.is_set():
+                break
+            if thread is not None and thread.is_alive():
+                raise TimeoutError("Az eredmény mentése nem fejeződött be időben")
+            raise RuntimeError("Az eredmény mentése közben leállt az író szál")
+        if pending.error is not None:
+            raise pending.error
+    
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            # A beküldő által (leállt szál miatt) már kiírt rekordokat kihagyjuk
+            with self._claim_lock:
+                batch = [pending for pending in batch if pending.state == "queued"]
+                for pending in batch:
+                    pending.state = "taken"
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                for pending in batch:
+                    if pending.error is None:
+                        pending.error = e
+            for pending in batch:
+                pending.done.set()
+    
+    def _write_batch(self, batch):
+        grouped = {}
+        for pending in batch:
+            grouped.setdefault(pending.quiz_id, []).append(pending.result)
+        
+        # SQLite esetén egy tranzakció az egész köteg, CSV-nél quizenként egy írás
+        if get_results_backend() == "sqlite":
+            groups = [(grouped, batch)]
+        else:
+            groups = [({quiz_id: results}, [p for p in batch if p.quiz_id == quiz_id])
+                      for quiz_id, results in grouped.items()]
+        
+        for group, members in groups:
+            try:
+                append_results(group)
+            except Exception as e:
+                for pending in members:
+                    pending.error = e
+
+_result_writer = ResultWriter()
+
+def submit_result(quiz_id, result):
+    """Befejezett kitöltés mentése a közös író szálon keresztül (csoportos commit)"""
+    _result_writer.submit(quiz_id, result)
+
+# Osztályzat kalkulátor függvény
+def calculate_grade(percentage):
+    if percentage < 40:
+        return 1
+    elif 40 <= percentage < 55:
+        return 2
+    elif 55 <= percentage < 70:
+        return 3
+    elif 70 <= percentage < 85:
+        return 4
+    else:
+        return 5
+
+def normalize_text(text):
+    if text is None:
+        return ""
+    return re.sub(r'\s+', ' ', str(text).strip().lower())
+
+def parse_number(text):
+    """
+    Szöveges bemenetet számmá alakít: tört, hatvány, normálalak, tizedesvessző.
+    Pl.: "29/5" -> 5.8, "10^-12" -> 1e-12, "2,5·10^3" -> 2500.0
+    """
+    if text is None:
+        return None
+    
+    return parse_numeric_expression(normalize_text(text))
+
+# Számkifejezések biztonságos (eval nélküli) kiértékelése
+MAX_NUMERIC_EXPRESSION_LENGTH = 100
+MAX_NUMERIC_EXPONENT = 1000
+
+_NUMERIC_REPLACEMENTS = str.maketrans({
+    ",": ".", "·": "*", "⋅": "*", "×": "*", "÷": "/", ":": "/", "−": "-", "–": "-"
+})
+_SUPERSCRIPT_DIGITS = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹⁻⁺", "0123456789-+")
+_SUPERSCRIPT_RUN = re.compile(r'[⁰¹²³⁴⁵⁶⁷⁸⁹⁻⁺]+')
+_NUMERIC_TOKEN = re.compile(r'(\d+\.?\d*(?:e[+-]?\d+)?|\.\d+(?:e[+-]?\d+)?)|(\*\*|[-+*/^()])')
+# Ezres tagolás ("1 000 000", "12 500,5"): csak hármas számjegycsoportok vonhatók össze,
+# minden más szóköz két szám között ("2 3", "12 3456") érvénytelen válasz
+_THOUSANDS_GROUPING = re.compile(r'(?<![\d.])\d{1,3}(?:\s\d{3})+(?!\d)')
+_SPLIT_NUMBER = re.compile(r'[\d.]\s+[\d.]')
+
+class _NumericParser:
+    """Rekurzív leszálló elemző: összeg, szorzat, előjel, hatvány (jobbról társul), zárójel"""
+    
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+    
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+    
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+    
+    def parse(self):
+        value = self.expression()
+        if self.pos != len(self.tokens):
+            raise ValueError("Fölösleges jelek a kifejezés végén")
+        return value
+    
+    def expression(self):
+        value = self.term()
+        while self.peek() in ('+', '-'):
+            if self.take() == '+':
+                value = value + self.term()
+            else:
+                value = value - self.term()
+        return value
+    
+    def term(self):
+        value = self.unary()
+        while self.peek() in ('*', '/'):
+            if self.take() == '*':
+                value = value * self.unary()
+            else:
+                value = value / self.unary()
+        return value
+    
+    def unary(self):
+        if self.peek() in ('+', '-'):
+            sign = -1.0 if self.take() == '-' else 1.0
+            return sign * self.unary()
+        return self.power()
+    
+    def power(self):
+        base = self.atom()
+        if self.peek() == '^':
+            self.take()
+            exponent = self.unary()
+            if abs(exponent) > MAX_NUMERIC_EXPONENT:
+                raise OverflowError("Túl nagy kitevő")
+            return math.pow(base, exponent)
+        return base
+    
+    def atom(self):
+        token = self.take()
+        if isinstance(token, float):
+            return token
+        if token == '(':
+            value = self.expression()
+            if self.take() != ')':
+                raise ValueError("Hiányzó zárójel")
+            return value
+        raise ValueError("Hiányzó szám")
+
+def _tokenize_numeric(text, token_pattern):
+    """Jelsorozat (szám: float, művelet/változó: str) vagy None, ha ismeretlen jel van benne"""
+    if len(text) > MAX_NUMERIC_EXPRESSION_LENGTH:
+        return None
+    text = text.lower().translate(_NUMERIC_REPLACEMENTS)
+    text = _SUPERSCRIPT_RUN.sub(lambda m: "^(" + m.group().translate(_SUPERSCRIPT_DIGITS) + ")", text)
+    text = _THOUSANDS_GROUPING.sub(lambda m: re.sub(r'\s', '', m.group()), text)
+    if _SPLIT_NUMBER.search(text):
+        return None
+    text = re.sub(r'\s+', '', text)
+    
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        m = token_pattern.match(text, pos)
+        if not m:
+            return None
+        if m.group(1) is not None:
+            tokens.append(float(m.group(1)))
+        elif m.group(2) == '**':
+            tokens.append('^')
+        else:
+            tokens.append(m.group(m.lastindex))
+        pos = m.end()
+    return tuple(tokens)
+
+@functools.lru_cache(maxsize=65536)
+def parse_numeric_expression(text):
+    """
+    Számkifejezés értéke vagy None. Tud: tizedesvessző, tört ("29/5", "6:3"),
+    hatvány ("10^-12", "10**3", "10³"), normálalak ("1e-12", "2,5·10^3"),
+    zárójel és a négy alapművelet. Szóköz két szám között csak ezres tagolásként
+    ("1 000 000") megengedett.
+    """
+    tokens = _tokenize_numeric(text, _NUMERIC_TOKEN)
+    if not tokens:
+        return None
+    
+    try:
+        value = _NumericParser(tokens).parse()
+    except (ValueError, ZeroDivisionError, OverflowError, RecursionError):
+        return None
+    return value if math.isfinite(value) else None
+
+# Algebrai kifejezések egyenértékűsége véletlen helyettesítéssel: mindkét
+# oldalt ugyanazokban a véletlen pontokban értékeljük ki (polinom-azonosság teszt)
+# Az első pontokban minden változó pozitív (gyök, tört kitevő értelmezett), a
+# többiben véletlen előjelű, így pl. √(a²) és a nem tűnik egyenértékűnek
+EXPRESSION_SAMPLE_POINTS = 12
+EXPRESSION_POSITIVE_POINTS = 4
+_EXPRESSION_TOKEN = re.compile(r'(\d+\.?\d*(?:e[+-]?\d+)?|\.\d+(?:e[+-]?\d+)?)|(\*\*|[-+*/^()√])|([^\W\d_])')
+
+class _ExpressionSamples(dict):
+    """Változónként rögzített véletlen mintapontok (a változó nevéből képzett maggal)"""
+    
+    def __missing__(self, name):
+        seed = int.from_bytes(hashlib.sha256(name.encode('utf-8')).digest()[:8], 'little')
+        rng = np.random.default_rng(seed)
+        samples = rng.uniform(0.5, 2.5, EXPRESSION_SAMPLE_POINTS)
+        samples[EXPRESSION_POSITIVE_POINTS:] *= rng.choice((-1.0, 1.0), EXPRESSION_SAMPLE_POINTS - EXPRESSION_POSITIVE_POINTS)
+        samples.setflags(write=False)
+        return self.setdefault(name, samples)
+
+_EXPRESSION_SAMPLES = _ExpressionSamples()
+
+class _ExpressionParser(_NumericParser):
+    """
+    A számkifejezés-elemző kiterjesztése: betűváltozók, gyökjel és elhagyott
+    szorzásjel (2ab, 3a²b, (a - b)(a + b)). A változók helyére a mintapontok
+    tömbjei kerülnek, így az eredmény a kifejezés értéke minden pontban.
+    """
+    
+    def __init__(self, tokens, samples):
+        super().__init__(tokens)
+        self.samples = samples
+    
+    def starts_factor(self, token):
+        return isinstance(token, float) or token in ('(', '√') or (isinstance(token, str) and token.isalpha())
+    
+    def term(self):
+        value = self.unary()
+        while True:
+            token = self.peek()
+            if token == '*':
+                self.take()
+                value = value * self.unary()
+            elif token == '/':
+                self.take()
+                value = value / self.unary()
+            elif self.starts_factor(token):
+                value = value * self.power()
+            else:
+                return value
+    
+    def power(self):
+        base = self.atom()
+        if self.peek() == '^':
+            self.take()
+            exponent = self.unary()
+            if np.max(np.abs(exponent)) > MAX_NUMERIC_EXPONENT:
+                raise OverflowError("Túl nagy kitevő")
+            return np.power(base, exponent)
+        return base
+    
+    def atom(self):
+        token = self.peek()
+        if token == '√':
+            self.take()
+            return np.sqrt(self.power())
+        if isinstance(token, str) and token.isalpha():
+            self.take()
+            return self.samples[token]
+        return super().atom()
+
+@functools.lru_cache(maxsize=65536)
+def expression_fingerprint(text):
+    """
+    Algebrai kifejezés értékei a közös véletlen mintapontokban (csak olvasható
+    tömb), vagy None, ha nem értelmezhető. Ahol a kifejezés nem értelmezett
+    (negatív szám gyöke), az érték NaN. Két kifejezés egyenértékű, ha az
+    ujjlenyomatuk (kerekítési hibán belül, a NaN helyekkel együtt) egyezik.
+    """
+    tokens = _tokenize_numeric(text, _EXPRESSION_TOKEN)
+    if not tokens:
+        return None
+    try:
+        with np.errstate(all='ignore'):
+            value = _ExpressionParser(tokens, _EXPRESSION_SAMPLES).parse()
+    except (ValueError, ZeroDivisionError, OverflowError, RecursionError):
+        return None
+    values = np.array(np.broadcast_to(np.asarray(value, dtype=float), (EXPRESSION_SAMPLE_POINTS,)))
+    if not np.all(np.isfinite(values[:EXPRESSION_POSITIVE_POINTS])):
+        return None
+    values[~np.isfinite(values)] = np.nan
+    values.setflags(write=False)
+    return values
+
+def expressions_equivalent(first, second):
+    a, b = expression_fingerprint(first), expression_fingerprint(second)
+    return a is not None and b is not None and bool(np.allclose(a, b, rtol=1e-7, atol=1e-9, equal_nan=True))
+
+# Elvárt alak: a kérdés maga is egyenértékű a helyes válasszal, ezért megadható,
+# hogy kifejtett, szorzattá alakított vagy egyszerűsített alakot várunk
+expression_form_labels = {
+    "": "Bármely egyenértékű alak",
+    "expanded": "Kifejtett alak (zárójel nélkül)",
+    "factored": "Szorzat alak",
+    "simplified": "Egyszerűsített (minden változó egyszer)"
+}
+
+def _is_binary_sign(token, previous):
+    return token in ('+', '-') and previous not in (None, '(', '^', '*', '/')
+
+def _split_terms(tokens):
+    """A legfelső szintű összeadandók jelsorozatai (az előjel nélkül), vagy None, ha a zárójelezés hibás"""
+    terms = [[]]
+    depth = 0
+    previous = None
+    for token in tokens:
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+            if depth < 0:
+                return None
+        if depth == 0 and _is_binary_sign(token, previous):
+            terms.append([])
+        elif not (depth == 0 and not terms[-1] and token in ('+', '-')):
+            terms[-1].append(token)
+        previous = token
+    if depth != 0 or not all(terms):
+        return None
+    return [tuple(term) for term in terms]
+
+def _closing_paren(tokens, start):
+    depth = 0
+    for i in range(start, len(tokens)):
+        if tokens[i] == '(':
+            depth += 1
+        elif tokens[i] == ')':
+            depth -= 1
+            if depth == 0:
+                return i
+    return None
+
+def _read_factor_atom(tokens, i):
+    """(fajta, tartalom, következő index): szám, változó, zárójeles csoport vagy gyök"""
+    token = tokens[i] if i < len(tokens) else None
+    if isinstance(token, float):
+        return "num", token, i + 1
+    if token == '(':
+        end = _closing_paren(tokens, i)
+        if end is None:
+            return None
+        return "group", tokens[i + 1:end], end + 1
+    if token == '√':
+        inner = _read_factor_atom(tokens, i + 1)
+        if inner is None:
+            return None
+        return "root", inner, inner[2]
+    if isinstance(token, str) and token.isalpha():
+        return "var", token, i + 1
+    return None
+
+def _exponent_value(tokens):
+    """
+    Egyszerűsített kitevő: (számláló, nevező) egész számokkal vagy tizedes
+    törttel, illetve betűs kitevő neve; nem egyszerűsített kitevőnél None
+    (4/2, 2·1, 1, 0).
+    """
+    if len(tokens) >= 2 and tokens[0] == '(' and _closing_paren(tokens, 0) == len(tokens) - 1:
+        tokens = tokens[1:-1]
+    sign = 1
+    if tokens and tokens[0] in ('+', '-'):
+        sign = -1 if tokens[0] == '-' else 1
+        tokens = tokens[1:]
+    if len(tokens) == 1 and isinstance(tokens[0], str) and tokens[0].isalpha():
+        return tokens[0] if sign == 1 else None
+    if len(tokens) == 1 and isinstance(tokens[0], float):
+        if tokens[0] in (0.0, 1.0) and sign == 1:
+            return None
+        return (sign * tokens[0], 1)
+    if (len(tokens) == 3 and tokens[1] == '/' and all(isinstance(t, float) and t.is_integer() for t in tokens[::2])
+            and tokens[2] > 1 and math.gcd(int(tokens[0]), int(tokens[2])) == 1 and tokens[0] != 0):
+        return (sign * int(tokens[0]), int(tokens[2]))
+    return None
+
+def _term_factors(term):
+    """Egy összeadandó tényezői: (fajta, tartalom, kitevő jelsorozat, osztó-e) listája, vagy None"""
+    factors = []
+    i = 0
+    divided = False
+    while i < len(term):
+        token = term[i]
+        if token in ('*', '/', '+', '-'):
+            divided = divided or token == '/'
+            i += 1
+            continue
+        atom = _read_factor_atom(term, i)
+        if atom is None:
+            return None
+        kind, content, i = atom
+        exponent = ()
+        if i < len(term) and term[i] == '^':
+            start = i + 1
+            if start < len(term) and term[start] in ('+', '-'):
+                start += 1
+            end_atom = _read_factor_atom(term, start)
+            if end_atom is None:
+                return None
+            exponent, i = term[i + 1:end_atom[2]], end_atom[2]
+        factors.append((kind, content, exponent, divided))
+        divided = False
+    return factors
+
+def _monomial(term):
+    """
+    (együttható, változók és kitevőik) egy csak számokból és változókból álló
+    összeadandóra; None, ha zárójel, gyök vagy nem egyszerűsített kitevő van benne.
+    """
+    factors = _term_factors(term)
+    if factors is None:
+        return None
+    coefficient = 1.0
+    powers = {}
+    for kind, content, exponent, divided in factors:
+        value = _exponent_value(exponent) if exponent else (1, 1)
+        if value is None or kind not in ("num", "var"):
+            return None
+        if kind == "num":
+            if not isinstance(value, tuple):
+                return None
+            power = content ** (value[0] / value[1])
+            coefficient = coefficient / power if divided else coefficient * power
+        elif isinstance(value, tuple):
+            powers[content] = powers.get(content, 0.0) + (-1 if divided else 1) * value[0] / value[1]
+        else:
+            powers[(content, value)] = powers.get((content, value), 0.0) + (-1 if divided else 1)
+    return coefficient, tuple(sorted((str(name), power) for name, power in powers.items() if power))
+
+def _terms_combined(terms):
+    """Nincs nulla tag, és nincsenek összevonható (egynemű, akár egymást kiejtő) tagok"""
+    seen = set()
+    for term in terms:
+        monomial = _monomial(term)
+        if monomial is None:
+            return False
+        coefficient, variables = monomial
+        if coefficient == 0 or variables in seen:
+            return False
+        seen.add(variables)
+    return True
+
+def _is_factored(tokens):
+    # A teljes kifejezést körülvevő zárójel nem tényező: "(a² - b²)"
+    while tokens and tokens[0] == '(' and _closing_paren(tokens, 0) == len(tokens) - 1:
+        tokens = tokens[1:-1]
+    terms = _split_terms(tokens)
+    if terms is None or len(terms) != 1:
+        return False
+    factors = _term_factors(terms[0])
+    if factors is None:
+        return False
+    # Valódi tényező: a változó, az 1-től különböző együttható és a legalább
+    # kéttagú zárójeles csoport; egytagú csoport, "1(...)" nem számít
+    real = 0
+    coefficient = 1.0
+    has_sum = False
+    for kind, content, exponent, divided in factors:
+        value = _exponent_value(exponent) if exponent else (1, 1)
+        multiplicity = int(value[0]) if isinstance(value, tuple) and value[1] == 1 and value[0] >= 1 else 1
+        if kind == "num":
+            if value is None or not isinstance(value, tuple):
+                return False
+            power = content ** (value[0] / value[1])
+            coefficient = coefficient / power if divided else coefficient * power
+            continue
+        if kind == "group":
+            inner = _split_terms(content)
+            if inner is None or len(inner) < 2:
+                return False
+            if all(_monomial(term) is not None for term in inner) and not _terms_combined(inner):
+                return False
+            has_sum = True
+        if not divided:
+            real += multiplicity
+    if abs(coefficient) != 1.0:
+        real += 1
+    return has_sum and real >= 2
+
+def expression_has_form(text, form):
+    tokens = _tokenize_numeric(text, _EXPRESSION_TOKEN)
+    if not tokens:
+        return False
+    # A kitevő zárójele (a felső index is így kerül be) nem számít csoportosításnak
+    grouping = any(token == '(' and previous != '^' for previous, token in zip((None,) + tokens, tokens))
+    if form in ("expanded", "simplified"):
+        if grouping or '√' in tokens:
+            return False
+        terms = _split_terms(tokens)
+        # Nincs "+ 0", "+ a - a", és a kitevők egyszerűsítettek ("x^(4/2)" nem)
+        if terms is None or not _terms_combined(terms):
+            return False
+        if form == "simplified":
+            variables = [t for t in tokens if isinstance(t, str) and t.isalpha()]
+            numbers_per_term = [sum(1 for kind, _c, _e, _d in _term_factors(term) if kind == "num") for term in terms]
+            return len(variables) == len(set(variables)) and max(numbers_per_term) <= 1
+        return True
+    if form == "factored":
+        return _is_factored(tokens)
+    return True
+
+_NUMERIC_INTERVAL = re.compile(r'^([\[\(\]])\s*(.+?)\s*;\s*(.+?)\s*([\]\)\[])$')
+_NUMERIC_RANGE = re.compile(r'^(.+?)\s*\.\.\s*(.+)$')
+
+def parse_numeric_interval(text):
+    """
+    Elfogadott intervallum: (alsó, felső, alsó zárt?, felső zárt?) vagy None.
+    Pl.: "[2,5; 3]", "(0; 1)", "]0; 1[" (nyílt), "2,5 .. 3" (zárt)
+    """
+    m = _NUMERIC_INTERVAL.match(text)
+    if m:
+        low, high = parse_numeric_expression(m.group(2)), parse_numeric_expression(m.group(3))
+        low_closed, high_closed = m.group(1) == '[', m.group(4) == ']'
+    else:
+        m = _NUMERIC_RANGE.match(text)
+        if not m:
+            return None
+        low, high = parse_numeric_expression(m.group(1)), parse_numeric_expression(m.group(2))
+        low_closed = high_closed = True
+    if low is None or high is None or low > high:
+        return None
+    return (low, high, low_closed, high_closed)
+
+def round_significant(value, digits):
+    """Kerekítés adott számú értékes jegyre"""
+    if value == 0 or not math.isfinite(value):
+        return value
+    return round(value, digits - 1 - math.floor(math.log10(abs(value))))
+
+def default_number_tolerance(target):
+    """
+    Alapértelmezett eltérés: 0,001 (szigorúan kisebb), mint a korábbi értékelésben,
+    hogy a meglévő kérdések pontszáma ne változzon. Kis célértékeknél (pl. 10^-12)
+    a kérdésnek kell relatív eltérést megadnia.
+    """
+    return 0.001
+
+# Mértékegységek: előtag × egység táblák, importáláskor egyszer felépítve.
+# Egy mennyiség az SI alapegységben kifejezett értékével és dimenziójával hasonlítható.
+SI_PREFIXES = {
+    "T": 1e12, "G": 1e9, "M": 1e6, "k": 1e3, "h": 1e2, "da": 1e1,
+    "d": 1e-1, "c": 1e-2, "m": 1e-3, "µ": 1e-6, "μ": 1e-6, "u": 1e-6, "n": 1e-9, "p": 1e-12
+}
+SI_PREFIX_NAMES = {
+    "tera": 1e12, "giga": 1e9, "mega": 1e6, "kilo": 1e3, "hekto": 1e2, "deka": 1e1,
+    "deci": 1e-1, "centi": 1e-2, "milli": 1e-3, "mikro": 1e-6, "nano": 1e-9, "piko": 1e-12
+}
+
+# (jel, magyar név, dimenzió, szorzó az SI alapegységhez) - ezek előtagozhatók
+_PREFIXABLE_UNITS = [
+    ("m", "méter", "hosszúság", 1.0),
+    ("g", "gramm", "tömeg", 1e-3),
+    ("s", "másodperc", "idő", 1.0),
+    ("l", "liter", "térfogat", 1e-3),
+    ("L", None, "térfogat", 1e-3),
+    ("A", "amper", "áramerősség", 1.0),
+    ("V", "volt", "feszültség", 1.0),
+    ("Ω", "ohm", "ellenállás", 1.0),
+    ("ohm", None, "ellenállás", 1.0),
+    ("W", "watt", "teljesítmény", 1.0),
+    ("Hz", "hertz", "frekvencia", 1.0),
+    ("J", "joule", "energia", 1.0),
+    ("N", "newton", "erő", 1.0),
+    ("Pa", "pascal", "nyomás", 1.0),
+    ("C", "coulomb", "töltés", 1.0),
+]
+
+# Előtag nélküli egységek és rövidítések
+_OTHER_UNITS = {
+    "min": ("idő", 60.0), "perc": ("idő", 60.0),
+    "h": ("idő", 3600.0), "óra": ("idő", 3600.0),
+    "nap": ("idő", 86400.0),
+    "t": ("tömeg", 1000.0), "tonna": ("tömeg", 1000.0),
+    "dkg": ("tömeg", 1e-2),
+    "ha": ("terület", 1e4), "hektár": ("terület", 1e4),
+}
+
+def _strip_accents(text):
+    return "".join(ch for ch in unicodedata.normalize("NFD", text) if not unicodedata.combining(ch))
+
+def _build_unit_tables():
+    table = {}
+    for symbol, name, dimension, factor in _PREFIXABLE_UNITS:
+        table[symbol] = (dimension, factor)
+        for prefix, multiplier in SI_PREFIXES.items():
+            table.setdefault(prefix + symbol, (dimension, multiplier * factor))
+        if name:
+            table[name] = (dimension, factor)
+            for prefix_name, multiplier in SI_PREFIX_NAMES.items():
+                table[prefix_name + name] = (dimension, multiplier * factor)
+    # Terület és térfogat hosszegységekből (m², cm3, ...)
+    for prefix, multiplier in [("", 1.0)] + [(p, m) for p, m in SI_PREFIXES.items() if m <= 1e3]:
+        for power, dimension in ((2, "terület"), (3, "térfogat")):
+            superscript = "²" if power == 2 else "³"
+            for symbol in (f"{prefix}m{power}", f"{prefix}m{superscript}"):
+                table.setdefault(symbol, (dimension, multiplier ** power))
+    for symbol, entry in _OTHER_UNITS.items():
+        table.setdefault(symbol, entry)
+    # Ékezet nélküli írásmód (meter, masodperc)
+    for symbol, entry in list(table.items()):
+        table.setdefault(_strip_accents(symbol), entry)
+    
+    # Kisbetűs keresés csak ott, ahol egyértelmű (mW / MW ütközik, kW nem)
+    folded = {}
+    for symbol, entry in table.items():
+        folded.setdefault(symbol.lower(), set()).add(entry)
+    folded = {symbol: next(iter(entries)) for symbol, entries in folded.items() if len(entries) == 1}
+    return table, folded
+
+UNIT_TABLE, _UNIT_TABLE_FOLDED = _build_unit_tables()
+_UNIT_START = re.compile(r'(?<=[\d\s)])[^\W\d_]')
+
+def lookup_unit(unit, case_folded=False):
+    """
+    (dimenzió, szorzó az SI alapegységhez) vagy None. Először kis- és nagybetű
+    szerint keres, utána csak az egyértelmű kisbetűs alakokra. case_folded
+    esetén a szöveg már kisbetűs (normalizált), így csak az egyértelmű alak számít.
+    """
+    entry = None if case_folded else UNIT_TABLE.get(unit)
+    if entry is None:
+        entry = _UNIT_TABLE_FOLDED.get(unit.lower())
+    return entry
+
+def parse_quantity(text, default_unit=None, case_folded=False):
+    """
+    Mennyiség: (érték SI alapegységben, dimenzió, a megadott egység szorzója) vagy None.
+    Pl.: "300 cm" -> (3.0, "hosszúság", 0.01), "0,3 kΩ" -> (300.0, "ellenállás", 1000.0).
+    Mértékegység nélkül a default_unit érvényes; ha az sincs, a dimenzió None.
+    Kisbetűsített szövegnél (case_folded) az mA / MA-féle ütköző egységek nem ismerhetők fel.
+    """
+    if text is None:
+        return None
+    text = re.sub(r'\s+', ' ', str(text).strip())
+    for match in _UNIT_START.finditer(text):
+        entry = lookup_unit(text[match.start():].strip(), case_folded)
+        number_text = text[:match.start()].strip()
+        if entry is not None and number_text:
+            value = parse_numeric_expression(number_text)
+            if value is not None:
+                dimension, factor = entry
+                return value * factor, dimension, factor
+    value = parse_numeric_expression(text)
+    if value is None:
+        return None
+    entry = lookup_unit(default_unit) if default_unit else None
+    if entry is None:
+        return value, None, 1.0
+    dimension, factor = entry
+    return value * factor, dimension, factor
+
+# Elgépelés-tűrő egyezés: korlátos szerkesztési távolság
+FUZZY_MAX_DISTANCE = 2
+
+def bounded_levenshtein(a, b, max_distance):
+    """
+    Levenshtein-távolság legfeljebb max_distance-ig. Csak az átló körüli
+    2*max_distance+1 széles sávot számolja, és kilép, amint egy sor minden
+    értéke nagyobb a korlátnál. Ha a távolság nagyobb, max_distance + 1.
+    """
+    if a == b:
+        return 0
+    limit = max_distance + 1
+    if abs(len(a) - len(b)) > max_distance:
+        return limit
+    
+    # Közös előtag és utótag levágása
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return len(b) if len(b) <= max_distance else limit
+    
+    # Soronként csak a sáv 2*max_distance+1 cellája él: a j. oszlop az i. sorban
+    # a (j - i + max_distance). sávindexre kerül, így az átló ugyanazon az indexen,
+    # a felső szomszéd eggyel jobbra, a bal szomszéd eggyel balra van
+    len_b = len(b)
+    width = 2 * max_distance + 1
+    previous = [limit] * width
+    for d in range(max_distance, width):
+        if d - max_distance <= len_b:
+            previous[d] = d - max_distance
+    for i in range(1, len(a) + 1):
+        current = [limit] * width
+        row_min = limit
+        if i <= max_distance:
+            current[max_distance - i] = row_min = i
+        ch = a[i - 1]
+        for j in range(max(1, i - max_distance), min(len_b, i + max_distance) + 1):
+            d = j - i + max_distance
+            value = previous[d] if ch == b[j - 1] else previous[d] + 1
+            if d + 1 < width and previous[d + 1] + 1 < value:
+                value = previous[d + 1] + 1
+            if d > 0 and current[d - 1] + 1 < value:
+                value = current[d - 1] + 1
+            if value > limit:
+                value = limit
+            current[d] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return limit
+        previous = current
+    distance = previous[len_b - len(a) + max_distance]
+    return distance if distance <= max_distance else limit
+
+def fuzzy_allowed_distance(text, max_distance=FUZZY_MAX_DISTANCE):
+    """Megengedett eltérés egy elfogadott válaszhoz: rövid válaszoknál kevesebb (4 karakterenként 1)"""
+    return min(max_distance, len(text) // 4)
+
+def fuzzy_match_many(answers, accepted, max_distance=FUZZY_MAX_DISTANCE):
+    """
+    Tömeges elgépelés-tűrő egyezés (pl. újraértékeléshez): answers minden
+    elemére megadja, hogy valamelyik elfogadott válasz megengedett
+    távolságán belül van-e. Az ismétlődő válaszokat egyszer számolja.
+    """
+    key = compile_answer_key(tuple(accepted), "fuzzy", max_distance)
+    normalized = [normalize_text(answer) for answer in answers]
+    return key.matches_many_normalized(normalized)
+
+class KeywordAutomaton:
+    """
+    Aho–Corasick automata több kulcsszó egyidejű keresésére. Egyetlen
+    menetben, a szöveg hosszában lineáris időben adja vissza a megtalált
+    kulcsszavak bitmaszkját, akárhány kulcsszó van.
+    """
+    __slots__ = ("goto", "fail", "output", "full_mask")
+    
+    def __init__(self, patterns):
+        """patterns: (kulcsszó, bitmaszk) párok; azonos maszkú kulcsszavak szinonimák"""
+        goto = [{}]
+        output = [0]
+        full_mask = 0
+        for pattern, mask in patterns:
+            if not pattern:
+                continue
+            full_mask |= mask
+            state = 0
+            for ch in pattern:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    output.append(0)
+                state = next_state
+            output[state] |= mask
+        
+        # Hibaélek szélességi bejárással; a kimenetek öröklődnek a hibaél mentén
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[next_state] = goto[f].get(ch, 0)
+                output[next_state] |= output[fail[next_state]]
+        
+        self.goto = goto
+        self.fail = fail
+        self.output = output
+        self.full_mask = full_mask
+    
+    def search(self, text):
+        """A szövegben előforduló kulcsszavak maszkjainak uniója"""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        found = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found |= output[state]
+                if found == self.full_mask:
+                    break
+        return found
+
+def _parse_keyword_rubric(normalized_answers):
+    """
+    Kulcsszavas értékelési szempontok: soronként egy szempont, a szinonimák
+    "|" jellel elválasztva, a súly "=" után (alapértelmezés 1).
+    Pl.: "gnome | kde = 2" -> (("gnome", "kde"), 2.0)
+    """
+    rubric = []
+    for line in normalized_answers:
+        weight = 1.0
+        if '=' in line:
+            terms, _, weight_text = line.rpartition('=')
+            parsed = parse_numeric_expression(weight_text.strip())
+            if parsed is not None and parsed > 0 and not math.isinf(parsed):
+                line, weight = terms, parsed
+        synonyms = tuple(term.strip() for term in line.split('|') if term.strip())
+        if synonyms:
+            rubric.append((synonyms, weight))
+    return tuple(rubric)
+
+class AnswerKey:
+    """
+    Egy szöveges kérdés előre feldolgozott helyes válaszai: normalizált
+    szövegek halmaza, szám típusnál a rendezett célértékek, kulcsszavas
+    értékelésnél a súlyok és a kereső automata. Kiértékeléskor csak a diák
+    válaszát kell egyszer normalizálni.
+    """
+    __slots__ = ("match_type", "normalized", "normalized_set", "numbers", "number_lows", "number_reach",
+                 "sig_targets", "intervals", "sig_figs",
+                 "weights", "automaton", "max_distance", "fuzzy_lengths", "fuzzy_targets",
+                 "quantities", "unit", "same_unit", "fingerprints", "form")
+    
+    def __init__(self, correct_answers, match_type="exact", max_distance=None,
+                 tolerance=None, rel_tolerance=None, sig_figs=None, unit=None, same_unit=None,
+                 form=None):
+        if isinstance(correct_answers, str):
+            correct_answers = [correct_answers]
+        self.match_type = match_type or "exact"
+        self.normalized = tuple(normalize_text(ca) for ca in correct_answers)
+        self.normalized_set = frozenset(self.normalized)
+        
+        # Számoknál: (célérték, megengedett eltérés, határ is elfogadott?) és a megadott intervallumok
+        numbers = []
+        intervals = []
+        self.sig_figs = int(sig_figs) if sig_figs else None
+        if self.match_type == "number":
+            for text in self.normalized:
+                interval = parse_numeric_interval(text)
+                if interval is not None:
+                    intervals.append(interval)
+                    continue
+                target = parse_numeric_expression(text)
+                if target is None:
+                    continue
+                if tolerance is None and rel_tolerance is None:
+                    numbers.append((target, default_number_tolerance(target), False))
+                else:
+                    allowed = max(float(tolerance or 0), float(rel_tolerance or 0) * abs(target))
+                    numbers.append((target, allowed, True))
+        # Alsó határ (célérték - eltérés) szerint rendezve: a diák számánál nem nagyobb
+        # alsó határok közül elég a legmesszebb érő elemet megnézni (number_reach[i]
+        # az első i+1 elem közül a legnagyobb felső határú indexe)
+        numbers.sort(key=lambda number: (number[0] - number[1], number[0]))
+        self.numbers = tuple(numbers)
+        self.number_lows = tuple(target - allowed for target, allowed, _inclusive in numbers)
+        reach = []
+        for i, (target, allowed, _inclusive) in enumerate(numbers):
+            if not reach or target + allowed > numbers[reach[-1]][0] + numbers[reach[-1]][1]:
+                reach.append(i)
+            else:
+                reach.append(reach[-1])
+        self.number_reach = tuple(reach)
+        self.sig_targets = ()
+        if self.sig_figs:
+            self.sig_targets = tuple(sorted({round_significant(target, self.sig_figs)
+                                             for target, _allowed, _inclusive in numbers}))
+        self.intervals = tuple(intervals)
+        
+        # Mértékegységes válasz: (érték SI-ben, dimenzió, a megadott egység szorzója,
+        # eltérés SI-ben, határ is elfogadott?).
+        # A kis- és nagybetű számít (mW / MW), ezért a nyers szövegből dolgozunk.
+        quantities = []
+        self.unit = unit or None
+        self.same_unit = bool(same_unit)
+        if self.match_type == "unit":
+            for text in correct_answers:
+                quantity = parse_quantity(text, self.unit)
+                if quantity is None:
+                    continue
+                base_value, dimension, factor = quantity
+                key_value = base_value / factor
+                if tolerance is None and rel_tolerance is None:
+                    allowed, inclusive = default_number_tolerance(key_value), False
+                else:
+                    allowed, inclusive = max(float(tolerance or 0), float(rel_tolerance or 0) * abs(key_value)), True
+                quantities.append((base_value, dimension, factor, allowed * factor, inclusive))
+        self.quantities = tuple(quantities)
+        
+        # Algebrai kifejezés: a helyes válaszok értékei a közös mintapontokban
+        self.form = form or None
+        fingerprints = []
+        if self.match_type == "expression":
+            for text in self.normalized:
+                values = expression_fingerprint(text)
+                if values is not None:
+                    fingerprints.append(values)
+        self.fingerprints = tuple(fingerprints)
+        
+        self.weights = ()
+        self.automaton = None
+        if self.match_type == "keywords":
+            rubric = _parse_keyword_rubric(self.normalized)
+            self.weights = tuple(weight for _synonyms, weight in rubric)
+            self.automaton = KeywordAutomaton(
+                (term, 1 << i) for i, (synonyms, _weight) in enumerate(rubric) for term in synonyms
+            )
+        
+        # Elgépelés-tűrés: hossz szerint rendezett célok, így csak a hosszban
+        # legfeljebb max_distance-szel eltérő elfogadott válaszokat kell vizsgálni
+        self.max_distance = FUZZY_MAX_DISTANCE if max_distance is None else int(max_distance)
+        self.fuzzy_lengths = ()
+        self.fuzzy_targets = ()
+        if self.match_type == "fuzzy":
+            targets = sorted((len(text), text, fuzzy_allowed_distance(text, self.max_distance))
+                             for text in self.normalized_set)
+            self.fuzzy_lengths = tuple(length for length, _text, _allowed in targets)
+            self.fuzzy_targets = tuple(targets)
+    
+    def matches(self, student_answer):
+        if self.match_type == "unit":
+            return self.matches_quantity(student_answer)
+        return self.matches_normalized(normalize_text(student_answer))
+    
+    def matches_quantity(self, student_answer, case_folded=False):
+        """
+        Mértékegységes válasz: SI alapegységre váltva hasonlít. A mértékegység
+        nélküli szám a helyes válasz saját egységében értendő; same_unit
+        esetén más (bár egyenértékű) egység nem fogadható el.
+        """
+        quantity = parse_quantity(student_answer, case_folded=case_folded)
+        if quantity is None:
+            return False
+        value, dimension, factor = quantity
+        for target, target_dimension, key_factor, allowed, inclusive in self.quantities:
+            if self.same_unit and dimension is not None and not math.isclose(factor, key_factor):
+                # Átváltási feladat: csak a kért egységben elfogadható
+                continue
+            if dimension is None:
+                student_value = value * key_factor
+            elif dimension == target_dimension:
+                student_value = value
+            else:
+                continue
+            difference = abs(student_value - target)
+            if difference < allowed or (inclusive and difference <= allowed):
+                return True
+        return False
+    
+    def matches_normalized(self, student_normalized):
+        """Kiértékelés már normalize_text()-tel normalizált válaszra"""
+        if self.match_type == "number":
+            student_num = parse_numeric_expression(student_normalized)
+            if student_num is None:
+                return False
+            i = bisect.bisect_right(self.number_lows, student_num)
+            if i:
+                target, allowed, inclusive = self.numbers[self.number_reach[i - 1]]
+                difference = abs(student_num - target)
+                if difference < allowed or (inclusive and difference <= allowed):
+                    return True
+            if self.sig_targets:
+                rounded = round_significant(student_num, self.sig_figs)
+                i = bisect.bisect_left(self.sig_targets, rounded)
+                if any(math.isclose(rounded, self.sig_targets[j], rel_tol=1e-9)
+                       for j in (i - 1, i) if 0 <= j < len(self.sig_targets)):
+                    return True
+            for low, high, low_closed, high_closed in self.intervals:
+                if ((low < student_num or (low_closed and low == student_num))
+                        and (student_num < high or (high_closed and high == student_num))):
+                    return True
+            return False
+        
+        elif self.match_type == "contains":
+            return any(correct in student_normalized for correct in self.normalized)
+        
+        elif self.match_type == "keywords":
+            return bool(self.weights) and self.keyword_credit(student_normalized) == 1.0
+        
+        elif self.match_type == "unit":
+            # A normalizált szövegből a kis- és nagybetű már elveszett (ms / Ms)
+            return self.matches_quantity(student_normalized, case_folded=True)
+        
+        elif self.match_type == "expression":
+            if self.form and not expression_has_form(student_normalized, self.form):
+                return False
+            values = expression_fingerprint(student_normalized)
+            return values is not None and any(np.allclose(values, key, rtol=1e-7, atol=1e-9, equal_nan=True)
+                                              for key in self.fingerprints)
+        
+        elif self.match_type == "fuzzy":
+            if student_normalized in self.normalized_set:
+                return True
+            length = len(student_normalized)
+            lo = bisect.bisect_left(self.fuzzy_lengths, length - self.max_distance)
+            hi = bisect.bisect_right(self.fuzzy_lengths, length + self.max_distance)
+            for target_length, text, allowed in self.fuzzy_targets[lo:hi]:
+                if (allowed and abs(target_length - length) <= allowed
+                        and bounded_levenshtein(student_normalized, text, allowed) <= allowed):
+                    return True
+            return False
+        
+        else:
+            return student_normalized in self.normalized_set
+    
+    def matches_many(self, answers):
+        """
+        Tömeges kiértékelés nyers válaszokra. Mértékegységnél a kis- és nagybetűt
+        megtartja, így az eredmény elemenként megegyezik a matches() értékével.
+        """
+        if self.match_type != "unit":
+            return self.matches_many_normalized([normalize_text(answer) for answer in answers])
+        values = pd.Series(answers, dtype=object).map(lambda a: "" if a is None else str(a))
+        codes, uniques = pd.factorize(values.str.strip().str.replace(r'\s+', ' ', regex=True))
+        results = np.fromiter((self.matches_quantity(value) for value in uniques),
+                              dtype=bool, count=len(uniques))
+        return results[codes]
+    
+    def matches_many_normalized(self, values):
+        """Tömeges kiértékelés normalizált válaszok sorozatára; az ismétlődőket egyszer számolja"""
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        results = np.fromiter((self.matches_normalized(value) for value in uniques),
+                              dtype=bool, count=len(uniques))
+        return results[codes]
+    
+    def keyword_credit(self, student_normalized):
+        """A megtalált szempontok súlyának aránya (0..1)"""
+        total = sum(self.weights)
+        if not total:
+            return 0.0
+        found = self.automaton.search(student_normalized)
+        earned = sum(weight for i, weight in enumerate(self.weights) if found >> i & 1)
+        return earned / total
+    
+    def score(self, student_answer, points):
+        """Elért pontszám: kulcsszavas értékelésnél arányos részpontszám, egyébként minden vagy semmi"""
+        student_normalized = normalize_text(student_answer)
+        if self.match_type == "keywords":
+            return round(self.keyword_credit(student_normalized) * points, 2)
+        if self.match_type == "unit":
+            return points if self.matches_quantity(student_answer) else 0
+        return points if self.matches_normalized(student_normalized) else 0
+
+# A kérdés JSON-jában megadható értékelési beállítások (az AnswerKey paraméterei)
+ANSWER_KEY_OPTIONS = ("max_distance", "tolerance", "rel_tolerance", "sig_figs", "unit", "same_unit", "form")
+
+@functools.lru_cache(maxsize=4096)
+def _cached_answer_key(correct_answers, match_type, *options):
+    return AnswerKey(correct_answers, match_type, *options)
+
+def compile_answer_key(correct_answers, match_type="exact", max_distance=None,
+                       tolerance=None, rel_tolerance=None, sig_figs=None, unit=None, same_unit=None,
+                       form=None):
+    """Gyorsítótárazott AnswerKey; az azonos válaszlistájú kérdések közösen használják"""
+    if isinstance(correct_answers, AnswerKey):
+        return correct_answers
+    if isinstance(correct_answers, list):
+        correct_answers = tuple(correct_answers)
+    options = (max_distance, tolerance, rel_tolerance, sig_figs, unit, same_unit, form)
+    try:
+        return _cached_answer_key(correct_answers, match_type, *options)
+    except TypeError:
+        return AnswerKey(correct_answers, match_type, *options)
+
+def evaluate_text_answer(student_answer, correct_answers, match_type="exact", **options):
+    return compile_answer_key(correct_answers, match_type, **options).matches(student_answer)
+
+# Kérdéstípusok címkéi
+type_labels = {
+    "single": "Egyszeres választós",
+    "multiple": "Többszörös választós", 
+    "text": "Szöveges válasz"
+}
+
+# Szöveges válaszok értékelési módjai
+match_type_labels = {
+    "exact": "Pontos egyezés",
+    "contains": "Tartalmazás",
+    "number": "Numerikus érték",
+    "keywords": "Kulcsszavas részpontozás",
+    "fuzzy": "Elgépelést tűrő egyezés",
+    "unit": "Mértékegységes mennyiség",
+    "expression": "Algebrai kifejezés (egyenértékűség)"
+}
+
+def get_randomized_quiz(quiz_data):
+    """Új, munkamenetenkénti nézet: a forrás kérdéseket nem módosítja"""
+    randomized_quiz = list(quiz_data)
+    random.shuffle(randomized_quiz)
+    
+    for i, question in enumerate(randomized_quiz):
+        if question["type"] in ["single", "multiple"]:
+            options = list(question["options"])
+            random.shuffle(options)
+            if isinstance(question, Question):
+                randomized_quiz[i] = question.with_options(options)
+            else:
+                randomized_quiz[i] = {**question, "options": options}
+    
+    return randomized_quiz
+
+def get_random_subset_quiz(quiz_data, num_questions):
+    if num_questions >= len(quiz_data):
+        return get_randomized_quiz(quiz_data)
+    
+    selected_questions = random.sample(quiz_data, num_questions)
+    return get_randomized_quiz(selected_questions)
+
+# Kitöltés leírása: a munkamenet csak a sorrendet tárolja, a kérdéseket
+# megjelenítéskor a közös gyorsítótárból oldjuk fel
+def new_attempt_spec(quiz_id, questions_to_show=0, shuffle_questions=True, seed=None):
+    """
+    Új kitöltés: quiz azonosító, változat, RNG mag, a kérdések sorrendje
+    (indexek) és kérdésenként a válaszlehetőségek permutációja (vagy None).
+    """
+    if seed is None:
+        seed = secrets.randbits(64)
+    rng = random.Random(seed)
+    
+    subset = False
+    if questions_to_show > 0:
+        # Véletlen részhalmaz: csak a kisorsolt rekordokat olvassuk be az index alapján
+        version, count, _records = _read_quiz_records(quiz_id)
+        if questions_to_show < count:
+            order = rng.sample(range(count), questions_to_show)
+            selected_version, _count, records = _read_quiz_records(quiz_id, order)
+            subset = selected_version == version
+            if subset:
+                _remember_quiz_records(quiz_id, version, order, records)
+                questions = dict(zip(order, records))
+            else:
+                # Közben módosult a fájl: újrasorsolás a teljes betöltött változatból
+                rng = random.Random(seed)
+    
+    if not subset:
+        version, questions = get_quiz_with_version(quiz_id)
+        order = list(range(len(questions)))
+        subset = 0 < questions_to_show < len(questions)
+        if subset:
+            order = rng.sample(order, questions_to_show)
+        elif shuffle_questions:
+            rng.shuffle(order)
+    
+    option_orders = []
+    for index in order:
+        question = questions[index]
+        if (subset or shuffle_questions) and question["type"] in ["single", "multiple"]:
+            permutation = list(range(len(question["options"])))
+            rng.shuffle(permutation)
+            option_orders.append(tuple(permutation))
+        else:
+            option_orders.append(None)
+    
+    # A változat a lemezre is kerül, hogy a kitöltés később is pontosan visszaállítható legyen
+    snapshot_quiz_version(quiz_id, version)
+    
+    return {
+        "quiz_id": quiz_id,
+        "version": version,
+        "seed": seed,
+        "order": tuple(order),
+        "option_orders": tuple(option_orders)
+    }
+
+def resolve_attempt_question(spec, position):
+    """A kitöltés position-edik kérdése a megfelelő válaszsorrenddel"""
+    question = get_quiz_question(spec["quiz_id"], spec["version"], spec["order"][position])
+    permutation = spec["option_orders"][position]
+    if permutation is not None:
+        options = question["options"]
+        question = question.with_options([options[j] for j in permutation])
+    return question
+
+def resolve_attempt(spec):
+    """A kitöltés összes kérdése, sorrendben (pl. utólagos visszanézéshez)"""
+    return [resolve_attempt_question(spec, position) for position in range(len(spec["order"]))]
+
+def attempt_spec_to_json(spec):
+    """A kitöltés leírása az eredménysor "attempt_spec" oszlopába"""
+    return json.dumps({
+        "quiz_id": spec["quiz_id"],
+        "version": spec["version"],
+        "seed": spec["seed"],
+        "order": list(spec["order"]),
+        "option_orders": [list(p) if p is not None else None for p in spec["option_orders"]]
+    })
+
+def load_attempt_spec(result):
+    """Az eredménysorba mentett kitöltés-leírás, vagy None (régebbi soroknál)"""
+    value = result.get("attempt_spec") if hasattr(result, "get") else None
+    if not isinstance(value, str) or not value:
+        return None
+    spec = json.loads(value)
+    spec["order"] = tuple(spec["order"])
+    spec["option_orders"] = tuple(tuple(p) if p is not None else None for p in spec["option_orders"])
+    return spec
+
+def calculate_score(user_answer, correct_answer, question_type, points, match_type="exact", answer_key=None):
+    if question_type == "single":
+        if isinstance(correct_answer, list):
+            if correct_answer:
+                correct_answer = correct_answer[0]
+            else:
                 correct_answer = ""
         return points if user_answer == correct_answer else 0
     elif question_type == "multiple":
@@ -426,8 +3971,260 @@ def calculate_score(user_answer, correct_answer, question_type, points, match_ty
         partial_score = max(0, correct_selected - incorrect_selected) * (points / len(correct_set))
         return round(partial_score, 2)
     else:
-        is_correct = evaluate_text_answer(user_answer, correct_answer, match_type)
-        return points if is_correct else 0
+        if answer_key is None:
+            answer_key = compile_answer_key(correct_answer, match_type)
+        return answer_key.score(user_answer, points)
+
+# Korábbi kitöltések újraértékelése (pl. javított válaszkulcs után)
+def _grade_from_percentage(percentage):
+    """calculate_grade() tömbösített változata"""
+    return np.select([percentage < 40, percentage < 55, percentage < 70, percentage < 85],
+                     [1, 2, 3, 4], 5)
+
+def _answer_group_key(answer):
+    # Többszörös választásnál a kijelölések sorrendje nem számít
+    if isinstance(answer, list):
+        return "\x1e".join(sorted(str(a) for a in answer))
+    return "" if answer is None else str(answer)
+
+def _score_answer_pairs(questions, pair_questions, pair_answers):
+    """Az egyedi (kérdés, válasz) párok pontszáma a calculate_score() szabályai szerint"""
+    scores = np.zeros(len(pair_questions))
+    pair_questions = np.asarray(pair_questions, dtype=np.int64)
+    answers = pd.Series(pair_answers, dtype=object)
+    
+    # Pontos és elgépelés-tűrő szöveges kérdések: tömbös normalizálás, majd
+    # halmazkeresés, illetve a korlátos távolságú tömeges illesztés
+    exact = np.array([questions[qi]["type"] == "text" and questions[qi].answer_key.match_type in ("exact", "fuzzy")
+                      for qi in pair_questions], dtype=bool)
+    if exact.any():
+        normalized = (answers[exact].map(lambda a: "" if a is None else str(a))
+                      .str.strip().str.lower().str.replace(r'\s+', ' ', regex=True))
+        for qi in np.unique(pair_questions[exact]):
+            in_question = pair_questions[exact] == qi
+            answer_key = questions[qi].answer_key
+            if answer_key.match_type == "exact":
+                correct = normalized[in_question].isin(answer_key.normalized_set).to_numpy()
+            else:
+                correct = answer_key.matches_many_normalized(normalized[in_question].to_numpy())
+            scores[np.flatnonzero(exact)[in_question]] = np.where(correct, questions[qi]["points"], 0)
+    
+    for i in np.flatnonzero(~exact):
+        q = questions[pair_questions[i]]
+        scores[i] = calculate_score(answers.iat[i], q["answer"], q["type"], q["points"],
+                                    q.get("match_type", "exact"), answer_key=q.answer_key)
+    return scores
+
+# Újraértékeléshez: kérdésenként a pontozást meghatározó mezők lenyomata a
+# legutóbbi újraértékeléskor (vagy az első szerkesztés előtt). Csak azokat a
+# kérdéseket kell újrapontozni, amelyeknek azóta változott a lenyomata.
+def get_grading_state_file(quiz_id):
+    return os.path.join(QUIZ_RESULTS_DIR, f"{quiz_id}_graded.json")
+
+def grading_signature(question):
+    options = {name: to_plain(question.get(name)) for name in ANSWER_KEY_OPTIONS}
+    payload = json.dumps([question.get("type"), to_plain(question.get("answer")), question.get("points"),
+                          question.get("match_type", "exact"), options],
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def _read_grading_state(quiz_id):
+    try:
+        with open(get_grading_state_file(quiz_id), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if isinstance(state, dict) else None
+
+def _write_grading_state(quiz_id, questions):
+    os.makedirs(QUIZ_RESULTS_DIR, exist_ok=True)
+    _write_json_atomic(get_grading_state_file(quiz_id),
+                       {q["question"]: grading_signature(q) for q in questions})
+
+def _remember_grading_state(quiz_id):
+    """Szerkesztés előtt: ha még nincs lenyomat, a mentés előtti kérdéssorét rögzítjük"""
+    if _read_grading_state(quiz_id) is None:
+        questions = get_quiz(quiz_id)
+        if questions:
+            _write_grading_state(quiz_id, questions)
+
+def _changed_questions(quiz_id, questions):
+    """A legutóbbi újraértékelés óta módosult kérdések sorszámai (lenyomat nélkül mind)"""
+    state = _read_grading_state(quiz_id)
+    first = {}
+    for i, q in enumerate(questions):
+        first.setdefault(q["question"], i)
+    return [i for text, i in first.items()
+            if state is None or state.get(text) != grading_signature(questions[i])]
+
+def _find_answer_entries(raw, targets, decoder):
+    """
+    A válaszlista (JSON szöveg) célkérdésekhez tartozó bejegyzései a teljes lista
+    beolvasása nélkül: [(kérdés sorszám, bejegyzés, (kezdet, vég) vagy None)].
+    A bejegyzés a mentéskori json.dumps alakban a kérdés szövegével kezdődik; ha
+    így nem található, de a szöveg szerepel, a teljes listát olvassuk be.
+    """
+    found = []
+    fallback = False
+    for qi, (text, needle, quoted) in targets.items():
+        pos = raw.find(needle)
+        if pos >= 0:
+            try:
+                entry, end = decoder.raw_decode(raw, pos)
+            except ValueError:
+                entry = None
+            if isinstance(entry, dict) and entry.get("question") == text:
+                found.append((qi, entry, (pos, end)))
+                continue
+        if quoted in raw:
+            fallback = True
+    if not fallback:
+        return found, None
+    try:
+        parsed = json.loads(raw)
+    except ValueError:
+        return found, None
+    if not isinstance(parsed, list):
+        return found, None
+    by_text = {text: qi for qi, (text, _needle, _quoted) in targets.items()}
+    found = [(by_text[entry.get("question")], entry, None) for entry in parsed
+             if isinstance(entry, dict) and entry.get("question") in by_text]
+    return found, parsed
+
+def _regrade_frame(df, questions, targets, plain_answers, stats):
+    """
+    Egy eredménytábla (partíció) újraértékelése helyben: csak a célkérdések
+    bejegyzéseit pontozza újra, a pontszámot a különbséggel módosítja, és a
+    válaszok szövegében csak a módosult bejegyzéseket cseréli. A változott
+    sorok maszkját adja vissza.
+    """
+    stats["attempts"] += len(df)
+    if "answers" not in df.columns:
+        return None
+    decoder = json.JSONDecoder()
+    answers_column = df["answers"].to_numpy(dtype=object)
+    rows, entry_questions, entry_answers, entries, spans = [], [], [], [], []
+    parsed_rows = {}
+    for row, raw in enumerate(answers_column):
+        if not isinstance(raw, str):
+            continue
+        found, parsed = _find_answer_entries(raw, targets, decoder)
+        if parsed is not None:
+            parsed_rows[row] = parsed
+        for qi, entry, span in found:
+            # Más típusúvá vált kérdés régi pontszáma marad
+            if entry.get("type") != questions[qi]["type"]:
+                continue
+            rows.append(row)
+            entry_questions.append(qi)
+            entry_answers.append(entry.get("student_answer"))
+            entries.append(entry)
+            spans.append(span)
+    if not rows:
+        return None
+    
+    rows = np.asarray(rows, dtype=np.int64)
+    entry_questions = np.asarray(entry_questions, dtype=np.int64)
+    old_earned = np.array([entry.get("earned_points", 0) or 0 for entry in entries], dtype=float)
+    old_max = np.array([entry.get("max_points", 0) or 0 for entry in entries], dtype=float)
+    stale = np.array([entry.get("correct_answer") != plain_answers[qi]
+                      for entry, qi in zip(entries, entry_questions)], dtype=bool)
+    
+    # Egyedi (kérdés, válasz) párok: a pontozás ezekre fut, az eredmény visszaszórva
+    group_keys = pd.Series([_answer_group_key(a) for a in entry_answers], dtype=object)
+    group_keys = entry_questions.astype(str).astype(object) + "\x1f" + group_keys.to_numpy()
+    codes, _uniques = pd.factorize(group_keys)
+    _codes, first = np.unique(codes, return_index=True)
+    pair_scores = _score_answer_pairs(questions, entry_questions[first], [entry_answers[i] for i in first])
+    points = np.array([q["points"] for q in questions], dtype=float)
+    new_earned = pair_scores[codes]
+    new_max = points[entry_questions]
+    
+    changed_entries = (new_earned != old_earned) | (new_max != old_max) | stale
+    if not changed_entries.any():
+        return None
+    
+    n_rows = len(df)
+    delta_score = np.bincount(rows, weights=np.where(changed_entries, new_earned - old_earned, 0), minlength=n_rows)
+    delta_max = np.bincount(rows, weights=np.where(changed_entries, new_max - old_max, 0), minlength=n_rows)
+    changed_rows = np.zeros(n_rows, dtype=bool)
+    changed_rows[rows[changed_entries]] = True
+    
+    score = np.round(pd.to_numeric(df["score"], errors='coerce').to_numpy(dtype=float) + delta_score, 2)
+    max_points = pd.to_numeric(df["max_points"], errors='coerce').to_numpy(dtype=float) + delta_max
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentage = np.where(max_points > 0, np.round(score / max_points * 100, 2), 0.0)
+    old_percentage = pd.to_numeric(df["percentage"], errors='coerce').to_numpy(dtype=float)
+    percentage = np.where(changed_rows, percentage, old_percentage)
+    grade = np.where(changed_rows, _grade_from_percentage(percentage),
+                     pd.to_numeric(df["grade"], errors='coerce').to_numpy(dtype=float))
+    
+    # A válaszok szövegében csak a módosult bejegyzéseket cseréljük
+    replacements = {}
+    for i in np.flatnonzero(changed_entries):
+        qi = entry_questions[i]
+        q = questions[qi]
+        entry = entries[i]
+        earned = new_earned[i].item()
+        entry["earned_points"] = int(earned) if earned.is_integer() else earned
+        entry["max_points"] = q["points"]
+        entry["is_correct"] = entry["earned_points"] == q["points"]
+        entry["correct_answer"] = plain_answers[qi]
+        if q["type"] == "text":
+            entry["match_type"] = q.get("match_type", "exact")
+            entry["normalized_correct"] = list(q.answer_key.normalized)
+        if spans[i] is not None:
+            replacements.setdefault(rows[i], []).append((spans[i], json.dumps(entry)))
+    new_answers = answers_column.copy()
+    for row in np.flatnonzero(changed_rows):
+        if row in parsed_rows:
+            new_answers[row] = json.dumps(parsed_rows[row])
+            continue
+        raw = new_answers[row]
+        for (start, end), text in sorted(replacements.get(row, ()), reverse=True):
+            raw = raw[:start] + text + raw[end:]
+        new_answers[row] = raw
+    
+    df["score"] = score.astype(np.int64) if np.all(score == np.floor(score)) else score
+    df["max_points"] = max_points.astype(np.int64) if np.all(max_points == np.floor(max_points)) else max_points
+    df["percentage"] = percentage
+    df["grade"] = grade.astype(np.int64) if np.all(np.isfinite(grade)) else grade
+    df["answers"] = new_answers
+    stats["regraded"] += int(changed_rows.sum())
+    stats["answers"] += int(changed_entries.sum())
+    return changed_rows
+
+def regrade_results(quiz_id, quiz_data=None, questions=None):
+    """
+    Egy quiz tárolt kitöltéseinek újraértékelése az aktuális válaszkulcs
+    alapján. Csak a legutóbbi újraértékelés óta módosult kérdéseket (vagy a
+    questions listában megadott kérdésszövegeket) pontozza újra: a válaszok
+    szövegéből csak ezek bejegyzéseit olvassa ki, a pontszámot a különbséggel
+    módosítja. A kérdéseket a szövegük azonosítja; a törölt vagy más típusúvá
+    vált kérdések régi pontszáma marad. Visszatér a statisztikával.
+    """
+    quiz = list(get_quiz(quiz_id) if quiz_data is None else quiz_data)
+    quiz = [q if isinstance(q, Question) else Question(q) for q in quiz]
+    if questions is None:
+        selected = _changed_questions(quiz_id, quiz)
+    else:
+        wanted = set(questions)
+        selected = sorted({q["question"]: i for i, q in reversed(list(enumerate(quiz)))
+                           if q["question"] in wanted}.values())
+    plain_answers = [to_plain(q["answer"]) for q in quiz]
+    
+    stats = {"attempts": 0, "regraded": 0, "answers": 0, "questions": len(selected)}
+    if selected:
+        targets = {}
+        for qi in selected:
+            text = quiz[qi]["question"]
+            quoted = json.dumps(text)
+            targets[qi] = (text, '{"question": ' + quoted, quoted)
+        update_results(quiz_id, lambda df: _regrade_frame(df, quiz, targets, plain_answers, stats))
+    else:
+        stats["attempts"] = len(load_results(quiz_id, with_answers=False))
+    _write_grading_state(quiz_id, quiz)
+    return stats
 
 # Diák eredményeinek részletes megjelenítése
 def display_student_result(student_result, quiz_data):
@@ -458,8 +4255,19 @@ def display_student_result(student_result, quiz_data):
     # Részletes válaszok
     st.subheader("📋 Kérdések és válaszok")
     
+    # A kitöltéskor látott kérdéssor (változat és válaszsorrend) a mentett leírásból
+    attempt_questions = None
+    spec = load_attempt_spec(student_result)
+    if spec is not None:
+        try:
+            attempt_questions = resolve_attempt(spec)
+        except LookupError as e:
+            st.warning(f"A kitöltés kérdéssora nem állítható vissza: {e}")
+    
     try:
-        answers = json.loads(student_result['answers'])
+        answers = student_result['answers']
+        if isinstance(answers, str):
+            answers = json.loads(answers)
         
         for i, answer in enumerate(answers, 1):
             # Expanderek helyett egyszerű szakaszokat használunk
@@ -477,6 +4285,12 @@ def display_student_result(student_result, quiz_data):
                 if "image" in answer and answer["image"]:
                     display_image(answer["image"], width=300)
                 
+                # Válaszlehetőségek abban a sorrendben, ahogy a diák látta
+                if attempt_questions is not None and i <= len(attempt_questions):
+                    shown = attempt_questions[i - 1]
+                    if shown["type"] in ["single", "multiple"]:
+                        st.write(f"**Válaszlehetőségek:** {', '.join(shown['options'])}")
+                
                 # Diák válasza
                 student_answer = answer.get('student_answer', '')
                 if answer.get("type") == "text":
@@ -496,11 +4310,6 @@ def display_student_result(student_result, quiz_data):
                 
                 # Értékelés típusa szöveges kérdésnél
                 if answer.get("type") == "text" and "match_type" in answer:
-                    match_type_labels = {
-                        "exact": "Pontos egyezés",
-                        "contains": "Tartalmazás",
-                        "number": "Numerikus érték"
-                    }
                     st.write(f"**Értékelés típusa:** {match_type_labels.get(answer['match_type'], answer['match_type'])}")
             
             with col2:
@@ -1,9 +1,37 @@
 import streamlit as st
 from common import *
 
+# Frissítés után ezek a kulcsok állnak vissza (félbehagyott kitöltés)
+RESUMABLE_STATE_KEYS = ['student_quiz_selector', 'current_question', 'score', 'student_answers',
+                        'quiz_started', 'attempt', 'quiz_id', 'current_quiz_id', 'quiz_completed']
+
+def start_student_session(student_info, session_id):
+    st.session_state.student_logged_in = True
+    st.session_state.student_name = student_info["name"]
+    st.session_state.student_class = student_info["class"]
+    st.session_state.student_email = student_info["email"]
+    st.session_state.session_id = session_id
+    token = student_session_token(student_info["email"].lower(), session_id)
+    if token:
+        st.query_params[SESSION_TOKEN_PARAM] = token
+
+def restore_student_session():
+    """Visszalépés az URL-ben őrzött aláírt tokennel, jelszó-ellenőrzés nélkül"""
+    restored = restore_student_login(st.query_params.get(SESSION_TOKEN_PARAM))
+    if restored is None:
+        return False
+    student_info, session_id = restored
+    st.session_state.update(load_session_snapshot(session_id))
+    start_student_session(student_info, session_id)
+    return True
+
 def student_login_interface():
     st.title("🎓 Diák Quiz - Bejelentkezés")
     
+    if not st.session_state.get('student_logged_in') and SESSION_TOKEN_PARAM in st.query_params:
+        if not restore_student_session():
+            del st.query_params[SESSION_TOKEN_PARAM]
+    
     if 'student_logged_in' in st.session_state and st.session_state.student_logged_in:
         student_quiz_interface()
         return
@@ -20,14 +48,17 @@ def student_login_interface():
             if email and password:
                 student_info = authenticate_student(email, password)
                 if student_info:
-                    st.session_state.student_logged_in = True
-                    st.session_state.student_name = student_info["name"]
-                    st.session_state.student_class = student_info["class"]
-                    st.session_state.student_email = student_info["email"]
+                    start_student_session(student_info, new_session_id())
                     st.success(f"Sikeres bejelentkezés! Üdvözöljük, {student_info['name']}!")
                     st.rerun()
+                elif student_info is LOGIN_BUSY:
+                    st.warning("Most sokan jelentkeznek be egyszerre, próbáld újra néhány másodperc múlva!")
                 else:
-                    st.error("Hibás email cím vagy jelszó!")
+                    retry_after = login_retry_after(email.lower())
+                    if retry_after:
+                        st.error(f"Túl sok sikertelen próbálkozás! Próbáld újra {retry_after} másodperc múlva.")
+                    else:
+                        st.error("Hibás email cím vagy jelszó!")
             else:
                 st.warning("Kérjük, add meg az email címed és a jelszavad!")
     
@@ -44,13 +75,22 @@ def student_quiz_interface():
         st.write(f"**Osztály:** {st.session_state.student_class}")
     with col3:
         if st.button("Kijelentkezés"):
+            if 'session_id' in st.session_state:
+                drop_session_snapshot(st.session_state.session_id)
+            if SESSION_TOKEN_PARAM in st.query_params:
+                del st.query_params[SESSION_TOKEN_PARAM]
             for key in ['student_logged_in', 'student_name', 'student_class', 'student_email',
                        'current_question', 'score', 'student_answers', 'quiz_started', 
-                       'randomized_quiz', 'quiz_id', 'current_quiz_id', 'quiz_completed']:
+                       'attempt', 'quiz_id', 'current_quiz_id', 'quiz_completed', 'session_id']:
                 if key in st.session_state:
                     del st.session_state[key]
             st.rerun()
     
+    # Minden futás elején elmentjük a visszaállítható állapotot (frissítés, megszakadt kapcsolat)
+    if 'session_id' in st.session_state:
+        save_session_snapshot(st.session_state.session_id,
+                              {key: st.session_state[key] for key in RESUMABLE_STATE_KEYS if key in st.session_state})
+    
     # Diákoknak csak a látható quizeket jelenítjük meg
     available_quizzes = get_available_quizzes(for_student=True)
     if not available_quizzes:
@@ -70,8 +110,9 @@ def student_quiz_interface():
         key="student_quiz_selector"
     )
     
-    quiz_data = load_quiz(selected_quiz_id)
-    if not quiz_data:
+    # Nagy kérdésbankoknál se töltsük be az egészet: a kérdésszám az indexből jön
+    total_questions = get_quiz_question_count(selected_quiz_id)
+    if not total_questions:
         st.error("A kiválasztott quiz nem található.")
         return
     
@@ -81,7 +122,6 @@ def student_quiz_interface():
     shuffle_questions = quiz_settings.get("shuffle_questions", True)
     
     questions_to_show = quiz_settings.get("questions_to_show", 0)
-    total_questions = len(quiz_data)
     
     if questions_to_show > 0 and questions_to_show < total_questions:
         st.info(f"📊 Ebből a quizből {questions_to_show} véletlenszerűen kiválasztott kérdést kapsz meg (összesen {total_questions} kérdésből).")
@@ -97,14 +137,10 @@ def student_quiz_interface():
         st.session_state.quiz_started = True
         st.session_state.current_quiz_id = selected_quiz_id
         
-        if questions_to_show > 0 and questions_to_show < total_questions:
-            st.session_state.randomized_quiz = get_random_subset_quiz(quiz_data, questions_to_show)
-        elif shuffle_questions:
-            st.session_state.randomized_quiz = get_randomized_quiz(quiz_data)
-        else:
-            st.session_state.randomized_quiz = quiz_data.copy()
+        # Csak a sorrend kerül a munkamenetbe, a kérdések a közös gyorsítótárban maradnak
+        st.session_state.attempt = new_attempt_spec(selected_quiz_id, questions_to_show, shuffle_questions)
         
-        st.session_state.quiz_id = random.randint(1000, 9999)
+        st.session_state.quiz_id = new_attempt_id()
         st.session_state.quiz_completed = False
         st.rerun()
     
@@ -113,13 +149,14 @@ def student_quiz_interface():
     
     if st.session_state.get('current_quiz_id') != selected_quiz_id:
         for key in ['current_question', 'score', 'student_answers', 'quiz_started', 
-                   'randomized_quiz', 'quiz_id', 'current_quiz_id', 'quiz_completed']:
+                   'attempt', 'quiz_id', 'current_quiz_id', 'quiz_completed']:
             if key in st.session_state:
                 del st.session_state[key]
         st.rerun()
 
     def save_result():
-        total_max_points = sum(q["points"] for q in st.session_state.randomized_quiz)
+        attempt_questions = resolve_attempt(st.session_state.attempt)
+        total_max_points = sum(q["points"] for q in attempt_questions)
         percentage = round((st.session_state.score / total_max_points) * 100, 2)
         grade = calculate_grade(percentage)
         
@@ -127,27 +164,31 @@ def student_quiz_interface():
             "student_name": st.session_state.student_name,
             "student_email": st.session_state.student_email,
             "score": st.session_state.score,
-            "total_questions": len(st.session_state.randomized_quiz),
+            "total_questions": len(attempt_questions),
             "percentage": percentage,
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "answers": json.dumps(st.session_state.student_answers),
             "class": st.session_state.student_class,
             "max_points": total_max_points,
             "grade": grade,
-            "quiz_id": st.session_state.quiz_id
+            # A régi "quiz_id" oszlopot is kitöltjük a meglévő szűrők, exportok miatt
+            "quiz_id": st.session_state.quiz_id,
+            "attempt_id": st.session_state.quiz_id,
+            # Mag, változat és permutációk: a kitöltés később pontosan visszaállítható
+            "attempt_spec": attempt_spec_to_json(st.session_state.attempt)
         }
         
-        df = load_results(selected_quiz_id)
-        df = pd.concat([df, pd.DataFrame([result])], ignore_index=True)
-        save_results(selected_quiz_id, df)
+        # Egy korábbi, félbeszakadt mentés után ne kerüljön be kétszer
+        if not attempt_saved(selected_quiz_id, st.session_state.quiz_id):
+            submit_result(selected_quiz_id, result)
     
     def show_question():
-        q = st.session_state.randomized_quiz[st.session_state.current_question]
+        q = resolve_attempt_question(st.session_state.attempt, st.session_state.current_question)
         
         st.markdown(
             f"""
             <div style="background-color: #f0f8ff; padding: 20px; border-radius: 10px; border-left: 5px solid #4CAF50; margin-bottom: 20px;">
-                <p style="font-size: 16px; color: #666; margin-bottom: 5px;">Kérdés {st.session_state.current_question + 1}/{len(st.session_state.randomized_quiz)}</p>
+                <p style="font-size: 16px; color: #666; margin-bottom: 5px;">Kérdés {st.session_state.current_question + 1}/{len(st.session_state.attempt['order'])}</p>
                 <h2 style="color: #333; margin-bottom: 15px; font-size: 22px;">{q['question']}</h2>
                 <p style="font-size: 14px; color: #777;">(Pontérték: {q['points']}) - {type_labels[q['type']]}</p>
             </div>
@@ -176,7 +217,13 @@ def student_quiz_interface():
                     user_answer.append(option)
         else:
             if "match_type" in q and q["match_type"] == "number":
-                st.write("**Add meg a választ szám formátumban (lehet tört is, pl. 29/5):**")
+                st.write("**Add meg a választ szám formátumban (lehet tört vagy hatvány is, pl. 29/5, 2,5·10^3, 1e-12):**")
+                user_answer = st.text_input("Válasz:", key=f"text_{st.session_state.quiz_id}_{st.session_state.current_question}")
+            elif "match_type" in q and q["match_type"] == "unit":
+                st.write("**Add meg a választ mértékegységgel együtt (pl. 300 cm, 0,3 kΩ):**")
+                user_answer = st.text_input("Válasz:", key=f"text_{st.session_state.quiz_id}_{st.session_state.current_question}")
+            elif "match_type" in q and q["match_type"] == "expression":
+                st.write("**Add meg a kifejezést (a szorzásjel elhagyható, hatvány ^ vagy felső index, pl. a² + 2ab + b²):**")
                 user_answer = st.text_input("Válasz:", key=f"text_{st.session_state.quiz_id}_{st.session_state.current_question}")
             else:
                 st.write("**Add meg a választ szöveges formában:**")
@@ -191,13 +238,14 @@ def student_quiz_interface():
                 return
             
             match_type = q.get("match_type", "exact")
-            earned_points = calculate_score(user_answer, q["answer"], q["type"], q["points"], match_type)
+            earned_points = calculate_score(user_answer, q["answer"], q["type"], q["points"], match_type,
+                                            answer_key=q.answer_key)
             
             answer_data = {
                 "question": q["question"],
                 "type": q["type"],
                 "student_answer": user_answer,
-                "correct_answer": q["answer"],
+                "correct_answer": to_plain(q["answer"]),
                 "earned_points": earned_points,
                 "max_points": q["points"],
                 "is_correct": earned_points == q["points"]
@@ -209,23 +257,30 @@ def student_quiz_interface():
             if q["type"] == "text":
                 answer_data["match_type"] = match_type
                 answer_data["normalized_student"] = normalize_text(user_answer)
-                answer_data["normalized_correct"] = [normalize_text(ca) for ca in q["answer"]]
-            
-            st.session_state.student_answers.append(answer_data)
+                answer_data["normalized_correct"] = list(q.answer_key.normalized)
             
-            st.session_state.score += earned_points
+            # Ha a kérdésre már van rögzített válasz (pl. a mentés hibája után újra
+            # megnyomott gomb), nem vesszük fel és nem számoljuk újra
+            if len(st.session_state.student_answers) == st.session_state.current_question:
+                st.session_state.student_answers.append(answer_data)
+                st.session_state.score += earned_points
             
-            if st.session_state.current_question < len(st.session_state.randomized_quiz) - 1:
+            if st.session_state.current_question < len(st.session_state.attempt["order"]) - 1:
                 st.session_state.current_question += 1
                 st.rerun()
             else:
-                save_result()
-                st.session_state.quiz_completed = True
-                st.rerun()
+                try:
+                    save_result()
+                except Exception as e:
+                    # A válaszok a munkamenetben maradnak, a gomb újra megnyomható
+                    st.error(f"Az eredmény mentése nem sikerült, kérjük próbáld újra! ({e})")
+                else:
+                    st.session_state.quiz_completed = True
+                    st.rerun()
     
     if 'quiz_completed' in st.session_state and st.session_state.quiz_completed:
         st.balloons()
-        total_max_points = sum(q["points"] for q in st.session_state.randomized_quiz)
+        total_max_points = sum(q["points"] for q in resolve_attempt(st.session_state.attempt))
         percentage = (st.session_state.score / total_max_points) * 100
         grade = calculate_grade(percentage)
         
@@ -250,7 +305,7 @@ def student_quiz_interface():
         st.info(f"**Értékelés:** {grade_descriptions[grade]}")
         
         if questions_to_show > 0 and questions_to_show < total_questions:
-            st.info(f"ℹ️ Ebből a quizből {len(st.session_state.randomized_quiz)} véletlenszerűen kiválasztott kérdést kaptál meg (összesen {total_questions} kérdésből).")
+            st.info(f"ℹ️ Ebből a quizből {len(st.session_state.attempt['order'])} véletlenszerűen kiválasztott kérdést kaptál meg (összesen {total_questions} kérdésből).")
         
         with st.expander("Részletes eredmények megtekintése"):
             for i, answer in enumerate(st.session_state.student_answers, 1):
@@ -268,7 +323,7 @@ def student_quiz_interface():
                         if not answer["is_correct"] and show_correct_answers:
                             st.write(f"   **Helyes válasz(ok):** {', '.join(answer['correct_answer']) if isinstance(answer['correct_answer'], list) else answer['correct_answer']}")
                             if "match_type" in answer:
-                                st.write(f"   **Értékelés típusa:** {answer['match_type']}")
+                                st.write(f"   **Értékelés típusa:** {match_type_labels.get(answer['match_type'], answer['match_type'])}")
                         elif not answer["is_correct"] and not show_correct_answers:
                             st.write("   **Helyes válasz:** *A tanár nem engedélyezte a megjelenítést*")
                     else:
@@ -290,7 +345,7 @@ def student_quiz_interface():
         
         if allow_retake:
             if st.button("Újra kezdés"):
-                for key in ['current_question', 'score', 'student_answers', 'quiz_completed', 'randomized_quiz', 'quiz_id', 'current_quiz_id', 'quiz_started']:
+                for key in ['current_question', 'score', 'student_answers', 'quiz_completed', 'attempt', 'quiz_id', 'current_quiz_id', 'quiz_started']:
                     if key in st.session_state:
                         del st.session_state[key]
                 st.rerun()
@@ -5,18 +5,14 @@ from common import *
 def teacher_students_management():
     st.header("👥 Diákok és osztályok kezelése")
     
-    students_data = load_students()
-    classes = students_data.get("classes", {})
+    classes = get_classes()
     
     col1, col2 = st.columns([3, 1])
     with col1:
         new_class_name = st.text_input("Új osztály neve", placeholder="pl. 9.A")
     with col2:
         if st.button("➕ Osztály hozzáadása"):
-            if new_class_name and new_class_name not in classes:
-                classes[new_class_name] = {}
-                students_data["classes"] = classes
-                save_students(students_data)
+            if new_class_name and add_class(new_class_name):
                 st.success(f"'{new_class_name}' osztály létrehozva!")
                 st.rerun()
             else:
@@ -27,7 +23,7 @@ def teacher_students_management():
         st.subheader("Válassz osztályt:")
         selected_class = st.radio(
             "Osztályok:",
-            options=list(classes.keys()),
+            options=classes,
             key="class_selector_radio"
         )
         
@@ -44,16 +40,7 @@ def teacher_students_management():
             
             if st.button("💾 Diák hozzáadása"):
                 if new_student_name and new_student_email and new_student_password:
-                    email_exists = False
-                    for class_name, class_students in classes.items():
-                        for student_id, student_info in class_students.items():
-                            if student_info["email"].lower() == new_student_email.lower():
-                                email_exists = True
-                                break
-                        if email_exists:
-                            break
-                    
-                    if email_exists:
+                    if student_email_exists(new_student_email):
                         st.error("Ez az email cím már használatban van!")
                     else:
                         add_student(selected_class, new_student_name, new_student_email, new_student_password)
@@ -63,10 +50,10 @@ def teacher_students_management():
                     st.error("Minden mezőt ki kell tölteni!")
         
         st.subheader(f"Diákok listája - {selected_class}")
-        class_students = classes.get(selected_class, {})
+        class_students = get_students_in_class(selected_class)
         
         if class_students:
-            for student_id, student_info in class_students.items():
+            for student_id, student_info in list(class_students.items()):
                 col1, col2, col3 = st.columns([2, 2, 1])
                 with col1:
                     st.write(f"**Név:** {student_info['name']}")
@@ -348,13 +335,78 @@ def teacher_quiz_management():
                         key=f"q_{selected_quiz_id}_{i}_correct_text"
                     )
                     
+                    match_types = list(match_type_labels.keys())
                     match_type = st.radio(
                         f"Értékelés típusa {i+1}",
-                        options=["exact", "contains", "number"],
-                        index=["exact", "contains", "number"].index(question.get("match_type", "exact")),
+                        options=match_types,
+                        format_func=lambda x: match_type_labels[x],
+                        index=match_types.index(question.get("match_type", "exact")),
                         key=f"q_{selected_quiz_id}_{i}_match",
                         horizontal=True
                     )
+                    if match_type == "keywords":
+                        st.caption("Soronként egy szempont; a szinonimák | jellel elválasztva, a súly = után. "
+                                   "Pl.: GNOME | KDE = 2")
+                    number_options = {}
+                    if match_type == "unit":
+                        number_options["unit"] = st.text_input(
+                            f"Mértékegység {i+1}", value=question.get("unit", ""),
+                            help="A mértékegység nélkül megadott helyes válaszok egysége, pl. cm vagy Ω. "
+                                 "A helyes válasz egységgel is megadható: 300 cm.",
+                            key=f"q_{selected_quiz_id}_{i}_unit"
+                        ).strip()
+                        number_options["same_unit"] = st.checkbox(
+                            f"Csak a kért mértékegységben fogadható el (átváltási feladat) {i+1}",
+                            value=bool(question.get("same_unit", False)),
+                            key=f"q_{selected_quiz_id}_{i}_same_unit"
+                        )
+                    if match_type == "expression":
+                        st.caption("Változók egy betűvel; a szorzásjel elhagyható, hatvány ^ vagy felső index, "
+                                   "gyök √. Pl.: a² + 2ab + b², (a - b)(a + b)")
+                        forms = list(expression_form_labels.keys())
+                        number_options["form"] = st.selectbox(
+                            f"Elvárt alak {i+1}",
+                            options=forms,
+                            format_func=lambda x: expression_form_labels[x],
+                            index=forms.index(question.get("form", "")) if question.get("form", "") in forms else 0,
+                            help="A kérdésben szereplő kifejezés is egyenértékű a helyes válasszal, "
+                                 "ezért érdemes megadni, milyen alakban várjuk a választ.",
+                            key=f"q_{selected_quiz_id}_{i}_form"
+                        )
+                    if match_type in ["number", "unit"]:
+                        st.caption("Elfogadott alak pl. 29/5, 10^-12, 1e-12, 2,5·10^3; intervallum is megadható: [2,5; 3]. "
+                                   "A 0 érték az alapértelmezett eltérést (0,001) jelenti, nagyon kis értékeknél "
+                                   "adjon meg relatív eltérést.")
+                        tol_col1, tol_col2, tol_col3 = st.columns(3)
+                        with tol_col1:
+                            number_options["tolerance"] = st.number_input(
+                                f"Abszolút eltérés {i+1}", min_value=0.0,
+                                value=float(question.get("tolerance", 0.0)), format="%g",
+                                key=f"q_{selected_quiz_id}_{i}_tolerance"
+                            )
+                        with tol_col2:
+                            number_options["rel_tolerance"] = st.number_input(
+                                f"Relatív eltérés (%) {i+1}", min_value=0.0, max_value=100.0,
+                                value=float(question.get("rel_tolerance", 0.0)) * 100, format="%g",
+                                key=f"q_{selected_quiz_id}_{i}_rel_tolerance"
+                            ) / 100
+                        with tol_col3:
+                            number_options["sig_figs"] = st.number_input(
+                                f"Értékes jegyek {i+1}", min_value=0, max_value=15,
+                                value=int(question.get("sig_figs", 0)),
+                                key=f"q_{selected_quiz_id}_{i}_sig_figs"
+                            )
+                    
+                    max_distance = None
+                    if match_type == "fuzzy":
+                        max_distance = st.number_input(
+                            f"Megengedett eltérés (karakter) {i+1}",
+                            min_value=0,
+                            max_value=5,
+                            value=int(question.get("max_distance", FUZZY_MAX_DISTANCE)),
+                            help="Rövid válaszoknál kevesebb: 4 karakterenként legfeljebb 1 eltérés.",
+                            key=f"q_{selected_quiz_id}_{i}_max_distance"
+                        )
             
             with col2:
                 if st.button("🗑️ Kérdés törlése", key=f"del_{selected_quiz_id}_{i}"):
@@ -379,6 +431,15 @@ def teacher_quiz_management():
                 else:
                     quiz_data[i]["answer"] = [ans.strip() for ans in correct_answers_text.split("\n") if ans.strip()]
                     quiz_data[i]["match_type"] = match_type
+                    if max_distance is not None:
+                        quiz_data[i]["max_distance"] = max_distance
+                    else:
+                        quiz_data[i].pop("max_distance", None)
+                    for option in ("tolerance", "rel_tolerance", "sig_figs", "unit", "same_unit", "form"):
+                        if number_options.get(option):
+                            quiz_data[i][option] = number_options[option]
+                        else:
+                            quiz_data[i].pop(option, None)
                 
                 save_quiz(selected_quiz_id, quiz_data)
                 st.success("Kérdés mentve!")
@@ -395,6 +456,19 @@ def teacher_quiz_management():
         save_quiz(selected_quiz_id, quiz_data)
         st.success("Új kérdés hozzáadva!")
         st.rerun()
+    
+    st.subheader("🔁 Korábbi kitöltések újraértékelése")
+    st.write("Javított helyes válasz vagy pontérték után a már beküldött kitöltések pontszáma és osztályzata az aktuális kérdéssor alapján újraszámolható. "
+             "Alapesetben csak a legutóbbi újraértékelés óta módosított kérdések pontozódnak újra.")
+    regrade_all = st.checkbox("Minden kérdés újrapontozása", key=f"regrade_all_{selected_quiz_id}")
+    if st.button("Újraértékelés", key=f"regrade_{selected_quiz_id}"):
+        with st.spinner("Újraértékelés folyamatban..."):
+            stats = regrade_results(selected_quiz_id,
+                                    questions=[q["question"] for q in quiz_data] if regrade_all else None)
+        if stats["regraded"]:
+            st.success(f"{stats['attempts']} kitöltésből {stats['regraded']} eredménye változott ({stats['answers']} válasz).")
+        else:
+            st.info(f"A {stats['attempts']} kitöltés eredménye nem változott.")
 
 def teacher_results_management():
     st.header("📊 Quiz Eredmények")
@@ -404,22 +478,17 @@ def teacher_results_management():
         return
     
     selected_quiz_id = st.session_state.teacher_selected_quiz
-    quiz_data = load_quiz(selected_quiz_id)
+    quiz_data = get_quiz(selected_quiz_id)
     
     try:
-        df = load_results(selected_quiz_id)
-        if df.empty:
+        if count_results(selected_quiz_id) == 0:
             st.info("Még nincsenek eredmények ehhez a quizhez.")
         else:
-            df['grade'] = pd.to_numeric(df['grade'], errors='coerce')
-            df = df.dropna(subset=['grade'])
-            df['grade'] = df['grade'].astype(int)
-            
             st.sidebar.header("Szűrők")
             
             # Osztály kiválasztása rádiógombokkal
             st.sidebar.subheader("Osztály")
-            class_options = ["Összes"] + list(df['class'].unique())
+            class_options = ["Összes"] + get_result_classes(selected_quiz_id)
             selected_class = st.sidebar.radio(
                 "Válassz osztályt:",
                 options=class_options,
@@ -429,37 +498,42 @@ def teacher_results_management():
             selected_grade = st.sidebar.selectbox("Osztályzat", ["Összes", "1", "2", "3", "4", "5"])
             date_range = st.sidebar.date_input("Dátum tartomány", [])
             
-            filtered_df = df.copy()
-            if selected_class != "Összes":
-                filtered_df = filtered_df[filtered_df['class'] == selected_class]
-            
-            if selected_grade != "Összes":
-                filtered_df = filtered_df[filtered_df['grade'] == int(selected_grade)]
+            # A szűrést a tár végzi (SQLite esetén indexelt lekérdezéssel)
+            filtered_df = load_results(
+                selected_quiz_id,
+                class_name=selected_class if selected_class != "Összes" else None,
+                grade=int(selected_grade) if selected_grade != "Összes" else None,
+                date_from=date_range[0] if len(date_range) == 2 else None,
+                date_to=date_range[1] if len(date_range) == 2 else None,
+                with_answers=False
+            )
+            filtered_df['grade'] = pd.to_numeric(filtered_df['grade'], errors='coerce')
+            filtered_df = filtered_df.dropna(subset=['grade'])
+            filtered_df['grade'] = filtered_df['grade'].astype(int)
             
-            if len(date_range) == 2:
-                filtered_df['timestamp'] = pd.to_datetime(filtered_df['timestamp'])
-                filtered_df = filtered_df[
-                    (filtered_df['timestamp'].dt.date >= date_range[0]) & 
-                    (filtered_df['timestamp'].dt.date <= date_range[1])
-                ]
+            # Csak osztályszűrésnél az előre számolt összesítők elegendők
+            if selected_grade == "Összes" and len(date_range) != 2:
+                summary = summarize_result_aggregates(
+                    selected_quiz_id, None if selected_class == "Összes" else selected_class
+                )
+            else:
+                summary = summarize_results_df(filtered_df)
+            if summary is None:
+                summary = summarize_results_df(filtered_df.iloc[0:0])
             
             st.subheader("Áttekintés")
             col1, col2, col3, col4, col5 = st.columns(5)
             
             with col1:
-                st.metric("Összes kitöltés", len(filtered_df))
+                st.metric("Összes kitöltés", summary["count"])
             with col2:
-                avg_score = filtered_df['percentage'].mean()
-                st.metric("Átlagos pontszám", f"{avg_score:.1f}%")
+                st.metric("Átlagos pontszám", f"{summary['mean_percentage']:.1f}%")
             with col3:
-                best_score = filtered_df['percentage'].max()
-                st.metric("Legjobb eredmény", f"{best_score:.1f}%")
+                st.metric("Legjobb eredmény", f"{summary['best_percentage']:.1f}%")
             with col4:
-                completion_count = len(filtered_df['student_name'].unique())
-                st.metric("Különböző diákok", completion_count)
+                st.metric("Különböző diákok", summary["distinct_students"])
             with col5:
-                avg_grade = filtered_df['grade'].mean()
-                st.metric("Átlagos osztályzat", f"{avg_grade:.1f}")
+                st.metric("Átlagos osztályzat", f"{summary['mean_grade']:.1f}")
             
             # Diák kiválasztása részletes eredményhez - TÁBLÁZATOS MEGJELENÍTÉS
             st.subheader("🔍 Diákok eredményei")
@@ -502,24 +576,30 @@ def teacher_results_management():
                 # Diák kiválasztása részletes eredményhez
                 st.subheader("Részletes eredmény megtekintése")
                 
-                # Diák kiválasztása
-                student_options = [f"{row['student_name']} ({row['class']}) - {row['timestamp']}" 
-                                  for _, row in filtered_df.iterrows()]
+                # Diák kiválasztása (kitöltés azonosító -> megjelenített felirat)
+                student_options = dict(zip(
+                    filtered_df['attempt_key'],
+                    filtered_df['student_name'].astype(str) + " (" + filtered_df['class'].astype(str) + ") - "
+                    + filtered_df['timestamp'].astype(str)
+                ))
                 
                 if student_options:
-                    selected_student = st.selectbox(
+                    selected_attempt = st.selectbox(
                         "Válassz egy diákot a részletes eredmény megtekintéséhez:",
-                        options=student_options,
+                        options=list(student_options.keys()),
+                        format_func=lambda key: student_options[key],
                         key="student_detail_selector"
                     )
                     
                     if st.button("📋 Részletes eredmény megjelenítése"):
-                        # Kiválasztott diák adatainak lekérése
-                        selected_index = student_options.index(selected_student)
-                        selected_row = filtered_df.iloc[selected_index]
+                        # A kiválasztott kitöltést az azonosítója alapján, közvetlenül olvassuk be
+                        selected_row = load_attempt(selected_quiz_id, selected_attempt)
                         
-                        # Diák eredményének megjelenítése
-                        display_student_result(selected_row.to_dict(), quiz_data)
+                        if selected_row is None:
+                            st.error("A kiválasztott kitöltés nem található.")
+                        else:
+                            # Diák eredményének megjelenítése
+                            display_student_result(selected_row, quiz_data)
                 else:
                     st.info("Nincs megjeleníthető diák a kiválasztott szűrőkkel.")
             
@@ -566,10 +646,27 @@ def teacher_settings():
         else:
             success, message = change_teacher_password(old_password, new_password)
             if success:
+                # A régi jelszóhoz kiadott tokenek érvénytelenek, ez a munkamenet újat kap
+                if 'session_id' in st.session_state:
+                    st.query_params[SESSION_TOKEN_PARAM] = teacher_session_token(st.session_state.session_id)
                 st.success(message)
             else:
                 st.error(message)
 
+    st.subheader("Eredmények tárolása")
+    if get_results_backend() == "sqlite":
+        st.info("Az eredmények SQLite adatbázisban vannak tárolva.")
+    else:
+        st.write("Az eredmények jelenleg quizenkénti CSV fájlokban vannak. Sok kitöltésnél az SQLite adatbázis gyorsabb.")
+        if st.button("Eredmények áttöltése SQLite adatbázisba"):
+            migrated_rows = migrate_results_to_sqlite()
+            st.success(f"{migrated_rows} eredmény áttöltve, mostantól az SQLite adatbázis használatos.")
+
+        school_year_start = current_school_year_start()
+        if st.button(f"Korábbi tanévek eredményeinek tömörítése ({school_year_start} előtt)"):
+            archived = archive_old_results(school_year_start)
+            st.success(f"{archived} havi eredményfájl archiválva.")
+
     config = load_config()
     st.header("AI Beállításai")
     st.text("Hogyan szerezzek api kulcsot?")
@@ -651,17 +748,39 @@ def teacher_interface():
     if 'teacher_logged_in' not in st.session_state:
         st.session_state.teacher_logged_in = False
     
+    if not st.session_state.teacher_logged_in and SESSION_TOKEN_PARAM in st.query_params:
+        # Frissítés után az aláírt tokennel lépünk vissza, jelszó-ellenőrzés nélkül
+        session_id = restore_teacher_login(st.query_params.get(SESSION_TOKEN_PARAM))
+        if session_id:
+            st.session_state.update(load_session_snapshot(session_id))
+            st.session_state.teacher_logged_in = True
+            st.session_state.session_id = session_id
+            st.query_params[SESSION_TOKEN_PARAM] = teacher_session_token(session_id)
+        else:
+            del st.query_params[SESSION_TOKEN_PARAM]
+    
     if not st.session_state.teacher_logged_in:
         password = st.text_input("Tanári jelszó", type="password")
         if st.button("Bejelentkezés"):
-            if verify_teacher_password(password):
+            verified = verify_teacher_password(password)
+            if verified:
                 st.session_state.teacher_logged_in = True
+                st.session_state.session_id = new_session_id()
+                token = teacher_session_token(st.session_state.session_id)
+                if token:
+                    st.query_params[SESSION_TOKEN_PARAM] = token
                 if 'teacher_selected_quiz' not in st.session_state:
                     st.session_state.teacher_selected_quiz = None
                 st.success("Sikeres bejelentkezés!")
                 st.rerun()
+            elif verified is LOGIN_BUSY:
+                st.warning("A bejelentkezés most nem fér sorra, próbáld újra néhány másodperc múlva!")
             else:
-                st.error("Hibás jelszó!")
+                retry_after = login_retry_after(TEACHER_ACCOUNT)
+                if retry_after:
+                    st.error(f"Túl sok sikertelen próbálkozás! Próbáld újra {retry_after} másodperc múlva.")
+                else:
+                    st.error("Hibás jelszó!")
         return
     
     st.sidebar.title("Tanári Navigáció")
@@ -689,8 +808,18 @@ def teacher_interface():
     if st.sidebar.button("Kijelentkezés"):
         st.session_state.teacher_logged_in = False
         st.session_state.teacher_menu = "Diákok és osztályok kezelése"
+        if 'session_id' in st.session_state:
+            drop_session_snapshot(st.session_state.session_id)
+            del st.session_state.session_id
+        if SESSION_TOKEN_PARAM in st.query_params:
+            del st.query_params[SESSION_TOKEN_PARAM]
         st.rerun()
     
+    if 'session_id' in st.session_state:
+        save_session_snapshot(st.session_state.session_id,
+                              {key: st.session_state[key] for key in ('teacher_menu', 'teacher_selected_quiz')
+                               if key in st.session_state})
+    
     if selected_menu == "Diákok és osztályok kezelése":
         teacher_students_management()
     elif selected_menu == "Quiz Szerkesztése":
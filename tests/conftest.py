@@ -0,0 +1,18 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# A common modul importáláskor a munkakönyvtárban hozza létre az adatmappákat,
+# ezért a tesztek egy üres ideiglenes könyvtárban futnak
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp(prefix="quiz_teszt_"))
+
+import common as _common
+
+
+@pytest.fixture
+def common():
+    return _common
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+
+def _result(attempt_id, student, class_name, percentage, grade):
+    return {
+        "student_name": student, "score": 1, "total_questions": 1, "percentage": percentage,
+        "timestamp": "2025-10-01 08:00:00", "answers": "[]", "max_points": 1, "grade": grade,
+        "class": class_name, "attempt_id": attempt_id
+    }
+
+
+RESULTS = [
+    _result("g-1", "Anna", "9.A", 95.0, 5),
+    _result("g-2", "Béla", "9.A", 40.0, 2),
+    _result("g-3", "Anna", "9.A", 75.0, 4),
+    _result("g-4", "Csaba", "9.B", 60.0, 3),
+]
+
+
+def _assert_same_summary(summary, expected):
+    assert summary.keys() == expected.keys()
+    for key in expected:
+        assert summary[key] == pytest.approx(float(expected[key])), key
+
+
+def test_incremental_aggregates_match_full_table(common):
+    for result in RESULTS:
+        common.append_results({"osszesito_teszt": [result]})
+    
+    df = common.load_results("osszesito_teszt")
+    _assert_same_summary(common.summarize_result_aggregates("osszesito_teszt"), common.summarize_results_df(df))
+    _assert_same_summary(common.summarize_result_aggregates("osszesito_teszt", "9.A"),
+                         common.summarize_results_df(df[df["class"] == "9.A"]))
+    
+    aggregates = common.load_result_aggregates("osszesito_teszt")
+    assert aggregates["9.A"]["students"] == ["Anna", "Béla"]
+    assert aggregates["9.B"]["grades"]["3"] == 1
+
+
+def test_missing_or_corrupt_aggregates_are_rebuilt(common):
+    # A kitöltés azonosítók globálisan egyediek, ezért itt újakat kapnak
+    results = [{**result, "attempt_id": "u" + result["attempt_id"]} for result in RESULTS]
+    common.append_results({"ujraepites_teszt": results[:2]})
+    expected = common.load_result_aggregates("ujraepites_teszt")
+    
+    os.remove(common.get_aggregates_file("ujraepites_teszt"))
+    assert common.load_result_aggregates("ujraepites_teszt") == expected
+    
+    with open(common.get_aggregates_file("ujraepites_teszt"), 'w') as f:
+        f.write("{csonka")
+    # A következő mentés a sérült összesítőt az új sorral együtt újraépíti
+    common.append_results({"ujraepites_teszt": results[2:3]})
+    assert common.load_result_aggregates("ujraepites_teszt")["9.A"]["count"] == 3
+
+
+def test_rows_without_valid_grade_are_skipped(common):
+    aggregates = common._add_to_aggregates({}, [
+        {"grade": "n/a", "percentage": 50, "class": "9.A", "student_name": "X"},
+        {"grade": 4, "percentage": float("nan"), "class": "9.A", "student_name": "Y"},
+        {"grade": 3.0, "percentage": "55", "class": float("nan"), "student_name": "Z"},
+    ])
+    assert list(aggregates) == [""]
+    assert aggregates[""]["count"] == 1
+    assert common.summarize_result_aggregates("nincs_ilyen_teszt") is None
@@ -0,0 +1,111 @@
+import itertools
+import random
+import re
+
+import pytest
+
+
+# A fordított kulcs előtti értékelés, változtatás nélkül: ehhez hasonlítjuk az AnswerKey-t
+def legacy_normalize_text(text):
+    if text is None:
+        return ""
+    return re.sub(r'\s+', ' ', str(text).strip().lower())
+
+def legacy_parse_number(text):
+    if text is None:
+        return None
+    text = legacy_normalize_text(text)
+    if '/' in text:
+        parts = text.split('/')
+        if len(parts) == 2:
+            try:
+                numerator = float(parts[0])
+                denominator = float(parts[1])
+                if denominator != 0:
+                    return numerator / denominator
+            except (ValueError, ZeroDivisionError):
+                pass
+    try:
+        return float(text.replace(',', '.'))
+    except ValueError:
+        return None
+
+def legacy_evaluate_text_answer(student_answer, correct_answers, match_type="exact"):
+    student_normalized = legacy_normalize_text(student_answer)
+    if match_type == "number":
+        student_num = legacy_parse_number(student_answer)
+        if student_num is None:
+            return False
+        correct_nums = [num for num in map(legacy_parse_number, correct_answers) if num is not None]
+        return any(abs(student_num - correct_num) < 0.001 for correct_num in correct_nums)
+    elif match_type == "contains":
+        correct_normalized = [legacy_normalize_text(ca) for ca in correct_answers]
+        return any(correct in student_normalized for correct in correct_normalized)
+    else:
+        correct_normalized = [legacy_normalize_text(ca) for ca in correct_answers]
+        return student_normalized in correct_normalized
+
+
+TEXT_KEYS = [
+    ["Budapest"],
+    ["ls", "ls -l", "ls -la"],
+    ["Duna", "a Duna"],
+    ["pwd"],
+    ["Kékes", "Kékes-tető"],
+]
+TEXT_ANSWERS = [
+    "budapest", " Budapest ", "BUDAPEST", "Budapesten", "Buda pest", "",
+    "ls", "LS  -L", "ls -la", "ls -al", "a duna", "A   Duna", "duna folyó",
+    "pwd", "kékes", "Kékes-tető", "kekes", "a kékes-tető csúcsa",
+]
+
+NUMBER_KEYS = [
+    ["1.2"],
+    ["3.6", "18/5"],
+    ["5.8", "29/5"],
+    ["0.25", "1/4"],
+    ["-2"],
+    ["1991"],
+    ["12.5", "1000", "0.1"],
+    ["0"],
+]
+
+
+def number_answers():
+    rng = random.Random(15)
+    answers = ["29/5", "18/5", "13/10", "1/4", "-2", "1991", "0", "abc", "", "1/0", "3,6", "5,8"]
+    for target in (1.2, 3.6, 5.8, 0.25, -2.0, 1991.0, 12.5, 1000.0, 0.1, 0.0):
+        for delta in (0.0, 0.0004, -0.0004, 0.0009, -0.0009, 0.0011, -0.0011, 0.01, 1.0):
+            answers.append(f"{target + delta:.4f}")
+            answers.append(f"{target + delta:.4f}".replace(".", ","))
+    answers.extend(f"{rng.uniform(-3, 10):.3f}" for _ in range(200))
+    return answers
+
+
+@pytest.mark.parametrize("match_type", ["exact", "contains"])
+def test_text_keys_match_legacy(common, match_type):
+    for correct, student in itertools.product(TEXT_KEYS, TEXT_ANSWERS):
+        key = common.compile_answer_key(correct, match_type)
+        assert key.matches(student) == legacy_evaluate_text_answer(student, correct, match_type), (correct, student)
+
+
+def test_number_keys_match_legacy(common):
+    for correct, student in itertools.product(NUMBER_KEYS, number_answers()):
+        key = common.compile_answer_key(correct, "number")
+        assert key.matches(student) == legacy_evaluate_text_answer(student, correct, "number"), (correct, student)
+
+
+def test_number_bisect_with_mixed_tolerances(common):
+    # Relatív eltérésnél a tűrések célértékenként mások: a szűk cél nem takarhatja el a tágat
+    key = common.AnswerKey(["100", "1", "50"], match_type="number", rel_tolerance=0.1)
+    for student, expected in [("90", True), ("110", True), ("89", False), ("0,95", True),
+                              ("1,2", False), ("55", True), ("56", False), ("45", True), ("60", False)]:
+        assert key.matches(student) == expected, student
+
+
+def test_number_sig_figs(common):
+    key = common.AnswerKey(["3.14159", "2.71828"], match_type="number", sig_figs=3)
+    assert key.matches("3,14")
+    assert key.matches("2,72")
+    assert not key.matches("3,15")
+    assert not key.matches("2,7")
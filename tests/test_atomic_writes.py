@@ -0,0 +1,28 @@
+import glob
+import os
+import threading
+
+
+def test_concurrent_saves_use_separate_temp_files(common):
+    """Párhuzamos mentéseknél egyik író sem cseréli ki a másik félkész ideiglenes fájlját"""
+    errors = []
+    
+    def writer(n):
+        try:
+            for i in range(20):
+                common.save_quiz("parhuzamos_teszt", [
+                    {"question": f"{n}. író, {i}. mentés", "type": "text", "answer": ["x"], "points": 1}
+                ])
+        except Exception as e:  # a hibát a fő szálon ellenőrizzük
+            errors.append(e)
+    
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == []
+    assert len(common.get_quiz("parhuzamos_teszt")) == 1
+    assert glob.glob(os.path.join(common.QUIZZES_DIR, "*.tmp")) == []
+    assert glob.glob("*.tmp") == []
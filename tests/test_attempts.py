@@ -0,0 +1,52 @@
+import pytest
+
+
+def _choice_question(text, options):
+    return {"question": text, "type": "single", "options": options, "answer": options[0], "points": 1}
+
+
+def _forget_loaded_versions(common):
+    """Újraindítás utáni állapot: a memóriában tartott változatok elvesznek"""
+    with common._quiz_cache_lock:
+        common._quiz_cache.clear()
+        common._quiz_old_versions.clear()
+        common._quiz_record_cache.clear()
+
+
+def test_attempt_survives_quiz_edit_and_restart(common):
+    common.save_quiz("valtozat_teszt", [
+        _choice_question("Melyik bolygó a legnagyobb?", ["Jupiter", "Szaturnusz", "Mars", "Föld"]),
+        _choice_question("Melyik a legkisebb?", ["Merkúr", "Mars", "Vénusz"]),
+    ])
+    spec = common.new_attempt_spec("valtozat_teszt", seed=12345)
+    seen = [(q["question"], q["options"]) for q in common.resolve_attempt(spec)]
+
+    common.save_quiz("valtozat_teszt", [_choice_question("Teljesen új kérdés?", ["igen", "nem"])])
+    _forget_loaded_versions(common)
+
+    stored = common.load_attempt_spec({"attempt_spec": common.attempt_spec_to_json(spec)})
+    assert stored == spec
+    assert [(q["question"], q["options"]) for q in common.resolve_attempt(stored)] == seen
+
+
+def test_attempt_spec_is_saved_with_the_result(common):
+    common.save_quiz("sor_teszt", [_choice_question("2 + 2?", ["4", "3", "5"])])
+    spec = common.new_attempt_spec("sor_teszt", seed=7)
+    common.append_results({"sor_teszt": [{
+        "student_name": "Teszt Elek", "score": 1, "total_questions": 1, "percentage": 100,
+        "timestamp": "2026-10-18 10:00:00", "answers": "[]", "max_points": 1, "grade": 5,
+        "attempt_id": "sor-1", "attempt_spec": common.attempt_spec_to_json(spec)
+    }]})
+
+    row = common.load_attempt("sor_teszt", "sor-1")
+    assert common.load_attempt_spec(row) == spec
+    # Az összesítő nézet nem tölti be
+    assert "attempt_spec" not in common.load_results("sor_teszt", with_answers=False).columns
+
+
+def test_missing_version_fails_loudly(common):
+    common.save_quiz("hianyzo_teszt", [_choice_question("Kérdés?", ["a", "b"])])
+    with pytest.raises(LookupError):
+        common.get_quiz_version("hianyzo_teszt", "0-0")
+    with pytest.raises(LookupError):
+        common.get_quiz_question("hianyzo_teszt", "0-0", 0)
@@ -0,0 +1,48 @@
+import pytest
+
+
+@pytest.mark.parametrize("answer, form", [
+    ("(a² - b²)", "factored"),
+    ("1(a² - b²)", "factored"),
+    ("(a² - b²)·1", "factored"),
+    ("(ab)(a + b)", "factored"),
+    ("(a - b)(a + b - b + b)", "factored"),
+    ("a² + 2ab + b² + 0", "expanded"),
+    ("a² + 2ab + b² + a - a", "expanded"),
+    ("a² + ab + ab + b²", "expanded"),
+    ("x^(4/2)", "simplified"),
+    ("x^1", "simplified"),
+    ("2·4x³", "simplified"),
+])
+def test_unfinished_answers_are_rejected(common, answer, form):
+    assert not common.expression_has_form(common.normalize_text(answer), form)
+
+
+@pytest.mark.parametrize("answer, form", [
+    ("(a - b)(a + b)", "factored"),
+    ("-(a - b)(a + b)", "factored"),
+    ("(a + b)²", "factored"),
+    ("2(a + b)", "factored"),
+    ("x(x + 1)", "factored"),
+    ("a² + 2ab + b²", "expanded"),
+    ("25 - 4a²", "expanded"),
+    ("x²", "simplified"),
+    ("x^(1/2)", "simplified"),
+    ("8x³", "simplified"),
+])
+def test_finished_answers_are_accepted(common, answer, form):
+    assert common.expression_has_form(common.normalize_text(answer), form)
+
+
+def test_question_itself_gets_no_credit(common):
+    key = common.AnswerKey(["(a - b)(a + b)"], match_type="expression", form="factored")
+    assert key.matches("(a + b)(a - b)")
+    assert not key.matches("(a² - b²)")
+    assert not key.matches("a² - b²")
+
+
+def test_negative_sample_points(common):
+    # Csak pozitív mintapontokkal √(a²) és a egyenértékűnek tűnne
+    assert not common.expressions_equivalent("√(a²)", "a")
+    assert common.expressions_equivalent("(a + b)²", "a² + 2ab + b²")
+    assert common.expressions_equivalent("√x⁴", "x²")
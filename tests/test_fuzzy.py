@@ -0,0 +1,23 @@
+import itertools
+import random
+
+
+def full_levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def test_banded_levenshtein_matches_full_table(common):
+    rng = random.Random(18)
+    words = ["", "a", "ab", "abc", "kékes", "kékes-tető", "budapest", "buadpest", "ls -la", "ls -al"]
+    words += ["".join(rng.choice("abcé ") for _ in range(rng.randint(0, 12))) for _ in range(60)]
+    for a, b in itertools.product(words, repeat=2):
+        expected = full_levenshtein(a, b)
+        for max_distance in range(4):
+            result = common.bounded_levenshtein(a, b, max_distance)
+            assert result == (expected if expected <= max_distance else max_distance + 1), (a, b, max_distance)
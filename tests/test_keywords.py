@@ -0,0 +1,38 @@
+import pytest
+
+
+def _rubric(common, *lines):
+    return common.compile_answer_key(tuple(lines), "keywords")
+
+
+def test_automaton_finds_overlapping_keywords(common):
+    automaton = common.KeywordAutomaton([("he", 1), ("she", 2), ("hers", 4), ("his", 8)])
+    assert automaton.search("ushers") == 1 | 2 | 4
+    assert automaton.search("this") == 8
+    assert automaton.search("semmi") == 0
+
+
+def test_rubric_weights_and_synonyms(common):
+    assert common._parse_keyword_rubric(("gnome | kde = 2", "terminal", "shell = 0")) == (
+        (("gnome", "kde"), 2.0), (("terminal",), 1.0), (("shell = 0",), 1.0)
+    )
+
+
+@pytest.mark.parametrize("answer, expected", [
+    ("A KDE és a terminál", 3),        # minden szempont: 2 + 1 súly
+    ("GNOME asztali környezet", 2),    # a szinonimák egyike elég
+    ("csak a Terminál", 1),         # kis- és nagybetű nem számít
+    ("semmi ilyesmi", 0),
+    ("gnome, kde, gnome", 2),          # egy szempont csak egyszer számít
+])
+def test_partial_credit_is_proportional_to_found_weight(common, answer, expected):
+    key = _rubric(common, "GNOME | KDE = 2", "terminál")
+    assert key.score(answer, 3) == expected
+
+
+def test_keyword_score_goes_through_calculate_score(common):
+    key = _rubric(common, "Linus", "Torvalds", "1991")
+    assert common.calculate_score("Linus Torvalds", ["Linus", "Torvalds", "1991"], "text", 2,
+                                  "keywords", key) == pytest.approx(1.33)
+    assert key.matches("Torvalds Linus 1991-ben")
+    assert not key.matches("Linus Torvalds")
@@ -0,0 +1,50 @@
+import pytest
+
+
+def _result(attempt_id):
+    return {
+        "student_name": "Teszt Elek", "score": 1, "total_questions": 1, "percentage": 100,
+        "timestamp": "2026-10-18 10:00:00", "answers": "[]", "max_points": 1, "grade": 5,
+        "class": "9.A", "attempt_id": attempt_id
+    }
+
+
+@pytest.fixture
+def csv_backend(common):
+    """A teszt CSV tárral indul, és utána is arra áll vissza (a többi teszt miatt)"""
+    def use(backend):
+        config = common.load_config()
+        config["results_backend"] = backend
+        common.save_config(config)
+    use("csv")
+    yield use
+    use("csv")
+
+
+def _sqlite_attempts(common, quiz_id):
+    return sorted(common._sqlite_load_results(quiz_id)["attempt_id"])
+
+
+def test_writer_that_missed_the_switch_goes_to_sqlite(common, csv_backend):
+    common.append_results({"koltozes_teszt": [_result("k-1"), _result("k-2")]})
+    assert common.migrate_results_to_sqlite() >= 2
+    assert common.get_results_backend() == "sqlite"
+    
+    # Egy író, amely még az átváltás előtt döntött a CSV mellett
+    path = common._partition_path("koltozes_teszt", common._partition_key("2026-10-18 10:00:00"))
+    size = len(open(path, 'rb').read())
+    common._csv_append_results("koltozes_teszt", [_result("k-3")])
+    
+    assert len(open(path, 'rb').read()) == size
+    assert _sqlite_attempts(common, "koltozes_teszt") == ["k-1", "k-2", "k-3"]
+
+
+def test_rerun_copies_only_rows_added_since(common, csv_backend):
+    common.append_results({"potlo_teszt": [_result("p-1")]})
+    common.migrate_results_to_sqlite()
+    
+    # Visszaváltás után a CSV-be írt sort a következő futtatás pótolja, duplikálás nélkül
+    csv_backend("csv")
+    common.append_results({"potlo_teszt": [_result("p-2")]})
+    assert common.migrate_results_to_sqlite() == 1
+    assert _sqlite_attempts(common, "potlo_teszt") == ["p-1", "p-2"]
@@ -0,0 +1,30 @@
+import pytest
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1 000", 1000.0),
+    ("1 000 000", 1000000.0),
+    ("12 500,5", 12500.5),
+    ("1 000.5", 1000.5),
+    ("2 + 3", 5.0),
+    ("2,5 · 10^3", 2500.0),
+])
+def test_thousands_grouping_and_operator_spaces(common, text, expected):
+    assert common.parse_numeric_expression(common.normalize_text(text)) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("text", ["2 3", "12 3456", "1 00", "1 000 5", "0,5 000", "1000 000 0"])
+def test_space_between_numbers_is_not_collapsed(common, text):
+    assert common.parse_numeric_expression(common.normalize_text(text)) is None
+
+
+def test_default_tolerance_matches_legacy_absolute_limit(common):
+    key = common.AnswerKey(["0.000000000001"], match_type="number")
+    # A régi értékelés szerint |diák - helyes| < 0,001
+    assert key.matches("0")
+    assert key.matches("0,0009")
+    assert not key.matches("0,002")
+    
+    opted_in = common.AnswerKey(["0.000000000001"], match_type="number", rel_tolerance=0.001)
+    assert not opted_in.matches("0")
+    assert opted_in.matches("10^-12")
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def verifier(common, monkeypatch):
+    # A PBKDF2 helyett egyszerű összehasonlítás, hogy a tesztek gyorsak legyenek
+    monkeypatch.setattr(common, "verify_password", lambda password, hashed: password == hashed)
+    return common.PasswordVerifier(workers=1)
+
+
+def test_pending_limit_per_account_reports_busy(common, monkeypatch):
+    entered = threading.Event()
+    release = threading.Event()
+    
+    def slow_verify(password, hashed):
+        entered.set()
+        release.wait()
+        return password == hashed
+    
+    monkeypatch.setattr(common, "verify_password", slow_verify)
+    verifier = common.PasswordVerifier(workers=1, account_pending_max=1)
+    
+    # Az első ellenőrzés a munkaszálon fut, a második a fiók sorában várakozik
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(verifier.verify("diak", "titok", "titok")))
+               for _ in range(2)]
+    threads[0].start()
+    assert entered.wait(5)
+    threads[1].start()
+    deadline = time.monotonic() + 5
+    while "diak" not in verifier._accounts and time.monotonic() < deadline:
+        time.sleep(0.01)
+    
+    result = verifier.verify("diak", "titok", "titok")
+    assert result is common.LOGIN_BUSY
+    assert not result
+    # A foglaltság nem számít hibás próbálkozásnak
+    assert verifier.retry_after("diak") == 0
+    
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == [True, True]
+
+
+def test_timeout_reports_busy(common, verifier, monkeypatch):
+    monkeypatch.setattr(common, "verify_password", lambda password, hashed: time.sleep(0.5) or True)
+    assert verifier.verify("lassu", "x", "x", timeout=0.05) is common.LOGIN_BUSY
+    assert verifier.retry_after("lassu") == 0
+
+
+def test_lockout_after_repeated_failures(common, verifier, monkeypatch):
+    monkeypatch.setattr(common, "LOGIN_LOCKOUT_BASE", 0.2)
+    for _ in range(common.LOGIN_FAILURE_LIMIT - 1):
+        assert verifier.verify("tanar", "rossz", "jo") is False
+        assert verifier.retry_after("tanar") == 0
+    
+    assert verifier.verify("tanar", "rossz", "jo") is False
+    assert 0 < verifier.retry_after("tanar") <= 0.2
+    # Zárolás alatt a helyes jelszót sem ellenőrzi, és ez nem hosszabbít
+    assert verifier.verify("tanar", "jo", "jo") is False
+    assert verifier.retry_after("tanar") <= 0.2
+    # Más fiókot nem érint
+    assert verifier.verify("masik", "jo", "jo") is True
+    
+    time.sleep(0.25)
+    # A zárolás után a következő hiba már kétszer olyan hosszú zárolást ad
+    assert verifier.verify("tanar", "rossz", "jo") is False
+    assert 0.2 < verifier.retry_after("tanar") <= 0.4
+
+
+def test_success_clears_failures(common, verifier):
+    for _ in range(common.LOGIN_FAILURE_LIMIT - 1):
+        verifier.verify("diak", "rossz", "jo")
+    assert verifier.verify("diak", "jo", "jo") is True
+    assert verifier.verify("diak", "rossz", "jo") is False
+    assert verifier.retry_after("diak") == 0
+
+
+def test_login_retry_after_rounds_up(common, monkeypatch):
+    monkeypatch.setattr(common._password_verifier, "retry_after", lambda account: 1.2)
+    assert common.login_retry_after("barki") == 2
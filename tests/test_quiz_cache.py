@@ -0,0 +1,22 @@
+def _text_question(answer):
+    return {"question": "Mikor jelent meg a Linux?", "type": "text", "answer": [answer], "points": 1}
+
+
+def test_save_quiz_is_visible_immediately(common, monkeypatch):
+    """Mentés után a következő olvasás már az új kérdéssort adja"""
+    common.save_quiz("mentes_teszt", [_text_question("1991")])
+    assert common.get_quiz("mentes_teszt")[0]["answer"] == ("1991",)
+    
+    # A fájlfigyelő még nem jelezte a változást: a generáció ugyanaz marad,
+    # és a háttérszál értesítése sem üríti a gyorsítótárat
+    monkeypatch.setattr(common._file_watcher, "generation", lambda path: 1)
+    monkeypatch.setattr(common._file_watcher, "_subscribers", [])
+    old_version, _questions = common.get_quiz_with_version("mentes_teszt")
+    
+    common.save_quiz("mentes_teszt", [_text_question("GPL"), _text_question("1991")])
+    version, questions = common.get_quiz_with_version("mentes_teszt")
+    assert version != old_version
+    assert [q["answer"] for q in questions] == [("GPL",), ("1991",)]
+    assert common.get_quiz_question_count("mentes_teszt") == 2
+    # A régi változat a folyamatban lévő kitöltéseknek megmarad
+    assert common.get_quiz_version("mentes_teszt", old_version)[0]["answer"] == ("1991",)
@@ -0,0 +1,48 @@
+import json
+import os
+
+
+def test_index_positions_skip_malformed_entries(common):
+    """A hibás (nem objektum) elemeket az index és a get_quiz() is kihagyja"""
+    bank = [
+        {"question": "Első", "type": "text", "answer": ["a"], "points": 1},
+        "hibás bejegyzés",
+        {"question": "Második", "type": "single", "options": ["x", "y"], "answer": ["y"], "points": 2},
+        42,
+        [1, 2],
+        {"question": "Harmadik ő", "type": "text", "answer": ["c"], "points": 1},
+    ]
+    with open(os.path.join(common.QUIZZES_DIR, "hibas_bank.json"), "w", encoding="utf-8") as f:
+        json.dump(bank, f, ensure_ascii=False)
+    
+    questions = common.get_quiz("hibas_bank")
+    assert [q["question"] for q in questions] == ["Első", "Második", "Harmadik ő"]
+    assert questions[1]["answer"] == "y"
+    
+    version, count, records = common._read_quiz_records("hibas_bank", [2, 0, 1])
+    assert count == len(questions)
+    assert [q["question"] for q in records] == ["Harmadik ő", "Első", "Második"]
+    
+    spec = common.new_attempt_spec("hibas_bank", questions_to_show=2, seed=1)
+    resolved = common.resolve_attempt(spec)
+    assert [q["question"] for q in resolved] == [questions[i]["question"] for i in spec["order"]]
+
+
+def test_malformed_questions_do_not_break_loading(common):
+    """A válaszkulcs-hibás kérdés kimarad, a quiz és a katalógus többi része elérhető"""
+    bank = [
+        {"question": "Jó", "type": "text", "answer": ["1991"], "points": 1, "match_type": "number"},
+        {"question": "Szám válasz", "type": "text", "answer": 5, "points": 1},
+        {"question": "Hibás jegyek", "type": "text", "answer": ["3.14"], "points": 1,
+         "match_type": "number", "sig_figs": "abc"},
+        {"question": "Másik jó", "type": "single", "options": ["a", "b"], "answer": "a", "points": 1},
+    ]
+    with open(os.path.join(common.QUIZZES_DIR, "hibas_kulcs.json"), "w", encoding="utf-8") as f:
+        json.dump(bank, f, ensure_ascii=False)
+    
+    assert [q["question"] for q in common.get_quiz("hibas_kulcs")] == ["Jó", "Másik jó"]
+    _version, count, records = common._read_quiz_records("hibas_kulcs", [1])
+    assert count == 2 and records[0]["question"] == "Másik jó"
+    
+    quizzes = common.get_available_quizzes()
+    assert quizzes["hibas_kulcs"]["question_count"] == 2
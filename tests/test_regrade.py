@@ -0,0 +1,90 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _quiz(first_answer="4"):
+    return [
+        {"question": "2 + 2?", "type": "text", "answer": [first_answer], "points": 2, "match_type": "number"},
+        {"question": "Főváros?", "type": "single", "options": ["Budapest", "Bécs"], "answer": "Budapest", "points": 1},
+    ]
+
+
+def _result(common, i, answers):
+    questions = common.get_quiz("regrade_teszt")
+    entries, score = [], 0
+    for q, answer in zip(questions, answers):
+        earned = common.calculate_score(answer, q["answer"], q["type"], q["points"],
+                                        q.get("match_type", "exact"), answer_key=q.answer_key)
+        score += earned
+        entries.append({"question": q["question"], "type": q["type"], "student_answer": answer,
+                        "correct_answer": common.to_plain(q["answer"]), "earned_points": earned,
+                        "max_points": q["points"], "is_correct": earned == q["points"]})
+    return {"student_name": f"Diák {i}", "student_email": f"d{i}@iskola.hu", "score": score,
+            "total_questions": 2, "percentage": round(score / 3 * 100, 2),
+            "timestamp": f"2025-10-0{i + 1} 10:00:00", "answers": json.dumps(entries), "class": "9.A",
+            "max_points": 3, "grade": common.calculate_grade(round(score / 3 * 100, 2)),
+            "quiz_id": f"r{i}", "attempt_id": f"r{i}"}
+
+
+def test_regrade_only_touches_changed_question(common):
+    common.save_quiz("regrade_teszt", _quiz("4"))
+    for i, answers in enumerate([("4", "Budapest"), ("5", "Budapest"), ("5", "Bécs")]):
+        common.append_result("regrade_teszt", _result(common, i, answers))
+    
+    # Javított kulcs: az 5 is elfogadott; a másik kérdés nem változik
+    common.save_quiz("regrade_teszt", _quiz("5"))
+    stats = common.regrade_results("regrade_teszt")
+    assert stats["questions"] == 1
+    assert stats["attempts"] == 3
+    
+    df = common.load_results("regrade_teszt").sort_values("attempt_id")
+    assert df["score"].tolist() == [1, 3, 2]
+    assert df["grade"].tolist() == [common.calculate_grade(p) for p in df["percentage"]]
+    entries = json.loads(df["answers"].iloc[1])
+    assert entries[0]["is_correct"] and entries[0]["correct_answer"] == ["5"]
+    assert entries[1] == json.loads(df["answers"].iloc[1])[1]
+    assert common.load_attempt("regrade_teszt", "r1")["score"] == 3
+    
+    # Változás nélkül nincs újrapontozandó kérdés
+    assert common.regrade_results("regrade_teszt")["questions"] == 0
+
+
+def test_append_during_regrade_is_kept(common):
+    common.save_quiz("regrade_teszt", _quiz("4"))
+    common.save_results("regrade_teszt", pd.DataFrame([_result(common, 0, ("5", "Budapest"))]))
+    common.save_quiz("regrade_teszt", _quiz("5"))
+    
+    script = textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {ROOT!r})
+        import common
+        print("kész", flush=True)
+        common.append_result("regrade_teszt", {_result(common, 1, ("4", "Bécs"))!r})
+    """)
+    questions = common.get_quiz("regrade_teszt")
+    targets = {0: (questions[0]["question"], '{"question": ' + json.dumps(questions[0]["question"]),
+                   json.dumps(questions[0]["question"]))}
+    stats = {"attempts": 0, "regraded": 0, "answers": 0}
+    
+    def update(df):
+        # A partíció zárja alatt egy másik folyamat próbál hozzáfűzni
+        writer = subprocess.Popen([sys.executable, "-c", script], cwd=os.getcwd(),
+                                  stdout=subprocess.PIPE, text=True)
+        assert writer.stdout.readline().strip() == "kész"
+        time.sleep(0.5)
+        update.writer = writer
+        return common._regrade_frame(df, questions, targets, [common.to_plain(q["answer"]) for q in questions], stats)
+    
+    common.update_results("regrade_teszt", update)
+    assert update.writer.wait(timeout=60) == 0
+    df = common.load_results("regrade_teszt").sort_values("attempt_id")
+    assert df["attempt_id"].tolist() == ["r0", "r1"]
+    assert df["score"].tolist() == [3, 0]
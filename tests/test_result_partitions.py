@@ -0,0 +1,84 @@
+import gzip
+import os
+from datetime import date
+
+import pandas as pd
+
+
+def _result(attempt_id, timestamp, grade=5):
+    return {
+        "student_name": "Teszt Elek", "score": 1, "total_questions": 1, "percentage": 100,
+        "timestamp": timestamp, "answers": "[]", "max_points": 1, "grade": grade,
+        "class": "9.A", "attempt_id": attempt_id
+    }
+
+
+def _partition_files(common, quiz_id):
+    return sorted(os.listdir(common.get_results_dir(quiz_id)))
+
+
+def test_attempts_go_to_monthly_partitions(common):
+    common.append_results({"particio_teszt": [
+        _result("a-1", "2025-09-15 08:00:00"),
+        _result("a-2", "2025-10-01 09:00:00"),
+        _result("a-3", "2025-10-20 10:00:00"),
+    ]})
+    assert _partition_files(common, "particio_teszt") == ["2025-09.csv", "2025-10.csv", "attempts.idx"]
+    assert len(common.load_results("particio_teszt")) == 3
+
+
+def test_date_range_reads_only_matching_partitions(common, monkeypatch):
+    common.append_results({"szures_teszt": [
+        _result("s-1", "2025-09-15 08:00:00"),
+        _result("s-2", "2025-11-02 09:00:00"),
+    ]})
+    read = []
+    original = common._read_results_file
+    monkeypatch.setattr(common, "_read_results_file",
+                        lambda path, *args, **kwargs: read.append(os.path.basename(path)) or original(path, *args, **kwargs))
+    
+    df = common.load_results("szures_teszt", date_from=date(2025, 11, 1), date_to=date(2025, 11, 30))
+    assert list(df["attempt_id"]) == ["s-2"]
+    assert read == ["2025-11.csv"]
+
+
+def test_archive_compresses_old_months_and_keeps_attempts_readable(common):
+    common.append_results({"archiv_teszt": [
+        _result("r-1", "2025-06-10 08:00:00"),
+        _result("r-2", "2025-10-05 09:00:00"),
+    ]})
+    assert common.archive_result_partitions("archiv_teszt", date(2025, 9, 1)) == 1
+    assert _partition_files(common, "archiv_teszt") == ["2025-06.csv.gz", "2025-10.csv", "attempts.idx"]
+    with gzip.open(common._partition_path("archiv_teszt", "2025-06", archived=True), 'rt') as f:
+        assert "r-1" in f.read()
+    
+    assert sorted(common.load_results("archiv_teszt")["attempt_id"]) == ["r-1", "r-2"]
+    assert common.load_attempt("archiv_teszt", "r-1")["attempt_id"] == "r-1"
+    
+    # Az archivált hónapba később érkező sor egy új, friss fájlba kerül, és együtt olvassuk
+    common.append_results({"archiv_teszt": [_result("r-3", "2025-06-30 12:00:00")]})
+    assert sorted(common.load_results("archiv_teszt")["attempt_id"]) == ["r-1", "r-2", "r-3"]
+    assert common.archive_result_partitions("archiv_teszt", date(2025, 9, 1)) == 1
+    assert "2025-06.csv" not in _partition_files(common, "archiv_teszt")
+    assert sorted(common.load_results("archiv_teszt")["attempt_id"]) == ["r-1", "r-2", "r-3"]
+
+
+def test_archive_splits_legacy_results_file(common):
+    legacy = common.get_results_file("regi_teszt")
+    pd.DataFrame([_result("l-1", "2024-03-01 08:00:00"), _result("l-2", "2025-10-01 08:00:00")]).to_csv(legacy, index=False)
+    
+    common.archive_result_partitions("regi_teszt", date(2025, 9, 1))
+    assert not os.path.exists(legacy)
+    assert _partition_files(common, "regi_teszt") == ["2024-03.csv.gz", "2025-10.csv", "attempts.idx"]
+    assert sorted(common.load_results("regi_teszt")["attempt_id"]) == ["l-1", "l-2"]
+
+
+def test_torn_last_row_is_dropped_before_appending(common):
+    common.append_results({"csonka_teszt": [_result("t-1", "2025-10-01 08:00:00")]})
+    path = common._partition_path("csonka_teszt", "2025-10")
+    with open(path, 'ab') as f:
+        f.write(b"Felbe,vagott")
+    
+    common.append_results({"csonka_teszt": [_result("t-2", "2025-10-02 08:00:00")]})
+    assert list(common.load_results("csonka_teszt")["attempt_id"]) == ["t-1", "t-2"]
+    assert common.load_attempt("csonka_teszt", "t-2")["attempt_id"] == "t-2"
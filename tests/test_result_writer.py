@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+
+def _result(attempt_id):
+    return {
+        "student_name": "Teszt Elek", "score": 1, "total_questions": 1, "percentage": 100,
+        "timestamp": "2025-10-01 08:00:00", "answers": "[]", "max_points": 1, "grade": 5,
+        "class": "9.A", "attempt_id": attempt_id
+    }
+
+
+@pytest.fixture
+def writer(common, monkeypatch):
+    monkeypatch.setattr(common, "RESULT_WRITER_CHECK_INTERVAL", 0.05)
+    return common.ResultWriter()
+
+
+def test_submit_returns_after_the_row_is_saved(common, writer):
+    writer.submit("iro_teszt", _result("w-1"))
+    assert common.attempt_saved("iro_teszt", "w-1")
+
+
+def test_dead_writer_thread_falls_back_to_synchronous_write(common, writer, monkeypatch):
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    monkeypatch.setattr(writer, "_ensure_started", lambda: None)
+    writer._thread = dead
+    
+    writer.submit("iro_teszt", _result("w-2"))
+    assert common.attempt_saved("iro_teszt", "w-2")
+    # A sorban maradt rekordot egy később induló szál már nem írja ki újra
+    assert writer._queue.get_nowait().state == "cancelled"
+
+
+def test_stuck_write_times_out(common, writer, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(writer, "_write_batch", lambda batch: release.wait())
+    try:
+        with pytest.raises(TimeoutError):
+            writer.submit("iro_teszt", _result("w-3"), timeout=0.2)
+    finally:
+        release.set()
+
+
+def test_writer_errors_reach_the_caller(common, writer, monkeypatch):
+    def fail(batch):
+        raise OSError("megtelt a lemez")
+    monkeypatch.setattr(writer, "_write_batch", fail)
+    with pytest.raises(OSError, match="megtelt"):
+        writer.submit("iro_teszt", _result("w-4"), timeout=5)
+    assert writer._thread.is_alive()
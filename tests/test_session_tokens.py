@@ -0,0 +1,44 @@
+import os
+import stat
+
+
+def test_secret_is_kept_outside_the_config(common, monkeypatch):
+    monkeypatch.delenv(common.SESSION_SECRET_ENV, raising=False)
+    monkeypatch.setattr(common, "_session_secret_value", None)
+    if os.path.exists(common.SESSION_SECRET_FILE):
+        os.remove(common.SESSION_SECRET_FILE)
+    
+    secret = common._session_secret()
+    assert len(secret) == 32
+    assert stat.S_IMODE(os.stat(common.SESSION_SECRET_FILE).st_mode) == 0o600
+    assert "session_secret" not in common.load_config()
+    
+    # Másik folyamat (üres gyorsítótár) ugyanazt a kulcsot olvassa be
+    monkeypatch.setattr(common, "_session_secret_value", None)
+    assert common._session_secret() == secret
+
+
+def test_secret_from_environment(common, monkeypatch):
+    monkeypatch.setenv(common.SESSION_SECRET_ENV, "környezeti kulcs")
+    monkeypatch.setattr(common, "_session_secret_value", None)
+    assert common._session_secret() == "környezeti kulcs".encode("utf-8")
+    monkeypatch.setattr(common, "_session_secret_value", None)
+
+
+def test_restore_rotates_the_token(common, monkeypatch):
+    config = common.load_config()
+    config["teacher_password_hash"] = "pbkdf2$teszt"
+    common.save_config(config)
+    
+    session_id = common.new_session_id()
+    common.save_session_snapshot(session_id, {"teacher_selected_quiz": "prefix100"})
+    token = common.teacher_session_token(session_id)
+    
+    new_id = common.restore_teacher_login(token)
+    assert new_id and new_id != session_id
+    assert common.load_session_snapshot(new_id) == {"teacher_selected_quiz": "prefix100"}
+    assert common.load_session_snapshot(session_id) == {}
+    
+    # A már felhasznált token nem léptet be újra, az új igen
+    assert common.restore_teacher_login(token) is None
+    assert common.restore_teacher_login(common.teacher_session_token(new_id))
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def directory(common, tmp_path):
+    return common.StudentDirectory(str(tmp_path / "students.json"))
+
+
+def test_add_and_login_are_case_insensitive(directory):
+    directory.add("9.A", "Kiss Anna", "Anna.Kiss@Suli.hu", "hash-1")
+    
+    assert directory.email_exists("anna.kiss@suli.hu")
+    assert directory.email_exists("ANNA.KISS@SULI.HU")
+    info, stored_hash = directory.login("anna.kiss@suli.hu")
+    assert info == {"name": "Kiss Anna", "email": "Anna.Kiss@Suli.hu", "class": "9.A"}
+    assert stored_hash == "hash-1"
+    assert directory.login("nincs@suli.hu") is None
+
+
+def test_moving_a_student_removes_the_old_class_entry(directory):
+    directory.add("9.A", "Nagy Béla", "bela@suli.hu", "h")
+    directory.add("10.B", "Nagy Béla", "bela@suli.hu", "h2")
+    
+    assert "bela@suli.hu" not in directory.members("9.A")
+    assert directory.login("bela@suli.hu")[0]["class"] == "10.B"
+    assert directory.delete("9.A", "bela@suli.hu") is False
+    assert directory.delete("10.B", "bela@suli.hu") is True
+    assert not directory.email_exists("bela@suli.hu")
+    assert directory.login("bela@suli.hu") is None
+
+
+def test_add_class_and_snapshot_is_a_copy(directory):
+    assert directory.add_class("11.C") is True
+    assert directory.add_class("11.C") is False
+    
+    snapshot = directory.snapshot()
+    snapshot["classes"]["11.C"]["x@suli.hu"] = {"name": "X", "email": "x@suli.hu", "password_hash": "h"}
+    assert directory.members("11.C") == {}
+    
+    directory.replace(snapshot)
+    assert "x@suli.hu" in directory.members("11.C")
+
+
+def test_changes_from_another_process_are_picked_up(common, directory):
+    directory.add("9.A", "Kiss Anna", "anna@suli.hu", "h")
+    
+    # Egy másik példány (pl. a tanári felület folyamata) ugyanazt a fájlt írja
+    other = common.StudentDirectory(directory.path)
+    other.add("9.A", "Szabó Csilla", "csilla@suli.hu", "h")
+    assert directory.email_exists("csilla@suli.hu")
+    
+    with open(directory.path, encoding='utf-8') as f:
+        data = json.load(f)
+    data["classes"]["9.A"].pop("anna@suli.hu")
+    data["students"].pop("anna@suli.hu")
+    with open(directory.path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4)
+    assert directory.login("anna@suli.hu") is None
+    assert not directory.email_exists("anna@suli.hu")
+
+
+def test_missing_file_is_an_empty_directory(common, tmp_path):
+    directory = common.StudentDirectory(str(tmp_path / "nincs.json"))
+    assert directory.classes() == []
+    assert directory.login("barki@suli.hu") is None
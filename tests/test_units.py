@@ -0,0 +1,22 @@
+import pytest
+
+
+@pytest.mark.parametrize("correct, answers", [
+    ("5 mA", {"5 mA": True, "5 MA": False, "0,005 A": True, "5000 µA": True}),
+    ("2 ms", {"2 ms": True, "2 Ms": False, "0,002 s": True}),
+    ("3 MW", {"3 MW": True, "3 mW": False, "3000 kW": True, "3000 kw": True}),
+])
+def test_bulk_unit_matching_keeps_case(common, correct, answers):
+    key = common.AnswerKey([correct], match_type="unit")
+    students = list(answers)
+    assert [key.matches(a) for a in students] == [answers[a] for a in students]
+    assert key.matches_many(students).tolist() == [answers[a] for a in students]
+
+
+def test_normalized_unit_answer_uses_only_unambiguous_units(common):
+    key = common.AnswerKey(["2 ms"], match_type="unit")
+    # Kisbetűsítés után "ms" lehet ms vagy Ms is: nem fogadható el találgatással
+    assert not key.matches_normalized(common.normalize_text("2 Ms"))
+    assert not key.matches_normalized(common.normalize_text("2 ms"))
+    assert common.lookup_unit("kw", case_folded=True) == common.lookup_unit("kW")
+    assert common.lookup_unit("ms", case_folded=True) is None